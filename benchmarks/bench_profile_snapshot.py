@@ -0,0 +1,97 @@
+# benchmarks/bench_profile_snapshot.py
+# Compares the old six-call profile path with Database.get_profile_snapshot.
+# Run from the repo root against a real database:
+#   python -m benchmarks.bench_profile_snapshot --iterations 200 [--user-id 1234]
+import argparse
+import asyncio
+import statistics
+import time
+from dotenv import load_dotenv
+from database import db
+
+
+# The queries generate_profile_embeds ran before get_profile_snapshot and user_stats existed,
+# inlined so the baseline stays fixed while database.py moves on.
+LEGACY_POINTS_SQL = "SELECT COUNT(*) FROM checkins WHERE user_id = $1"
+LEGACY_CATEGORY_COUNT_SQL = "SELECT COUNT(*) FROM checkins WHERE user_id = $1 AND category = $2"
+LEGACY_WEIGHT_CHANGE_SQL = """
+    (SELECT weight, timestamp FROM checkins WHERE user_id = $1 AND category = 'weight' ORDER BY timestamp ASC LIMIT 1)
+    UNION ALL
+    (SELECT weight, timestamp FROM checkins WHERE user_id = $1 AND category = 'weight' ORDER BY timestamp DESC LIMIT 1)
+"""
+LEGACY_PR_RANKING_SQL = """
+    SELECT user_id, {lift} FROM personal_records
+    WHERE {lift} IS NOT NULL
+    ORDER BY {lift} DESC
+    LIMIT 8
+"""
+LEGACY_PERSONAL_RECORDS_SQL = "SELECT deadlift, bench, squat FROM personal_records WHERE user_id = $1"
+
+
+async def legacy_profile(user_id):
+    """The calls generate_profile_embeds made before get_profile_snapshot existed, one connection each."""
+    async with db.pool.acquire() as conn:  # get_user_points
+        await conn.fetchval(LEGACY_POINTS_SQL, user_id)
+    async with db.pool.acquire() as conn:  # get_progress
+        await conn.fetchval(LEGACY_CATEGORY_COUNT_SQL, user_id, "gym")
+        await conn.fetchval(LEGACY_CATEGORY_COUNT_SQL, user_id, "food")
+    async with db.pool.acquire() as conn:  # get_weight_change
+        await conn.fetch(LEGACY_WEIGHT_CHANGE_SQL, user_id)
+    async with db.pool.acquire() as conn:  # get_pr_rankings
+        for lift in ["deadlift", "bench", "squat"]:
+            await conn.fetch(LEGACY_PR_RANKING_SQL.format(lift=lift))
+    async with db.pool.acquire() as conn:  # get_personal_records
+        await conn.fetchrow(LEGACY_PERSONAL_RECORDS_SQL, user_id)
+
+
+async def snapshot_profile(user_id):
+    await db.get_profile_snapshot(user_id)
+
+
+async def time_path(path, user_ids, iterations):
+    """Run `path` for every user `iterations` times and return per-call latencies in ms."""
+    latencies = []
+    for _ in range(iterations):
+        for user_id in user_ids:
+            start = time.perf_counter()
+            await path(user_id)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    print(f"{name:<10} calls={len(latencies):<6} median={statistics.median(latencies):7.2f} ms  "
+          f"p95={p95:7.2f} ms  mean={statistics.mean(latencies):7.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark profile loading paths.")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids",
+                        help="User to profile (repeatable). Defaults to the 10 most active users.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    await db.connect()
+    try:
+        user_ids = args.user_ids
+        if not user_ids:
+            async with db.pool.acquire() as conn:
+                rows = await conn.fetch("SELECT user_id FROM user_stats ORDER BY total_checkins DESC LIMIT 10")
+            user_ids = [row["user_id"] for row in rows]
+
+        # Warm up connections and plan caches so neither path pays for them
+        for user_id in user_ids:
+            await legacy_profile(user_id)
+            await snapshot_profile(user_id)
+
+        report("legacy", await time_path(legacy_profile, user_ids, args.iterations))
+        report("snapshot", await time_path(snapshot_profile, user_ids, args.iterations))
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
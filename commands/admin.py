@@ -0,0 +1,205 @@
+# commands/admin.py
+import asyncio
+import discord
+from discord import app_commands
+from discord.ext import commands
+from database import db
+from utils.image_pipeline import image_pipeline, dhash_file
+from utils.phash_index import phash_index
+from utils.challenge_messages import challenge_messages
+from utils.conversations import conversations
+from utils.dm_flows import dm_flows
+from utils.outbound import outbound
+from utils.timers import timers
+from utils.challenge_lifecycle import lifecycle
+from utils.users import users
+from utils.job_queue import job_queue
+
+
+class Admin(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="rebuild_stats",
+                          description="Rebuild or verify the per-user stats rollup from check-in history")
+    @app_commands.describe(verify_only="Only report users whose stats differ, without rewriting them")
+    @app_commands.default_permissions(administrator=True)
+    async def rebuild_stats(self, interaction: discord.Interaction, verify_only: bool = False):
+        """Admin command to recompute user_stats from the checkins table"""
+        await interaction.response.defer(ephemeral=True)
+
+        try:
+            mismatched = await db.verify_user_stats()
+
+            if verify_only:
+                if mismatched:
+                    details = "\n".join(f"• <@{user_id}>" for user_id in mismatched[:10])
+                    details += "\n..." if len(mismatched) > 10 else ""
+                else:
+                    details = "✅ Rollup matches check-in history."
+
+                embed = discord.Embed(
+                    title="🔍 Stats Verification",
+                    description=f"**Mismatched users:** {len(mismatched)}\n{details}",
+                    color=discord.Color.orange() if mismatched else discord.Color.green()
+                )
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
+
+            total = await db.rebuild_user_stats()
+
+            embed = discord.Embed(
+                title="✅ Stats Rebuilt",
+                description=(
+                    f"**Users rebuilt:** {total}\n"
+                    f"**Users corrected:** {len(mismatched)}"
+                ),
+                color=discord.Color.green()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            print(f"❌ [Admin] rebuild_stats error: {e}")
+            await interaction.followup.send(f"❌ An error occurred: {str(e)}", ephemeral=True)
+
+    @app_commands.command(name="backfill_phash",
+                          description="Compute perceptual hashes for stored images that don't have one yet")
+    @app_commands.default_permissions(administrator=True)
+    async def backfill_phash(self, interaction: discord.Interaction):
+        """Admin command to fill image_blobs.phash for images stored before near-duplicate detection"""
+        await interaction.response.defer(ephemeral=True)
+
+        try:
+            async with db.pool.acquire() as conn:
+                rows = await conn.fetch("SELECT image_hash, path FROM image_blobs WHERE phash IS NULL")
+
+            hashed = 0
+            # One chunk per pool width keeps every worker busy without tripping the queue limit
+            for start in range(0, len(rows), image_pipeline.workers):
+                chunk = rows[start:start + image_pipeline.workers]
+                phashes = await asyncio.gather(*(image_pipeline.run(dhash_file, row["path"]) for row in chunk))
+                updates = [(phash, row["image_hash"]) for row, phash in zip(chunk, phashes) if phash is not None]
+                if updates:
+                    async with db.pool.acquire() as conn:
+                        await conn.executemany("UPDATE image_blobs SET phash = $1 WHERE image_hash = $2", updates)
+                    hashed += len(updates)
+
+            phash_index.clear()
+
+            embed = discord.Embed(
+                title="✅ Perceptual Hashes Backfilled",
+                description=(
+                    f"**Images hashed:** {hashed}\n"
+                    f"**Unreadable or missing:** {len(rows) - hashed}"
+                ),
+                color=discord.Color.green()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            print(f"❌ [Admin] backfill_phash error: {e}")
+            await interaction.followup.send(f"❌ An error occurred: {str(e)}", ephemeral=True)
+
+    @app_commands.command(name="bot_stats", description="Show in-process cache and flow counters")
+    @app_commands.default_permissions(administrator=True)
+    async def bot_stats(self, interaction: discord.Interaction):
+        """Admin command to show the bot's in-memory counters"""
+        embed = discord.Embed(title="📊 Bot Stats", color=discord.Color.blue())
+        embed.add_field(
+            name="✅ Reaction Fast Path",
+            value=(
+                f"**Reactions checked:** {challenge_messages.reactions_seen}\n"
+                f"**Skipped without a query:** {challenge_messages.fast_path_hits}\n"
+                f"**Hit rate:** {challenge_messages.hit_rate:.1%}"
+            ),
+            inline=False
+        )
+        embed.add_field(
+            name="💬 Flows",
+            value=(
+                f"**Waiting conversations:** {conversations.active}\n"
+                f"**Open DM sessions:** {dm_flows.active}\n"
+                f"**Images in the pipeline:** {image_pipeline.pending}\n"
+                f"**Pending timers:** {timers.pending}\n"
+                f"**Challenge phase transitions:** {lifecycle.transitions}"
+            ),
+            inline=False
+        )
+        embed.add_field(
+            name="📤 Outbound",
+            value=(
+                f"**Queued:** {outbound.queued}\n"
+                f"**Sent:** {outbound.sent}\n"
+                f"**Failed:** {outbound.failed}"
+            ),
+            inline=False
+        )
+        embed.add_field(
+            name="🧰 Jobs (this process)",
+            value=(
+                f"**Completed:** {job_queue.processed}\n"
+                f"**Failed attempts:** {job_queue.failed}\n"
+                f"**Dead-lettered:** {job_queue.dead}"
+            ),
+            inline=False
+        )
+        embed.add_field(
+            name="👥 User Lookups",
+            value=(
+                f"**Cached users:** {users.cached_users}\n"
+                f"**Cache hits:** {users.cache_hits}\n"
+                f"**Member chunk requests:** {users.chunk_requests}\n"
+                f"**REST calls:** {users.rest_calls}"
+            ),
+            inline=False
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="job_queue", description="Show job queue depth and age by kind")
+    @app_commands.default_permissions(administrator=True)
+    async def job_queue_status(self, interaction: discord.Interaction):
+        """Admin command to show the backlog every worker shares"""
+        await interaction.response.defer(ephemeral=True)
+
+        try:
+            rows = await job_queue.depth()
+            embed = discord.Embed(title="🧰 Job Queue", color=discord.Color.blue())
+            for row in rows:
+                oldest = row['oldest_ready_seconds']
+                embed.add_field(
+                    name=row['kind'],
+                    value=(
+                        f"**Ready:** {row['ready']}\n"
+                        f"**Waiting/retrying:** {row['waiting']}\n"
+                        f"**Running:** {row['leased']}\n"
+                        f"**Dead:** {row['dead']}\n"
+                        f"**Oldest ready:** {f'{oldest:.0f}s' if oldest is not None else '-'}"
+                    ),
+                    inline=True
+                )
+            if not rows:
+                embed.description = "✅ The queue is empty."
+            await interaction.followup.send(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            print(f"❌ [Admin] job_queue error: {e}")
+            await interaction.followup.send(f"❌ An error occurred: {str(e)}", ephemeral=True)
+
+    @app_commands.command(name="requeue_dead_jobs", description="Put dead-lettered jobs back on the queue")
+    @app_commands.describe(kind="Only requeue jobs of this kind (default: all)")
+    @app_commands.default_permissions(administrator=True)
+    async def requeue_dead_jobs(self, interaction: discord.Interaction, kind: str = None):
+        """Admin command to retry jobs that ran out of attempts, e.g. after fixing their cause"""
+        await interaction.response.defer(ephemeral=True)
+
+        try:
+            count = await job_queue.requeue_dead(kind)
+            await interaction.followup.send(f"🔁 Requeued {count} dead job(s).", ephemeral=True)
+
+        except Exception as e:
+            print(f"❌ [Admin] requeue_dead_jobs error: {e}")
+            await interaction.followup.send(f"❌ An error occurred: {str(e)}", ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
@@ -9,9 +9,10 @@ from discord.ui import View, Select
 from discord.ext import commands, tasks
 from database import db
 from datetime import datetime, timedelta
-from .challenge_end import ChallengeEnd
-from .challenge_voting import ChallengeVoting
 from utils.shared import send_final_photo_request
+from utils.dm_flows import dm_flows, DMSessionBusy
+from utils.challenge_messages import challenge_messages
+from utils.users import users
 
 # Set Eastern Time (New York Timezone)
 NYC_TZ = pytz.timezone("America/New_York")
@@ -20,9 +21,6 @@ NYC_TZ = pytz.timezone("America/New_York")
 class Challenge(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # Initialize sub-components
-        self.challenge_end = ChallengeEnd(bot)
-        self.challenge_voting = ChallengeVoting(bot)
 
     def parse_duration(self, duration_str):
         """Parse duration string like '30m', '2h', '5d' and return (value, unit, total_minutes)"""
@@ -137,6 +135,7 @@ class Challenge(commands.Cog):
                 await conn.execute("""
                     UPDATE challenges SET message_id = $1, channel_id = $2 WHERE id = $3
                 """, challenge_message.id, interaction.channel.id, challenge_id)
+            challenge_messages.add_join(challenge_message.id, challenge_id)
 
         except Exception as e:
             await interaction.followup.send(f"❌ Error creating challenge: {e}", ephemeral=True)
@@ -280,15 +279,16 @@ class Challenge(commands.Cog):
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
-        print(
-            f"[Reaction Debug] ✅ Detected reaction '{payload.emoji.name}' on message {payload.message_id} from user {payload.user_id}")
-
         if payload.emoji.name != "✅":
             return
 
         if payload.user_id == self.bot.user.id:
             return
 
+        # Reactions on anything but a live join post never reach the database
+        if challenge_messages.join_challenge(payload.message_id) is None:
+            return
+
         async with db.pool.acquire() as conn:
             challenge = await conn.fetchrow("""
                 SELECT id, name FROM challenges 
@@ -306,14 +306,15 @@ class Challenge(commands.Cog):
             if already_joined:
                 # Send ephemeral-style message by DMing the user
                 try:
-                    user = await self.bot.fetch_user(payload.user_id)
-                    dm = await user.create_dm()
+                    user = payload.member or await users.resolve(payload.user_id)
+                    dm = await users.dm_channel(user)
                     await dm.send("❌ You've already joined this challenge!")
                 except:
                     pass
                 return
 
-            user = await self.bot.fetch_user(payload.user_id)
+            # The reacting member arrives with the event, so joining normally costs no lookup
+            user = payload.member or await users.resolve(payload.user_id)
             if not user:
                 print(f"⚠️ Could not fetch user {payload.user_id}")
                 return
@@ -336,9 +337,9 @@ class Challenge(commands.Cog):
                 )
 
     async def start_sequential_dm_onboarding(self, challenge_id, challenge_name, user):
-        """Handle the complete DM onboarding process with parallel photo collection"""
+        """Send the onboarding DM and open the user's persisted onboarding session"""
         try:
-            dm = await user.create_dm()
+            dm = await users.dm_channel(user)
 
             embed = discord.Embed(
                 title=f"📸 Welcome to {challenge_name}!",
@@ -369,6 +370,9 @@ class Challenge(commands.Cog):
                     await dm.send(f"**{i + 1}️⃣ Example: {data['pose']}**")
                     await dm.send(file=discord.File(data["file"]))
 
+            # The rest of the flow is driven by replies, so it survives restarts and needs no waiting task
+            await dm_flows.start(dm, user.id, "onboarding", challenge_id, challenge_name)
+
             # Now ask for all photos at once
             await dm.send(
                 "📸 **Now upload your 4 photos!**\n"
@@ -376,83 +380,9 @@ class Challenge(commands.Cog):
                 "Make sure each photo clearly shows the pose!"
             )
 
-            def photo_check(m):
-                return m.author.id == user.id and m.channel == dm and m.attachments
-
-            photos = []
-            photo_count = 0
-
-            # Collect 4 photos in parallel (user can send in any order/timing)
-            while photo_count < 4:
-                msg = await self.bot.wait_for("message", check=photo_check, timeout=600)  # 10 minute timeout
-
-                for attachment in msg.attachments:
-                    if photo_count >= 4:
-                        break
-
-                    # Save the photo
-                    photo_path = f"challenge/{challenge_id}/initial/{user.id}"
-                    os.makedirs(photo_path, exist_ok=True)
-                    file_path = os.path.join(photo_path, f"photo_{photo_count + 1}_{attachment.filename}")
-                    await attachment.save(file_path)
-                    photos.append(file_path)
-                    photo_count += 1
-
-                    await dm.send(f"✅ Photo {photo_count}/4 received!")
-
-                if photo_count >= 4:
-                    break
-
-            await dm.send("🎉 All 4 photos received! Now let's get your weight and goals...")
-
-            # Ask for weight
-            await dm.send("⚖️ What is your **current weight** in pounds? (e.g., 175.5)")
-
-            def text_check(m):
-                return m.author.id == user.id and m.channel == dm and not m.attachments
+        except DMSessionBusy as e:
+            print(f"⚠️ DM process deferred for user {user.id}: {e}")  # start() already told them why
 
-            weight_msg = await self.bot.wait_for("message", check=text_check, timeout=300)
-            current_weight = float(weight_msg.content.strip())
-
-            await dm.send("🎯 What is your **goal weight** in pounds?")
-            goal_weight_msg = await self.bot.wait_for("message", check=text_check, timeout=300)
-            goal_weight = float(goal_weight_msg.content.strip())
-
-            await dm.send("💬 What is your **personal goal** for this challenge? (e.g., 'Lose 10 lbs and build muscle')")
-            goal_msg = await self.bot.wait_for("message", check=text_check, timeout=300)
-            personal_goal = goal_msg.content.strip()
-
-            # Update DB with all collected data
-            async with db.pool.acquire() as conn:
-                await conn.execute("""
-                    UPDATE challenge_participants
-                    SET current_weight = $1,
-                        goal_weight = $2,
-                        personal_goal = $3,
-                        initial_photos = $4
-                    WHERE challenge_id = $5 AND user_id = $6
-                """, current_weight, goal_weight, personal_goal, photos, challenge_id, user.id)
-
-            # Final confirmation
-            embed = discord.Embed(
-                title="✅ Registration Complete!",
-                description=(
-                    f"You're now fully registered for **{challenge_name}**!\n\n"
-                    f"📊 **Your Details:**\n"
-                    f"• Starting Weight: {current_weight} lbs\n"
-                    f"• Goal Weight: {goal_weight} lbs\n"
-                    f"• Personal Goal: {personal_goal}\n"
-                    f"• Photos: {len(photos)} submitted\n\n"
-                    f"💪 Good luck with your fitness journey!"
-                ),
-                color=discord.Color.green()
-            )
-            await dm.send(embed=embed)
-
-        except asyncio.TimeoutError:
-            await dm.send("⏰ Registration timed out. React to the challenge message again to restart.")
-        except ValueError:
-            await dm.send("❌ Invalid weight format. Please react to the challenge message again to restart.")
         except Exception as e:
             print(f"❌ DM process failed for user {user.id}: {e}")
             await dm.send("❌ Something went wrong during registration. Please react to the challenge message again.")
@@ -6,10 +6,18 @@ import uuid
 import traceback
 import pytz
 from datetime import datetime, timedelta
-from discord.ext import commands, tasks
+from discord.ext import commands
 from database import db
 from discord import app_commands
-from utils.shared import send_final_photo_request
+from utils.shared import send_final_photo_intro, start_final_photo_flow
+from utils.dm_flows import dm_flows
+from utils.challenge_messages import challenge_messages
+from utils.outbound import outbound, PRIORITY_ADMIN, PRIORITY_BULK
+from utils.timers import timers
+from utils.challenge_lifecycle import lifecycle
+from utils.users import users
+from utils.job_queue import job_queue
+from utils.job_types import PhotoCollectionJob
 
 NYC_TZ = pytz.timezone("America/New_York")
 
@@ -23,74 +31,26 @@ REMINDER_HOURS_THRESHOLD = 6
 class ChallengeEnd(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.photo_reminders = {}
-        self._task_started = False
         print("🔄 [ChallengeEnd] Initializing ChallengeEnd cog...")
 
     def cog_load(self):
-        """Start tasks when cog is loaded"""
-        if not self._task_started:
-            self.check_challenge_end.start()
-            self.check_photo_deadline.start()
-            self._task_started = True
-            print("✅ [ChallengeEnd] Tasks started successfully!")
-
-    def cog_unload(self):
-        """Stop tasks when cog is unloaded"""
-        self.check_challenge_end.cancel()
-        self.check_photo_deadline.cancel()
-        self._task_started = False
-        print("🛑 [ChallengeEnd] Tasks stopped")
-
-    @tasks.loop(seconds=30)  # Check every 30 seconds for better debugging
-    async def check_challenge_end(self):
-        """Check if any challenges have ended and trigger photo collection"""
-        current_time = datetime.now()
-        print(f"🔍 [ChallengeEnd] Checking for ended challenges at {current_time}")
-
-        try:
-            async with db.pool.acquire() as conn:
-                # Find challenges that just ended OR challenges that ended but still have participants needing DMs
-                ended_challenges = await conn.fetch("""
-                    SELECT DISTINCT c.id, c.name, c.end_date 
-                    FROM challenges c
-                    WHERE c.status = 'active' 
-                    AND c.end_date <= NOW() 
-                    AND (
-                        -- Either photo collection hasn't started yet
-                        COALESCE(c.photo_collection_started, FALSE) = FALSE
-                        OR
-                        -- Or there are still participants who need final DMs
-                        EXISTS (
-                            SELECT 1 FROM challenge_participants cp 
-                            WHERE cp.challenge_id = c.id 
-                            AND COALESCE(cp.disqualified, FALSE) = FALSE
-                            AND COALESCE(cp.submitted_final, FALSE) = FALSE
-                            AND COALESCE(cp.final_dm_sent, FALSE) = FALSE
-                        )
-                    )
-                """)
-
-                if ended_challenges:
-                    print(f"🏁 [ChallengeEnd] Found {len(ended_challenges)} challenges that need processing!")
-
-                    for challenge in ended_challenges:
-                        print(f"🎯 [ChallengeEnd] Processing challenge '{challenge['name']}' (ID: {challenge['id']})")
-                        await self.start_photo_collection(challenge['id'], challenge['name'])
-                else:
-                    print("ℹ️ [ChallengeEnd] No challenges need processing right now")
-
-        except Exception as e:
-            print(f"❌ [ChallengeEnd] Error in check_challenge_end: {e}")
-            traceback.print_exc()
-
-    @check_challenge_end.before_loop
-    async def before_check_challenge_end(self):
-        """Wait until bot is ready before starting the loop"""
-        await self.bot.wait_until_ready()
-
-    async def start_photo_collection(self, challenge_id, challenge_name):
-        """DM all participants to submit final photos - CONCURRENT VERSION"""
+        """Hook the cog's phase handlers into the lifecycle engine and timers"""
+        lifecycle.register("photo_collection", self.on_challenge_ended)
+        lifecycle.register("photo_deadline", self.on_photo_deadline)
+        timers.register("photo_reminder", self.send_photo_reminders)
+        job_queue.register(PhotoCollectionJob, self.run_photo_collection_job)
+        print("✅ [ChallengeEnd] Lifecycle handlers registered!")
+
+    async def on_challenge_ended(self, challenge):
+        """Lifecycle handler: the challenge's end date has passed, so collect final photos"""
+        await self.start_photo_collection(challenge['id'], challenge['name'])
+
+    async def run_photo_collection_job(self, job):
+        """Job handler: photo collection requested from another process (e.g. an admin resend)"""
+        await self.start_photo_collection(job.challenge_id, job.challenge_name, job.priority)
+
+    async def start_photo_collection(self, challenge_id, challenge_name, priority=PRIORITY_BULK):
+        """DM all participants to submit final photos through the rate-limited outbound scheduler"""
         print(f"📸 [ChallengeEnd] Starting photo collection for challenge {challenge_id}")
 
         try:
@@ -124,7 +84,7 @@ class ChallengeEnd(commands.Cog):
                 """, challenge_id)
 
                 if challenge_info and challenge_info['channel_id'] and not channel_notified:
-                    channel = self.bot.get_channel(challenge_info['channel_id'])
+                    channel = await users.channel(challenge_info['channel_id'])
                     if channel:
                         # Count total participants for the notification
                         total_participants = await conn.fetchval("""
@@ -154,7 +114,7 @@ class ChallengeEnd(commands.Cog):
 
                         print(f"📢 [ChallengeEnd] Sent end notification to channel {challenge_info['channel_id']}")
 
-            # Create concurrent tasks for DM sending
+            # Queue one DM job per participant; the scheduler paces them
             tasks = []
             participants_to_dm = []
 
@@ -170,9 +130,11 @@ class ChallengeEnd(commands.Cog):
                     print(f"⏩ [ChallengeEnd] Skipping {participant['username']}, already submitted or DM sent")
                     continue
 
-                # Create task for this participant
-                task = asyncio.create_task(
-                    self._send_dm_to_participant(participant, challenge_id, challenge_name)
+                # Queue the job for this participant (fetch user, open DM, two sends)
+                task = outbound.submit(
+                    f"dm:{participant['user_id']}", self._final_photo_dm_steps(participant, challenge_id, challenge_name),
+                    kind="final_photo_dm", target_id=participant['user_id'], challenge_id=challenge_id,
+                    priority=priority, cost=4
                 )
                 tasks.append(task)
                 participants_to_dm.append(participant)
@@ -181,14 +143,15 @@ class ChallengeEnd(commands.Cog):
                 print("ℹ️ [ChallengeEnd] No participants need DMs")
                 return
 
-            print(f"🚀 [ChallengeEnd] Starting {len(tasks)} concurrent DM tasks...")
+            print(f"🚀 [ChallengeEnd] Queued {len(tasks)} DM jobs...")
 
-            # Execute all DM tasks concurrently
+            # Wait for every queued DM to be delivered or to fail
             results = await asyncio.gather(*tasks, return_exceptions=True)
 
             # Process results and update database
             success_count = 0
             fail_count = 0
+            reminders = []
 
             async with db.pool.acquire() as conn:
                 for i, (result, participant) in enumerate(zip(results, participants_to_dm)):
@@ -218,15 +181,10 @@ class ChallengeEnd(commands.Cog):
                                 WHERE challenge_id = $1 AND user_id = $2
                             """, challenge_id, participant['user_id'])
 
-                            # Start reminder task
-                            user = await self.bot.fetch_user(participant['user_id'])
-                            task_key = f"{challenge_id}_{user.id}"
-                            if task_key in self.photo_reminders:
-                                self.photo_reminders[task_key].cancel()
-                            reminder_task = asyncio.create_task(
-                                self.photo_reminder_loop(user, challenge_id, challenge_name)
-                            )
-                            self.photo_reminders[task_key] = reminder_task
+                            reminders.append(self._photo_reminder_timer(
+                                challenge_id, participant['user_id'], challenge_name,
+                                timedelta(hours=PHOTO_REMINDER_START_HOURS)
+                            ))
 
                         except Exception as db_error:
                             print(f"❌ [ChallengeEnd] Database error marking successful DM: {db_error}")
@@ -236,6 +194,9 @@ class ChallengeEnd(commands.Cog):
 
                 print(f"📊 [ChallengeEnd] DM Summary: {success_count} sent, {fail_count} failed")
 
+                # Persisted reminders: they fire after a restart too, batched per tick
+                await timers.schedule_many("photo_reminder", reminders)
+
                 # Check if photo collection should be marked as fully started
                 remaining_participants = await conn.fetchval("""
                     SELECT COUNT(*) FROM challenge_participants 
@@ -260,78 +221,68 @@ class ChallengeEnd(commands.Cog):
             print(f"❌ [ChallengeEnd] Error in start_photo_collection: {e}")
             traceback.print_exc()
 
-    async def _send_dm_to_participant(self, participant, challenge_id, challenge_name):
-        """Helper method to send DM to a single participant"""
-        try:
-            # Fetch the user
-            user = await self.bot.fetch_user(participant['user_id'])
-            print(f"✅ [ChallengeEnd] Fetched user: {user} (ID: {user.id})")
+    def _final_photo_dm_steps(self, participant, challenge_id, challenge_name):
+        """Outbound steps for one participant's final photo DM: the instructions, then the first pose.
 
+        A retry resumes at the step that failed, so nobody gets the instructions twice.
+        """
+        async def send_intro():
+            user = await users.resolve(participant['user_id'])
             print(f"📩 [ChallengeEnd] Sending DM to {user.name} ({user.id})")
+            return user, await send_final_photo_intro(user, challenge_name)
 
-            # Send the DM using the imported function
-            await send_final_photo_request(self.bot, user, challenge_id, challenge_name)
-
+        async def start_flow(sent):
+            user, dm_channel = sent
+            await start_final_photo_flow(dm_channel, user, challenge_id, challenge_name)
             print(f"[ChallengeEnd] DM attempt: {user.name} | success=True | error=''")
             return True
 
-        except discord.NotFound:
-            error_msg = f"User {participant['user_id']} not found"
-            print(f"[ChallengeEnd] DM attempt: {participant['username']} | success=False | error='{error_msg}'")
-            raise discord.NotFound(f"User {participant['user_id']} not found")
-
-        except discord.Forbidden:
-            error_msg = f"Cannot DM user {participant['user_id']} - DMs disabled"
-            print(f"[ChallengeEnd] DM attempt: {participant['username']} | success=False | error='{error_msg}'")
-            raise discord.Forbidden(f"Cannot DM user {participant['user_id']}")
-
-        except Exception as e:
-            error_msg = str(e)
-            print(f"[ChallengeEnd] DM attempt: {participant['username']} | success=False | error='{error_msg}'")
-            print(f"❌ [ChallengeEnd] Failed to DM {participant['username']} ({participant['user_id']}): {e}")
-            traceback.print_exc()
-            raise e
-
-    async def photo_reminder_loop(self, user, challenge_id, challenge_name):
-        """Send periodic reminders to users who haven't submitted photos"""
-        try:
-            # Wait before starting reminders
-            await asyncio.sleep(PHOTO_REMINDER_START_HOURS * 3600)
-
-            reminder_count = 0
-            max_reminders = REMINDER_HOURS_THRESHOLD
+        return [send_intro, start_flow]
 
-            while reminder_count < max_reminders:
-                # Check if user has submitted
-                async with db.pool.acquire() as conn:
-                    submitted = await conn.fetchval("""
-                        SELECT submitted_final FROM challenge_participants 
-                        WHERE challenge_id = $1 AND user_id = $2
-                    """, challenge_id, user.id)
-
-                if submitted:
-                    print(f"✅ [ChallengeEnd] User {user.name} submitted photos, stopping reminders")
-                    break
-
-                # Send reminder
-                try:
-                    dm = await user.create_dm()
-                    await dm.send(
-                        f"⏰ **Reminder:** You still need to submit your final photos for **{challenge_name}**!\n"
-                        f"Time is running out - please submit as soon as possible."
-                    )
-                    print(f"📤 [ChallengeEnd] Sent reminder #{reminder_count + 1} to {user.name}")
-                except:
-                    print(f"❌ [ChallengeEnd] Failed to send reminder to {user.name}")
-                    break
-
-                reminder_count += 1
-                await asyncio.sleep(PHOTO_REMINDER_INTERVAL_HOURS * 3600)
+    async def send_photo_reminders(self, payloads):
+        """Timer handler: remind every participant whose reminder is due and who still hasn't submitted"""
+        async with db.pool.acquire() as conn:
+            pending = await conn.fetch("""
+                SELECT cp.challenge_id, cp.user_id
+                FROM challenge_participants cp
+                JOIN unnest($1::int[], $2::bigint[]) AS due(challenge_id, user_id)
+                  ON due.challenge_id = cp.challenge_id AND due.user_id = cp.user_id
+                WHERE COALESCE(cp.submitted_final, FALSE) = FALSE
+                AND COALESCE(cp.disqualified, FALSE) = FALSE
+            """, [p['challenge_id'] for p in payloads], [p['user_id'] for p in payloads])
+
+        pending = {(row['challenge_id'], row['user_id']) for row in pending}
+        next_reminders = []
+        for payload in payloads:
+            if (payload['challenge_id'], payload['user_id']) not in pending:
+                continue
+
+            outbound.submit_dm(
+                payload['user_id'],
+                f"⏰ **Reminder:** You still need to submit your final photos for **{payload['challenge_name']}**!\n"
+                f"Time is running out - please submit as soon as possible.",
+                kind="photo_reminder", challenge_id=payload['challenge_id'], priority=PRIORITY_BULK
+            )
 
-        except asyncio.CancelledError:
-            print(f"🛑 [ChallengeEnd] Reminder task cancelled for {user.name}")
-        except Exception as e:
-            print(f"❌ [ChallengeEnd] Error in reminder loop for {user.name}: {e}")
+            reminder_count = payload['reminder_count'] + 1
+            if reminder_count < REMINDER_HOURS_THRESHOLD:
+                next_reminders.append(self._photo_reminder_timer(
+                    payload['challenge_id'], payload['user_id'], payload['challenge_name'],
+                    timedelta(hours=PHOTO_REMINDER_INTERVAL_HOURS), reminder_count
+                ))
+
+        await timers.schedule_many("photo_reminder", next_reminders)
+        print(f"📤 [ChallengeEnd] Sent {len(pending)} photo reminder(s), {len(payloads) - len(pending)} already submitted")
+
+    @staticmethod
+    def _photo_reminder_timer(challenge_id, user_id, challenge_name, delay, reminder_count=0):
+        """(due_at, payload, key) for a participant's next final-photo reminder"""
+        return (
+            datetime.utcnow() + delay,
+            {'challenge_id': challenge_id, 'user_id': user_id,
+             'challenge_name': challenge_name, 'reminder_count': reminder_count},
+            f"photo_reminder:{challenge_id}:{user_id}"
+        )
 
     @app_commands.command(name="resend_final_dm",
                           description="Resend final photo DMs to participants who haven't submitted")
@@ -392,15 +343,15 @@ class ChallengeEnd(commands.Cog):
             )
             await interaction.followup.send(embed=embed, ephemeral=True)
 
-            # Trigger the photo collection process
-            await self.start_photo_collection(challenge_id, challenge['name'])
+            # A worker runs the photo collection process, ahead of any bulk sends
+            await job_queue.enqueue(PhotoCollectionJob(challenge_id, challenge['name'], priority=PRIORITY_ADMIN))
 
             # Send completion message
             result_embed = discord.Embed(
                 title="✅ DM Resend Triggered",
                 description=(
                     f"**Challenge:** {challenge['name']}\n\n"
-                    f"Photo collection process has been triggered for {len(participants)} participants.\n"
+                    f"Photo collection process has been queued for {len(participants)} participants.\n"
                     "Check the console logs for detailed results."
                 ),
                 color=discord.Color.green()
@@ -583,10 +534,14 @@ class ChallengeEnd(commands.Cog):
 
             # Send the DM
             try:
-                await self._send_dm_to_participant(
-                    {'user_id': user.id, 'username': user.display_name or user.name},
-                    challenge_id,
-                    challenge['name']
+                await outbound.submit(
+                    f"dm:{user.id}", self._final_photo_dm_steps(
+                        {'user_id': user.id, 'username': user.display_name or user.name},
+                        challenge_id,
+                        challenge['name']
+                    ),
+                    kind="final_photo_dm", target_id=user.id, challenge_id=challenge_id,
+                    priority=PRIORITY_ADMIN, cost=4
                 )
 
                 # Mark as sent in database
@@ -647,68 +602,46 @@ class ChallengeEnd(commands.Cog):
             print(f"❌ [Individual DM] Command error: {e}")
             await interaction.followup.send(f"❌ An error occurred: {str(e)}", ephemeral=True)
 
-    @tasks.loop(minutes=5)  # Check every 5 minutes
-    async def check_photo_deadline(self):
-        """Check if photo collection deadline has passed and start voting"""
-        print("🗳️ [ChallengeEnd] Checking photo deadlines...")
+    async def on_photo_deadline(self, challenge):
+        """Lifecycle handler: the photo deadline has passed, so start voting (or cancel it)"""
+        # The deadline has passed, so stop accepting final photos
+        closed = await dm_flows.cancel_challenge(challenge['id'])
+        if closed:
+            print(f"🔒 [ChallengeEnd] Closed {closed} unfinished photo submissions for {challenge['name']}")
 
-        try:
-            async with db.pool.acquire() as conn:
-                ready_challenges = await conn.fetch("""
-                    SELECT id, name, channel_id FROM challenges 
-                    WHERE status = 'active' 
-                    AND COALESCE(photo_collection_started, FALSE) = TRUE 
-                    AND COALESCE(voting_started, FALSE) = FALSE
-                    AND photo_collection_deadline <= NOW()
-                """)
-
-                if ready_challenges:
-                    print(f"🎯 [ChallengeEnd] Found {len(ready_challenges)} challenges ready for voting")
-
-                    for challenge in ready_challenges:
-                        # Check if enough participants submitted
-                        submission_count = await conn.fetchval("""
-                            SELECT COUNT(*) FROM challenge_participants 
-                            WHERE challenge_id = $1 
-                            AND submitted_final = TRUE 
-                            AND COALESCE(disqualified, FALSE) = FALSE
-                        """, challenge['id'])
-
-                        if submission_count < 2:
-                            print(f"⚠️ [ChallengeEnd] Not enough submissions for voting in {challenge['name']}")
-                            # Notify channel
-                            channel = self.bot.get_channel(challenge['channel_id'])
-                            if channel:
-                                await channel.send(
-                                    f"⚠️ Challenge **{challenge['name']}** ended with less than 2 submissions. "
-                                    f"Voting has been cancelled."
-                                )
-                            # Mark as completed without voting
-                            await conn.execute("""
-                                UPDATE challenges 
-                                SET status = 'completed', voting_started = TRUE, results_posted = TRUE 
-                                WHERE id = $1
-                            """, challenge['id'])
-                            continue
-
-                        print(f"🗳️ [ChallengeEnd] Starting voting for challenge: {challenge['name']}")
-                        # Import here to avoid circular imports
-                        from .challenge_voting import ChallengeVoting
-                        voting_cog = ChallengeVoting(self.bot)
-                        await voting_cog.start_voting(challenge['id'], challenge['name'], challenge['channel_id'])
-                        await conn.execute("""
-                            UPDATE challenges SET voting_started = TRUE WHERE id = $1
-                        """, challenge['id'])
-                else:
-                    print("ℹ️ [ChallengeEnd] No challenges ready for voting")
-
-        except Exception as e:
-            print(f"❌ [ChallengeEnd] Error in check_photo_deadline: {e}")
+        async with db.pool.acquire() as conn:
+            # Check if enough participants submitted
+            submission_count = await conn.fetchval("""
+                SELECT COUNT(*) FROM challenge_participants 
+                WHERE challenge_id = $1 
+                AND submitted_final = TRUE 
+                AND COALESCE(disqualified, FALSE) = FALSE
+            """, challenge['id'])
+
+            if submission_count < 2:
+                print(f"⚠️ [ChallengeEnd] Not enough submissions for voting in {challenge['name']}")
+                # Notify channel
+                channel = await users.channel(challenge['channel_id'])
+                if channel:
+                    await channel.send(
+                        f"⚠️ Challenge **{challenge['name']}** ended with less than 2 submissions. "
+                        f"Voting has been cancelled."
+                    )
+                # Mark as completed without voting
+                await conn.execute("""
+                    UPDATE challenges 
+                    SET status = 'completed', voting_started = TRUE, results_posted = TRUE 
+                    WHERE id = $1
+                """, challenge['id'])
+                challenge_messages.remove_challenge(challenge['id'])
+                return
 
-    @check_photo_deadline.before_loop
-    async def before_check_photo_deadline(self):
-        """Wait until bot is ready before starting the loop"""
-        await self.bot.wait_until_ready()
+            print(f"🗳️ [ChallengeEnd] Starting voting for challenge: {challenge['name']}")
+            voting_cog = self.bot.get_cog("ChallengeVoting")
+            await voting_cog.start_voting(challenge['id'], challenge['name'], challenge['channel_id'])
+            await conn.execute("""
+                UPDATE challenges SET voting_started = TRUE WHERE id = $1
+            """, challenge['id'])
 
     # Debug command for testing
     @commands.command(name="debug_challenges")
@@ -717,9 +650,8 @@ class ChallengeEnd(commands.Cog):
         """Debug command to manually check challenge status"""
         await ctx.send("🔍 Manually checking challenge status...")
 
-        # Manually trigger both checks
-        await self.check_challenge_end()
-        await self.check_photo_deadline()
+        # Make the lifecycle engine re-evaluate every challenge now, in whichever process runs it
+        await lifecycle.notify()
 
         # Show current status
         async with db.pool.acquire() as conn:
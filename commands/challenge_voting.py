@@ -1,20 +1,78 @@
 # commands/challenge_voting.py
 import discord
 import asyncio
-from discord.ext import commands, tasks
+import functools
+import json
+import os
+from discord import app_commands
+from discord.ext import commands
 from database import db
+from utils.challenge_messages import challenge_messages
+from utils.outbound import outbound
+from utils.challenge_lifecycle import lifecycle
+from utils.gallery import build_collage, render_collages, render_collage_job
+from utils.job_queue import job_queue
+from utils.job_types import RenderCollageJob, WinnerDMJob
+from utils.timers import timers
+from utils.users import users
 from datetime import datetime, timedelta
 import random
 
+# Every statistic shown in the results embed, in one round trip. checkins has no challenge_id,
+# so the check-in leader counts the participants' check-ins within the challenge's dates.
+RESULTS_STATS_SQL = """
+    WITH challenge AS (
+        SELECT start_date::date AS first_day, end_date::date AS last_day
+        FROM challenges WHERE id = $1
+    ), participants AS (
+        SELECT user_id, current_weight, final_weight, submitted_final
+        FROM challenge_participants WHERE challenge_id = $1
+    ), totals AS (
+        SELECT COUNT(*) AS total_participants,
+               COUNT(*) FILTER (WHERE submitted_final) AS completed,
+               AVG(final_weight - current_weight) AS avg_weight_change
+        FROM participants
+    ), checkin_leader AS (
+        SELECT ck.user_id, COUNT(*) AS total
+        FROM participants p
+        JOIN checkins ck ON ck.user_id = p.user_id
+        JOIN challenge c ON ck.local_day BETWEEN c.first_day AND c.last_day
+        GROUP BY ck.user_id
+        ORDER BY total DESC
+        LIMIT 1
+    ), weight_loss_leader AS (
+        SELECT user_id, current_weight - final_weight AS diff
+        FROM participants
+        WHERE submitted_final AND current_weight IS NOT NULL AND final_weight IS NOT NULL
+        ORDER BY diff DESC
+        LIMIT 1
+    )
+    SELECT t.total_participants, t.completed, t.avg_weight_change,
+           cl.user_id AS checkin_leader_id, cl.total AS checkin_leader_total,
+           wl.user_id AS weight_loss_leader_id, wl.diff AS weight_loss_leader_diff
+    FROM totals t
+    LEFT JOIN checkin_leader cl ON TRUE
+    LEFT JOIN weight_loss_leader wl ON TRUE
+"""
+
+
+def _as_float(value):
+    return float(value) if value is not None else None
+
 
 class ChallengeVoting(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.check_voting_end.start()
+
+    def cog_load(self):
+        lifecycle.register("voting_end", self.on_voting_end)
+        timers.register("render_collage", render_collages)
+        job_queue.register(RenderCollageJob, render_collage_job)
+        job_queue.register(WinnerDMJob, self.send_winner_dm)
 
     async def start_voting(self, challenge_id, challenge_name, channel_id):
         """Post participant comparisons and start voting"""
-        channel = self.bot.get_channel(channel_id)
+        channel = await users.channel(channel_id)
         if not channel:
             print(f"Channel {channel_id} not found for voting")
             return
@@ -24,7 +82,7 @@ class ChallengeVoting(commands.Cog):
             participants = await conn.fetch("""
                 SELECT 
                     user_id, username, current_weight, goal_weight, 
-                    final_weight, personal_goal, initial_photos, final_photos
+                    final_weight, personal_goal, initial_photos, final_photos, collage_path
                 FROM challenge_participants
                 WHERE challenge_id = $1 
                 AND submitted_final = TRUE 
@@ -32,199 +90,353 @@ class ChallengeVoting(commands.Cog):
                 ORDER BY RANDOM()  -- Randomize order to prevent bias
             """, challenge_id)
 
-            if len(participants) < 2:
-                await channel.send(f"⚠️ Not enough participants completed **{challenge_name}**. Challenge cancelled.")
-                return
+        if len(participants) < 2:
+            await channel.send(f"⚠️ Not enough participants completed **{challenge_name}**. Challenge cancelled.")
+            return
 
-            # Create voting announcement
-            embed = discord.Embed(
-                title=f"🗳️ Voting for {challenge_name} Has Begun!",
-                description=(
-                    f"**{len(participants)} participants** completed the challenge!\n\n"
-                    "📊 **How to vote:**\n"
-                    "• React with ✅ on the participant(s) you think showed the best progress\n"
-                    "• You can vote for multiple participants\n"
-                    "• You cannot vote for yourself\n"
-                    "• Voting ends in 24 hours\n\n"
-                    "⬇️ **Scroll down to see all transformations!**"
-                ),
-                color=discord.Color.blue()
-            )
-            await channel.send(embed=embed)
+        # Collages are normally rendered during photo collection; only stragglers are built here
+        collages = {p['user_id']: p['collage_path'] for p in participants}
+        for participant in participants:
+            if not collages[participant['user_id']] or not os.path.exists(collages[participant['user_id']]):
+                try:
+                    collages[participant['user_id']] = await build_collage(
+                        challenge_id, participant['user_id'], participant['initial_photos'], participant['final_photos']
+                    )
+                except Exception as e:
+                    print(f"Error building collage for participant {participant['user_id']}: {e}")
+                    collages[participant['user_id']] = None
 
-            # Store message IDs for vote counting
-            voting_messages = []
+        # Create voting announcement
+        embed = discord.Embed(
+            title=f"🗳️ Voting for {challenge_name} Has Begun!",
+            description=(
+                f"**{len(participants)} participants** completed the challenge!\n\n"
+                "📊 **How to vote:**\n"
+                "• React with ✅ on the participant(s) you think showed the best progress\n"
+                "• You can vote for multiple participants\n"
+                "• You cannot vote for yourself\n"
+                "• Voting ends in 24 hours\n\n"
+                "⬇️ **Scroll down to see all transformations!**"
+            ),
+            color=discord.Color.blue()
+        )
+        await channel.send(embed=embed)
+
+        # One message per participant (embed + collage), posted in order so #1 lands above #2. Each
+        # post is indexed and saved as soon as it lands, so ✅ votes on it count during the upload.
+        voting_messages = []
+        for idx, participant in enumerate(participants, 1):
+            user = self.bot.get_user(participant['user_id'])
+            display_name = user.display_name if user else participant['username']
+            send = functools.partial(
+                self._post_participant, channel, idx, display_name, participant, collages[participant['user_id']]
+            )
+            try:
+                msg = await outbound.submit(
+                    f"channel:{channel.id}", [send, self._seed_vote], kind="voting_post",
+                    target_id=participant['user_id'], challenge_id=challenge_id, cost=2
+                )
+            except Exception as e:
+                print(f"Error posting voting entry for participant {participant['user_id']}: {e}")
+                continue
+
+            entry = {
+                'message_id': msg.id,
+                'user_id': participant['user_id'],
+                'participant_name': display_name
+            }
+            voting_messages.append(entry)
+            challenge_messages.set_voting(challenge_id, [entry])
+            async with db.pool.acquire() as conn:
+                await conn.execute("""
+                    UPDATE challenges SET voting_messages = $1 WHERE id = $2
+                """, json.dumps(voting_messages), challenge_id)
+            await lifecycle.notify()  # A gateway-only process reindexes voting posts on this
 
-            # Post each participant
-            for idx, participant in enumerate(participants, 1):
-                user = self.bot.get_user(participant['user_id'])
-                display_name = user.display_name if user else participant['username']
+        # Voting runs for 24 hours from the last post
+        async with db.pool.acquire() as conn:
+            await conn.execute("""
+                UPDATE challenges 
+                SET voting_end_time = NOW() + INTERVAL '24 hours'
+                WHERE id = $1
+            """, challenge_id)
 
-                # Calculate progress
-                weight_change = participant['final_weight'] - participant['current_weight']
-                weight_emoji = "📈" if weight_change > 0 else "📉" if weight_change < 0 else "➡️"
+    async def _post_participant(self, channel, idx, display_name, participant, collage_path):
+        """Post one participant's voting entry."""
+        # Calculate progress
+        weight_change = participant['final_weight'] - participant['current_weight']
+        weight_emoji = "📈" if weight_change > 0 else "📉" if weight_change < 0 else "➡️"
 
-                # Create comparison embed
-                embed = discord.Embed(
-                    title=f"Participant #{idx}: {display_name}",
-                    color=discord.Color.random()
-                )
+        # Create comparison embed
+        embed = discord.Embed(
+            title=f"Participant #{idx}: {display_name}",
+            color=discord.Color.random()
+        )
 
-                # Add stats
-                embed.add_field(
-                    name="📊 Stats",
-                    value=(
-                        f"**Starting Weight:** {participant['current_weight']} lbs\n"
-                        f"**Goal Weight:** {participant['goal_weight']} lbs\n"
-                        f"**Final Weight:** {participant['final_weight']} lbs\n"
-                        f"**Total Change:** {weight_change:+.1f} lbs {weight_emoji}"
-                    ),
-                    inline=False
-                )
+        # Add stats
+        embed.add_field(
+            name="📊 Stats",
+            value=(
+                f"**Starting Weight:** {participant['current_weight']} lbs\n"
+                f"**Goal Weight:** {participant['goal_weight']} lbs\n"
+                f"**Final Weight:** {participant['final_weight']} lbs\n"
+                f"**Total Change:** {weight_change:+.1f} lbs {weight_emoji}"
+            ),
+            inline=False
+        )
 
-                embed.add_field(
-                    name="🎯 Personal Goal",
-                    value=participant['personal_goal'] or "Not specified",
-                    inline=False
-                )
+        embed.add_field(
+            name="🎯 Personal Goal",
+            value=participant['personal_goal'] or "Not specified",
+            inline=False
+        )
 
-                # Post the embed first
-                msg = await channel.send(embed=embed)
+        if collage_path and os.path.exists(collage_path):
+            embed.set_image(url="attachment://before_after.webp")
+            msg = await channel.send(embed=embed, file=discord.File(collage_path, filename="before_after.webp"))
+        else:
+            msg = await channel.send(embed=embed)
+        return msg
+
+    @staticmethod
+    async def _seed_vote(msg):
+        """Add the voting reaction; a separate outbound step, so a retry doesn't post the entry again."""
+        await msg.add_reaction("✅")
+        return msg
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        """Record a ✅ on a voting post as a vote"""
+        if payload.emoji.name != "✅":
+            return
+        entry = challenge_messages.voting_entry(payload.message_id)
+        if entry is None:
+            return
+        challenge_id, participant_id = entry
+        # Bot reactions (including our own seed ✅) and self-votes never count
+        if payload.user_id == self.bot.user.id or (payload.member and payload.member.bot):
+            return
+        if payload.user_id == participant_id:
+            return
 
-                # Post before/after photos
-                try:
-                    # Get first 4 photos from each set
-                    initial_photos = participant['initial_photos'][:4] if participant['initial_photos'] else []
-                    final_photos = participant['final_photos'][:4] if participant['final_photos'] else []
-
-                    if initial_photos and final_photos:
-                        # Create comparison image files
-                        files = []
-
-                        # Before photos
-                        await channel.send("**📸 BEFORE:**")
-                        before_files = []
-                        for i, photo in enumerate(initial_photos):
-                            if os.path.exists(photo):
-                                before_files.append(discord.File(photo, filename=f"before_{i + 1}.jpg"))
-                        if before_files:
-                            await channel.send(files=before_files)
-
-                        # After photos
-                        await channel.send("**📸 AFTER:**")
-                        after_files = []
-                        for i, photo in enumerate(final_photos):
-                            if os.path.exists(photo):
-                                after_files.append(discord.File(photo, filename=f"after_{i + 1}.jpg"))
-                        if after_files:
-                            await channel.send(files=after_files)
+        async with db.pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO votes (challenge_id, voter_id, participant_id, message_id)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT DO NOTHING
+            """, challenge_id, payload.user_id, participant_id, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        """Withdraw the vote when its ✅ is removed"""
+        if payload.emoji.name != "✅":
+            return
+        entry = challenge_messages.voting_entry(payload.message_id)
+        if entry is None:
+            return
+        challenge_id, participant_id = entry
 
-                except Exception as e:
-                    print(f"Error posting photos for participant {participant['user_id']}: {e}")
+        async with db.pool.acquire() as conn:
+            await conn.execute("""
+                DELETE FROM votes
+                WHERE challenge_id = $1 AND voter_id = $2 AND participant_id = $3
+            """, challenge_id, payload.user_id, participant_id)
+
+    @app_commands.command(name="reconcile_votes",
+                          description="Rebuild a challenge's vote ledger from the ✅ reactions on its voting posts")
+    @app_commands.describe(challenge_id="The challenge ID to reconcile")
+    @app_commands.default_permissions(administrator=True)
+    async def reconcile_votes(self, interaction: discord.Interaction, challenge_id: int):
+        """Admin command to backfill votes missed while the bot was offline (and drop withdrawn ones)"""
+        await interaction.response.defer(ephemeral=True)
+
+        try:
+            async with db.pool.acquire() as conn:
+                challenge = await conn.fetchrow("""
+                    SELECT name, channel_id, voting_messages FROM challenges WHERE id = $1
+                """, challenge_id)
 
-                # Add voting reaction
-                await msg.add_reaction("✅")
+            if not challenge or not challenge['voting_messages']:
+                await interaction.followup.send(f"❌ Challenge `{challenge_id}` has no voting posts!", ephemeral=True)
+                return
 
-                # Store message info
-                voting_messages.append({
-                    'message_id': msg.id,
-                    'user_id': participant['user_id'],
-                    'participant_name': display_name
-                })
+            channel = self.bot.get_channel(challenge['channel_id'])
+            if not channel:
+                await interaction.followup.send("❌ Voting channel not found!", ephemeral=True)
+                return
 
-                # Add separator
-                await channel.send("━" * 40)
+            voter_ids, participant_ids, message_ids = [], [], []
+            checked, missing = [], 0
+            for msg_info in json.loads(challenge['voting_messages']):
+                try:
+                    message = await channel.fetch_message(msg_info['message_id'])
+                except discord.NotFound:
+                    # A deleted post: reconcile the rest and leave its recorded votes alone
+                    print(f"⚠️ [Voting] Voting post {msg_info['message_id']} for challenge {challenge_id} is gone")
+                    missing += 1
+                    continue
+                checked.append(msg_info['user_id'])
+                reaction = discord.utils.get(message.reactions, emoji="✅")
+                if reaction is None:
+                    continue
+                async for user in reaction.users():
+                    if not user.bot and user.id != msg_info['user_id']:
+                        voter_ids.append(user.id)
+                        participant_ids.append(msg_info['user_id'])
+                        message_ids.append(msg_info['message_id'])
 
-            # Save voting message IDs to database
             async with db.pool.acquire() as conn:
-                await conn.execute("""
-                    UPDATE challenges 
-                    SET voting_messages = $1,
-                        voting_end_time = NOW() + INTERVAL '24 hours'
-                    WHERE id = $2
-                """, voting_messages, challenge_id)
-
-    @tasks.loop(hours=1)
-    async def check_voting_end(self):
-        """Check if voting period has ended and calculate results"""
-        async with db.pool.acquire() as conn:
-            ended_votings = await conn.fetch("""
-                SELECT id, name, channel_id, voting_messages 
-                FROM challenges 
-                WHERE voting_started = TRUE 
-                AND results_posted = FALSE
-                AND voting_end_time <= NOW()
-            """)
-
-            for challenge in ended_votings:
-                await self.calculate_results(
-                    challenge['id'],
-                    challenge['name'],
-                    challenge['channel_id'],
-                    challenge['voting_messages']
-                )
+                async with conn.transaction():
+                    removed = await conn.fetchval("""
+                        WITH reacted AS (
+                            SELECT * FROM unnest($2::bigint[], $3::bigint[]) AS r(voter_id, participant_id)
+                        ), deleted AS (
+                            DELETE FROM votes v
+                            WHERE v.challenge_id = $1
+                            AND v.participant_id = ANY($4::bigint[])
+                            AND NOT EXISTS (
+                                SELECT 1 FROM reacted r
+                                WHERE r.voter_id = v.voter_id AND r.participant_id = v.participant_id
+                            )
+                            RETURNING 1
+                        )
+                        SELECT COUNT(*) FROM deleted
+                    """, challenge_id, voter_ids, participant_ids, checked)
+                    added = await conn.fetchval("""
+                        WITH inserted AS (
+                            INSERT INTO votes (challenge_id, voter_id, participant_id, message_id)
+                            SELECT $1, r.voter_id, r.participant_id, r.message_id
+                            FROM unnest($2::bigint[], $3::bigint[], $4::bigint[]) AS r(voter_id, participant_id, message_id)
+                            ON CONFLICT DO NOTHING
+                            RETURNING 1
+                        )
+                        SELECT COUNT(*) FROM inserted
+                    """, challenge_id, voter_ids, participant_ids, message_ids)
+
+            embed = discord.Embed(
+                title="✅ Votes Reconciled",
+                description=(
+                    f"**Challenge:** {challenge['name']}\n"
+                    f"**Votes on posts:** {len(voter_ids)}\n"
+                    f"**Added:** {added}\n"
+                    f"**Removed:** {removed}"
+                    + (f"\n**Missing posts skipped:** {missing}" if missing else "")
+                ),
+                color=discord.Color.green()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            print(f"❌ [Voting] reconcile_votes error: {e}")
+            await interaction.followup.send(f"❌ An error occurred: {str(e)}", ephemeral=True)
+
+    async def on_voting_end(self, challenge):
+        """Lifecycle handler: voting time is up, so count votes and post results"""
+        await self.calculate_results(
+            challenge['id'],
+            challenge['name'],
+            challenge['channel_id'],
+            challenge['voting_messages']
+        )
 
     async def calculate_results(self, challenge_id, challenge_name, channel_id, voting_messages):
         """Count votes and determine winners"""
-        channel = self.bot.get_channel(channel_id)
+        channel = await users.channel(channel_id)
         if not channel:
             return
 
-        vote_counts = {}
-        voter_tracker = {}  # Track who voted for whom
+        if isinstance(voting_messages, str):
+            voting_messages = json.loads(voting_messages)
 
-        # Count votes from each message
-        for msg_info in voting_messages:
-            try:
-                message = await channel.fetch_message(msg_info['message_id'])
-
-                # Get the check mark reaction
-                for reaction in message.reactions:
-                    if str(reaction.emoji) == "✅":
-                        users = []
-                        async for user in reaction.users():
-                            if not user.bot and user.id != msg_info['user_id']:  # Prevent self-voting
-                                users.append(user)
-
-                                # Track votes
-                                if user.id not in voter_tracker:
-                                    voter_tracker[user.id] = []
-                                voter_tracker[user.id].append(msg_info['user_id'])
-
-                        vote_counts[msg_info['user_id']] = {
-                            'count': len(users),
-                            'name': msg_info['participant_name']
-                        }
-                        break
+        # Votes were recorded as they were cast, so the tally is one query, however many voters
+        async with db.pool.acquire() as conn:
+            tallies = await conn.fetch("""
+                SELECT participant_id, COUNT(*) AS votes
+                FROM votes
+                WHERE challenge_id = $1
+                GROUP BY participant_id
+            """, challenge_id)
+        tallies = {row['participant_id']: row['votes'] for row in tallies}
 
-            except Exception as e:
-                print(f"Error counting votes for message {msg_info['message_id']}: {e}")
+        vote_counts = {
+            msg_info['user_id']: {
+                'count': tallies.get(msg_info['user_id'], 0),
+                'name': msg_info['participant_name']
+            }
+            for msg_info in voting_messages
+        }
 
         # Sort by vote count
-        sorted_results = sorted(vote_counts.items(), key=lambda x: x['count'], reverse=True)
+        sorted_results = sorted(vote_counts.items(), key=lambda x: x[1]['count'], reverse=True)
 
         # Handle ties with AI analysis if needed
         final_results = await self.handle_ties(sorted_results, challenge_id)
 
-        # Post results
-        await self.post_results(challenge_id, challenge_name, channel, final_results)
+        # Ranks, stats and the finished record are written together, then posted from the record
+        record = await self.save_results(challenge_id, challenge_name, final_results)
+        challenge_messages.remove_challenge(challenge_id)
+        await self.post_results(challenge_id, channel, record)
+
+    async def save_results(self, challenge_id, challenge_name, final_results):
+        """Store ranks and vote counts, compute the embed stats and cache the results record, in one transaction"""
+        user_ids = [user_id for user_id, _ in final_results]
+        results = [
+            {'user_id': user_id, 'name': data['name'], 'count': data['count'], 'ai_reason': data.get('ai_reason')}
+            for user_id, data in final_results
+        ]
 
-        # Update database
         async with db.pool.acquire() as conn:
-            # Mark challenge as completed
-            await conn.execute("""
-                UPDATE challenges 
-                SET status = 'completed', results_posted = TRUE 
-                WHERE id = $1
-            """, challenge_id)
+            async with conn.transaction():
+                await conn.execute("""
+                    UPDATE challenge_participants cp
+                    SET final_rank = r.rank, votes_received = r.votes
+                    FROM unnest($2::bigint[], $3::int[], $4::int[]) AS r(user_id, rank, votes)
+                    WHERE cp.challenge_id = $1 AND cp.user_id = r.user_id
+                """, challenge_id, user_ids, list(range(1, len(user_ids) + 1)),
+                    [r['count'] for r in results])
+
+                row = await conn.fetchrow(RESULTS_STATS_SQL, challenge_id)
+                stats = {
+                    'total_participants': row['total_participants'],
+                    'completed': row['completed'],
+                    'avg_weight_change': _as_float(row['avg_weight_change']),
+                    'checkin_leader': {
+                        'user_id': row['checkin_leader_id'], 'total': row['checkin_leader_total']
+                    } if row['checkin_leader_id'] else None,
+                    'weight_loss_leader': {
+                        'user_id': row['weight_loss_leader_id'], 'diff': _as_float(row['weight_loss_leader_diff'])
+                    } if row['weight_loss_leader_id'] else None,
+                }
 
-            # Save rankings
-            for rank, (user_id, data) in enumerate(final_results, 1):
                 await conn.execute("""
-                    UPDATE challenge_participants 
-                    SET final_rank = $1, votes_received = $2 
-                    WHERE challenge_id = $3 AND user_id = $4
-                """, rank, data['count'], challenge_id, user_id)
+                    INSERT INTO challenge_results (challenge_id, challenge_name, results, stats)
+                    VALUES ($1, $2, $3::jsonb, $4::jsonb)
+                    ON CONFLICT (challenge_id) DO UPDATE
+                    SET challenge_name = EXCLUDED.challenge_name, results = EXCLUDED.results,
+                        stats = EXCLUDED.stats, created_at = NOW()
+                """, challenge_id, challenge_name, json.dumps(results), json.dumps(stats))
+
+                await conn.execute("""
+                    UPDATE challenges 
+                    SET status = 'completed', results_posted = TRUE 
+                    WHERE id = $1
+                """, challenge_id)
+
+        return {'challenge_name': challenge_name, 'results': results, 'stats': stats}
+
+    async def load_results(self, challenge_id):
+        """The cached results record for a completed challenge, or None"""
+        async with db.pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT challenge_name, results, stats FROM challenge_results WHERE challenge_id = $1
+            """, challenge_id)
+        if not row:
+            return None
+        return {
+            'challenge_name': row['challenge_name'],
+            'results': json.loads(row['results']),
+            'stats': json.loads(row['stats'])
+        }
 
     async def handle_ties(self, sorted_results, challenge_id):
         """Handle tied positions using AI image analysis"""
@@ -279,11 +491,10 @@ class ChallengeVoting(commands.Cog):
         # Return sorted list with AI reasoning
         return [(e['user_id'], {**e['data'], 'ai_reason': e['reason']}) for e in evaluations]
 
-    async def post_results(self, challenge_id, challenge_name, channel, results):
-        """Post final challenge results"""
-        # Create results embed
+    def results_embed(self, record):
+        """Build the results embed from a results record"""
         embed = discord.Embed(
-            title=f"🏆 {challenge_name} Results!",
+            title=f"🏆 {record['challenge_name']} Results!",
             description="Congratulations to all participants!",
             color=discord.Color.gold()
         )
@@ -292,14 +503,14 @@ class ChallengeVoting(commands.Cog):
         medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
 
         # Add top 5 (or all if less than 5)
-        for idx, (user_id, data) in enumerate(results[:5]):
+        for idx, entry in enumerate(record['results'][:5]):
             medal = medals[idx] if idx < len(medals) else f"{idx + 1}."
-            user = self.bot.get_user(user_id)
-            name = user.mention if user else data['name']
+            user = self.bot.get_user(entry['user_id'])
+            name = user.mention if user else entry['name']
 
-            field_value = f"**Votes:** {data['count']}"
-            if 'ai_reason' in data:
-                field_value += f"\n*AI Note: {data['ai_reason']}*"
+            field_value = f"**Votes:** {entry['count']}"
+            if entry.get('ai_reason'):
+                field_value += f"\n*AI Note: {entry['ai_reason']}*"
 
             embed.add_field(
                 name=f"{medal} {name}",
@@ -308,45 +519,20 @@ class ChallengeVoting(commands.Cog):
             )
 
         # Add participation stats
-        async with db.pool.acquire() as conn:
-            stats = await conn.fetchrow("""
-                SELECT 
-                    COUNT(*) as total_participants,
-                    COUNT(CASE WHEN submitted_final = TRUE THEN 1 END) as completed,
-                    AVG(final_weight - current_weight) as avg_weight_change
-                FROM challenge_participants
-                WHERE challenge_id = $1
-            """, challenge_id)
-
+        stats = record['stats']
+        avg_change = stats['avg_weight_change']
         embed.add_field(
             name="📊 Challenge Statistics",
             value=(
                 f"**Total Participants:** {stats['total_participants']}\n"
                 f"**Completed:** {stats['completed']}\n"
-                f"**Average Weight Change:** {stats['avg_weight_change']:.1f} lbs"
+                f"**Average Weight Change:** "
+                f"{f'{avg_change:.1f} lbs' if avg_change is not None else 'N/A'}"
             ),
             inline=False
         )
 
-        # Most Check-ins
-        checkin_leader = await conn.fetchrow("""
-            SELECT user_id, COUNT(*) AS total 
-            FROM checkins 
-            WHERE challenge_id = $1 
-            GROUP BY user_id 
-            ORDER BY total DESC 
-            LIMIT 1
-        """, challenge_id)
-
-        # Biggest Weight Loss
-        weight_loss_leader = await conn.fetchrow("""
-            SELECT user_id, (current_weight - final_weight) AS diff 
-            FROM challenge_participants 
-            WHERE challenge_id = $1 AND submitted_final = TRUE 
-            ORDER BY diff DESC 
-            LIMIT 1
-        """, challenge_id)
-
+        checkin_leader = stats['checkin_leader']
         if checkin_leader:
             user = self.bot.get_user(checkin_leader['user_id'])
             embed.add_field(
@@ -355,6 +541,7 @@ class ChallengeVoting(commands.Cog):
                 inline=False
             )
 
+        weight_loss_leader = stats['weight_loss_leader']
         if weight_loss_leader:
             user = self.bot.get_user(weight_loss_leader['user_id'])
             embed.add_field(
@@ -364,23 +551,50 @@ class ChallengeVoting(commands.Cog):
             )
 
         embed.set_footer(text="Thank you all for participating! 💪")
+        return embed
 
-        await channel.send(embed=embed)
+    async def post_results(self, challenge_id, channel, record, notify_winners=True):
+        """Post final challenge results from a results record"""
+        await channel.send(embed=self.results_embed(record))
 
-        # Notify winners via DM
-        for idx, (user_id, data) in enumerate(results[:3]):
-            user = self.bot.get_user(user_id)
-            if user:
-                try:
-                    position = ["1st", "2nd", "3rd"][idx]
-                    dm = await user.create_dm()
-                    await dm.send(
-                        f"🎉 Congratulations! You placed **{position}** in {challenge_name}! "
-                        f"You received {data['count']} votes. Great job! 💪"
-                    )
-                except:
-                    pass
+        if not notify_winners:
+            return
+
+        # Notify winners via DM as durable jobs, so a crash or a failed send doesn't skip anyone
+        for idx, entry in enumerate(record['results'][:3]):
+            await job_queue.enqueue(WinnerDMJob(
+                challenge_id, record['challenge_name'], entry['user_id'],
+                ["1st", "2nd", "3rd"][idx], entry['count']
+            ))
+
+    async def send_winner_dm(self, job):
+        """Job handler: congratulate one winner (raises on failure so the job is retried)"""
+        await outbound.submit_dm(
+            job.user_id,
+            f"🎉 Congratulations! You placed **{job.position}** in {job.challenge_name}! "
+            f"You received {job.votes} votes. Great job! 💪",
+            kind="winner_dm", challenge_id=job.challenge_id
+        )
+
+    @app_commands.command(name="repost_results", description="Re-post a completed challenge's results")
+    @app_commands.describe(challenge_id="The challenge ID whose results to re-post")
+    @app_commands.default_permissions(administrator=True)
+    async def repost_results(self, interaction: discord.Interaction, challenge_id: int):
+        """Admin command to re-post results from the cached record, without recounting or re-DMing winners"""
+        await interaction.response.defer(ephemeral=True)
+
+        try:
+            record = await self.load_results(challenge_id)
+            if not record:
+                await interaction.followup.send(f"❌ No results recorded for challenge `{challenge_id}`!", ephemeral=True)
+                return
+
+            await self.post_results(challenge_id, interaction.channel, record, notify_winners=False)
+            await interaction.followup.send(f"✅ Re-posted results for **{record['challenge_name']}**", ephemeral=True)
 
+        except Exception as e:
+            print(f"❌ [Voting] repost_results error: {e}")
+            await interaction.followup.send(f"❌ An error occurred: {str(e)}", ephemeral=True)
 
 async def setup(bot):
     await bot.add_cog(ChallengeVoting(bot))
\ No newline at end of file
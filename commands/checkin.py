@@ -2,38 +2,34 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import asyncio
-import hashlib
 import os
 from database import db
-from PIL import Image
-
-IMAGE_FOLDER = "checkin_images"
-MAX_IMAGE_SIZE = (600, 600)
+from utils.image_pipeline import ImagePipelineBusy, BUSY_MESSAGE
+from utils.image_store import hash_image, store_image, release_image
+from utils.conversations import conversations, ConversationCancelled
+from utils.phash_index import phash_index
+from utils.job_queue import job_queue
+from utils.job_types import CheckinCleanupJob
+from utils.users import users
 
 class CheckIn(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.previous_images = {}
 
-    def hash_image(self, image_bytes):
-        return hashlib.md5(image_bytes).hexdigest()
-
-    def save_image_locally(self, user_id, image_hash, image_bytes):
-        user_folder = os.path.join(IMAGE_FOLDER, str(user_id))
-        os.makedirs(user_folder, exist_ok=True)
-
-        original_path = os.path.join(user_folder, f"{image_hash}.webp")
-        with open(original_path, "wb") as f:
-            f.write(image_bytes)
-
-        try:
-            img = Image.open(original_path)
-            img.thumbnail(MAX_IMAGE_SIZE, Image.LANCZOS)
-            img.save(original_path, "WEBP", quality=85, optimize=True)
-        except Exception as e:
-            print(f"Error compressing image {original_path}: {e}")
+    def cog_load(self):
+        job_queue.register(CheckinCleanupJob, self.cleanup_checkin_messages)
 
-        return original_path
+    async def cleanup_checkin_messages(self, job):
+        """Job handler: delete a finished check-in's upload and prompt messages"""
+        channel = await users.channel(job.channel_id)
+        if channel is None:
+            return
+        for message_id in job.message_ids:
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.NotFound:
+                pass  # Already gone
 
     @app_commands.command(name="checkin", description="Log a check-in for gym, weight, or food.")
     @app_commands.choices(
@@ -44,7 +40,14 @@ class CheckIn(commands.Cog):
         ]
     )
     async def checkin(self, interaction: discord.Interaction, category: app_commands.Choice[str]):
-        category = category.value
+        # Replies in this channel are routed straight to this check-in; a newer /checkin here supersedes it
+        with conversations.open(interaction.user.id, interaction.channel_id) as conversation:
+            try:
+                await self.run_checkin(interaction, category.value, conversation)
+            except ConversationCancelled:
+                print(f"⚠️ [CheckIn] Check-in for {interaction.user.name} superseded by a newer one")
+
+    async def run_checkin(self, interaction: discord.Interaction, category, conversation):
         user_id = interaction.user.id
         username = interaction.user.name
 
@@ -64,10 +67,10 @@ class CheckIn(commands.Cog):
         prompt_message = await interaction.followup.send(prompt_text)
 
         def text_check(m):
-            return m.author.id == user_id and not m.attachments
+            return not m.attachments
 
         try:
-            message = await self.bot.wait_for("message", timeout=30.0, check=text_check)
+            message = await conversation.next_message(text_check, timeout=30.0)
             response_text = message.content
             await message.delete()
             await prompt_message.delete()
@@ -87,26 +90,32 @@ class CheckIn(commands.Cog):
         upload_prompt = await interaction.followup.send(f"✅ **{category.capitalize()} check-in started!** Now, please upload a photo.")
 
         def image_check(m):
-            return m.author.id == user_id and any(a.content_type.startswith("image/") for a in m.attachments)
+            return any(a.content_type and a.content_type.startswith("image/") for a in m.attachments)
 
         try:
-            image_message = await self.bot.wait_for("message", timeout=60.0, check=image_check)
+            image_message = await conversation.next_message(image_check, timeout=60.0)
             attachment = image_message.attachments[0]
 
             image_bytes = await attachment.read()
-            image_hash = self.hash_image(image_bytes)
-            image_path = self.save_image_locally(user_id, image_hash, image_bytes)
+            image_hash = hash_image(image_bytes)
 
-            async with db.pool.acquire() as conn:
-                existing_checkin = await conn.fetchrow(
-                    "SELECT * FROM checkins WHERE user_id = $1 AND image_hash = $2",
-                    user_id, image_hash
-                )
-
-            if existing_checkin:
+            # Reject re-used images before spending any disk or CPU on them
+            if await db.has_checkin_image(user_id, image_hash):
                 await interaction.followup.send("⚠️ You have already used this image for a check-in. Please upload a new one.")
                 return
 
+            try:
+                image_hash, image_path, phash = await store_image(image_bytes, image_hash)
+            except ImagePipelineBusy:
+                await interaction.followup.send(BUSY_MESSAGE)
+                return
+
+            # Catch re-saved, resized or lightly cropped copies the exact hash misses
+            if phash is not None and await phash_index.find_near_duplicate(user_id, phash) is not None:
+                await release_image(image_hash)
+                await interaction.followup.send("⚠️ This photo looks almost identical to one you've already used for a check-in. Please upload a new one.")
+                return
+
             if category == "weight":
                 result = await db.log_checkin(
                     user_id, username, category, image_hash, image_path,
@@ -124,11 +133,15 @@ class CheckIn(commands.Cog):
                 )
 
             if result not in ["success_with_point", "success_no_point"]:
+                await release_image(image_hash)
                 await interaction.followup.send("❌ There was an error logging your check-in. Please try again.")
                 return
 
-            await image_message.delete()
-            await upload_prompt.delete()
+            if phash is not None:
+                await phash_index.add(user_id, phash)
+
+            # Tidying up the conversation is left to a worker, so the confirmation isn't held up
+            await job_queue.enqueue(CheckinCleanupJob(interaction.channel_id, [image_message.id, upload_prompt.id]))
 
             if not os.path.exists(image_path):
                 print(f"❌ Image file not found: {image_path}")
@@ -5,6 +5,7 @@ from discord.ui import View, Button
 import os
 import uuid
 from database import db
+from utils.conversations import conversations
 
 PR_VIDEO_FOLDER = "pr_videos"
 
@@ -57,10 +58,11 @@ class PRConfirmationView(View):
         await interaction.followup.send("✅ Please upload a **video (max 30s)** of your PR attempt.")
 
         def check(m):
-            return m.author.id == self.user_id and m.attachments and m.attachments[0].content_type.startswith("video/")
+            return m.attachments and (m.attachments[0].content_type or "").startswith("video/")
 
         try:
-            message = await interaction.client.wait_for("message", timeout=240.0, check=check)
+            with conversations.open(self.user_id, interaction.channel_id) as conversation:
+                message = await conversation.next_message(check, timeout=240.0)
             attachment = message.attachments[0]
 
             user_folder = os.path.join(PR_VIDEO_FOLDER, str(self.user_id))
@@ -67,12 +67,7 @@ class ProfileView(View):
             return
 
         await interaction.response.defer()
-        checkins = await db.get_user_checkins(self.user.id, category)
-        if not checkins:
-            await interaction.followup.send(f"🚫 {self.user.mention} has no {category} check-ins yet!")
-            return
-
-        await checkin_cog.send_checkin_page(interaction, checkins, page=0, category=category, target_user=self.user)
+        await checkin_cog.send_checkin_page(interaction, category=category, target_user=self.user)
 
     async def _handle_pr(self, interaction, lift):
         try:
@@ -148,15 +143,21 @@ async def setup(bot):
 
 
 # Profile Embed Generator
+MEDALS = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣"]
+
+
 async def generate_profile_embeds(user, bot, interaction):
-    user_id = user.id
-    points = await db.get_user_points(user_id)
-    progress = await db.get_progress(user_id)
-    gym = progress.get("total_gym_checkins", 0)
-    food = progress.get("total_food_logs", 0)
-    first_weight, recent_weight, weight_change = await db.get_weight_change(user_id)
-    trend = "🔼" if weight_change > 0 else "🔽" if weight_change < 0 else "⚖️"
-    weight_display = f"{weight_change} lbs {trend} (**{recent_weight} lbs**)" if recent_weight else "⚖️ No weight data"
+    snapshot = await db.get_profile_snapshot(user.id)
+    points = snapshot["points"]
+    gym = snapshot["total_gym_checkins"]
+    food = snapshot["total_food_logs"]
+    recent_weight = snapshot["recent_weight"]
+    weight_change = snapshot["weight_change"]
+    if recent_weight is not None:
+        trend = "🔼" if weight_change > 0 else "🔽" if weight_change < 0 else "⚖️"
+        weight_display = f"{weight_change} lbs {trend} (**{recent_weight} lbs**)"
+    else:
+        weight_display = "⚖️ No weight data"
 
     embed1 = discord.Embed(
         title=f"📋 {user.display_name}'s Profile – Page 1",
@@ -171,19 +172,17 @@ async def generate_profile_embeds(user, bot, interaction):
     embed1.add_field(name="⚖️ Weight Change", value=weight_display, inline=False)
     embed1.set_footer(text="Page 1/2 – Click 'Next' for PRs")
 
-    rankings = await db.get_pr_rankings()
-    pr_data = await db.get_personal_records(user_id)
+    await db.pr_rankings.refresh_if_stale(db.pool)
 
     def get_medal(lift_type):
-        sorted_prs = rankings.get(lift_type, [])
-        for idx, (u_id, _) in enumerate(sorted_prs[:8]):
-            if u_id == user_id:
-                return ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣"][idx]
+        rank = db.pr_rankings.rank(user.id, lift_type)
+        if rank is not None and rank <= len(MEDALS):
+            return MEDALS[rank - 1]
         return "🏆"
 
-    deadlift = pr_data["deadlift"] or 0 if pr_data else 0
-    bench = pr_data["bench"] or 0 if pr_data else 0
-    squat = pr_data["squat"] or 0 if pr_data else 0
+    deadlift = snapshot["prs"]["deadlift"] or 0
+    bench = snapshot["prs"]["bench"] or 0
+    squat = snapshot["prs"]["squat"] or 0
 
     embed2 = discord.Embed(
         title=f"🏋️ {user.display_name}'s Personal Records – Page 2",
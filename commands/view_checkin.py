@@ -25,23 +25,25 @@ class ViewCheckIn(commands.Cog):
     async def view_checkins(self, interaction: discord.Interaction, category: app_commands.Choice[str], member: discord.Member = None):
         category = category.value
         target_user = member if member else interaction.user
-        target_user_id = target_user.id
 
         await interaction.response.defer()
+        await self.send_checkin_page(interaction, category=category, target_user=target_user)
 
-        checkins = await db.get_user_checkins(target_user_id, category)
-        if not checkins:
-            await interaction.followup.send(f"🚫 {target_user.mention} has no {category} check-ins yet!")
-            return
-
-        await self.send_checkin_page(interaction, checkins, page=0, category=category, target_user=target_user)
-
-    async def send_checkin_page(self, interaction, checkins, page, category, target_user):
+    async def send_checkin_page(self, interaction, category, target_user, cursors=None):
+        """Render one page of check-ins. cursors[-1] is the cursor of the page to show (None for the first)."""
+        cursors = cursors or [None]
         try:
-            total_pages = math.ceil(len(checkins) / CHECKINS_PER_PAGE)
-            start_idx = page * CHECKINS_PER_PAGE
-            end_idx = start_idx + CHECKINS_PER_PAGE
-            checkins_on_page = checkins[start_idx:end_idx]
+            checkins, has_more, next_cursor = await db.get_user_checkins_page(
+                target_user.id, category, cursor=cursors[-1], limit=CHECKINS_PER_PAGE
+            )
+            if not checkins and len(cursors) == 1:
+                await interaction.followup.send(f"🚫 {target_user.mention} has no {category} check-ins yet!")
+                return
+
+            page = len(cursors) - 1
+            stats = await db.get_user_stats(target_user.id)
+            total = stats[f"{category}_checkins"] if stats else 0
+            total_pages = max(math.ceil(total / CHECKINS_PER_PAGE), page + 1)
 
             embed = discord.Embed(
                 title=f"📜 {target_user.display_name}'s {category.capitalize()} Check-Ins (Page {page + 1}/{total_pages})",
@@ -50,7 +52,7 @@ class ViewCheckIn(commands.Cog):
 
             image_files = []
 
-            for idx, checkin in enumerate(checkins_on_page, start=start_idx + 1):
+            for checkin in checkins:
                 timestamp = checkin["timestamp"].strftime("%Y-%m-%d %H:%M")
                 details = f"**{timestamp}**\n"
 
@@ -69,8 +71,8 @@ class ViewCheckIn(commands.Cog):
 
             # Pagination
             view = None
-            if total_pages > 1:
-                view = PaginationButtons(self, checkins, page, category, target_user)
+            if page > 0 or has_more:
+                view = PaginationButtons(self, cursors, next_cursor, category, target_user)
 
             # Add Back to Profile button
             combined_view = view or BackToProfileButton(target_user, interaction.client)
@@ -86,16 +88,16 @@ class ViewCheckIn(commands.Cog):
 
 
 class PaginationButtons(discord.ui.View):
-    def __init__(self, cog, checkins, page, category, target_user):
+    def __init__(self, cog, cursors, next_cursor, category, target_user):
         super().__init__(timeout=600)
         self.cog = cog
-        self.checkins = checkins
-        self.page = page
+        self.cursors = cursors  # Cursor of every page up to the current one, for going back
+        self.next_cursor = next_cursor
         self.category = category
         self.target_user = target_user
 
-        self.previous.disabled = page == 0
-        self.next.disabled = (page + 1) * CHECKINS_PER_PAGE >= len(checkins)
+        self.previous.disabled = len(cursors) == 1
+        self.next.disabled = next_cursor is None
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         return True
@@ -103,12 +105,12 @@ class PaginationButtons(discord.ui.View):
     @discord.ui.button(label="Previous", style=discord.ButtonStyle.primary)
     async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
-        await self.cog.send_checkin_page(interaction, self.checkins, self.page - 1, self.category, self.target_user)
+        await self.cog.send_checkin_page(interaction, self.category, self.target_user, self.cursors[:-1])
 
     @discord.ui.button(label="Next", style=discord.ButtonStyle.primary)
     async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
-        await self.cog.send_checkin_page(interaction, self.checkins, self.page + 1, self.category, self.target_user)
+        await self.cog.send_checkin_page(interaction, self.category, self.target_user, self.cursors + [self.next_cursor])
 
 
 class BackToProfileButton(discord.ui.View):
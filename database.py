@@ -1,13 +1,88 @@
 import asyncpg
+import base64
 import os
 import pytz  # Library for timezone conversion
 from datetime import datetime, timedelta
+from utils.pr_rankings import PRRankingCache
 
 EST = pytz.timezone("America/New_York")  # Define Eastern Standard Time
 
+USER_STATS_COLUMNS = (
+    "points", "total_checkins", "gym_checkins", "food_checkins", "weight_checkins",
+    "first_weight", "first_weight_at", "last_weight", "last_weight_at", "last_gym_at", "last_food_at"
+)
+
+# Recomputes the user_stats rollup from the full checkins history. Points follow the
+# same rule as log_checkin(): one per category per Eastern day, weight once per
+# Saturday-to-Friday week.
+USER_STATS_ROLLUP_SQL = """
+    SELECT
+        user_id,
+        (COUNT(DISTINCT category || ':' || local_day::TEXT) FILTER (WHERE category <> 'weight')
+         + COUNT(DISTINCT local_week) FILTER (WHERE category = 'weight'))::INT AS points,
+        COUNT(*)::INT AS total_checkins,
+        COUNT(*) FILTER (WHERE category = 'gym')::INT AS gym_checkins,
+        COUNT(*) FILTER (WHERE category = 'food')::INT AS food_checkins,
+        COUNT(*) FILTER (WHERE category = 'weight')::INT AS weight_checkins,
+        (ARRAY_AGG(weight ORDER BY timestamp ASC) FILTER (WHERE weight IS NOT NULL))[1] AS first_weight,
+        MIN(timestamp) FILTER (WHERE weight IS NOT NULL) AS first_weight_at,
+        (ARRAY_AGG(weight ORDER BY timestamp DESC) FILTER (WHERE weight IS NOT NULL))[1] AS last_weight,
+        MAX(timestamp) FILTER (WHERE weight IS NOT NULL) AS last_weight_at,
+        MAX(timestamp) FILTER (WHERE category = 'gym') AS last_gym_at,
+        MAX(timestamp) FILTER (WHERE category = 'food') AS last_food_at
+    FROM checkins
+    GROUP BY user_id
+"""
+
+# Rebuild sources for the weight summaries log_checkin() maintains (see 0015_weight_summary.sql).
+WEIGHT_SUMMARY_ROLLUP_SQL = """
+    SELECT
+        user_id,
+        (ARRAY_AGG(weight ORDER BY timestamp ASC))[1] AS first_weight,
+        MIN(timestamp) AS first_weight_at,
+        (ARRAY_AGG(weight ORDER BY timestamp DESC))[1] AS latest_weight,
+        MAX(timestamp) AS latest_weight_at
+    FROM checkins
+    WHERE category = 'weight' AND weight IS NOT NULL
+    GROUP BY user_id
+"""
+WEIGHT_WEEKS_ROLLUP_SQL = """
+    SELECT DISTINCT ON (user_id, local_week)
+        user_id, local_week, weight AS last_weight, timestamp AS last_weight_at
+    FROM checkins
+    WHERE category = 'weight' AND weight IS NOT NULL AND local_week IS NOT NULL
+    ORDER BY user_id, local_week, timestamp DESC
+"""
+
+
+def checkin_window(now=None):
+    """Return (timestamp, local_day, local_week) for a check-in made at `now` (defaults to the current time).
+
+    timestamp is naive UTC as stored in checkins; local_day is the Eastern-time date and
+    local_week the Saturday that starts its weigh-in week.
+    """
+    now = now or datetime.now(pytz.utc)
+    local_day = now.astimezone(EST).date()
+    local_week = local_day - timedelta(days=(local_day.weekday() - 5) % 7)
+    return now.astimezone(pytz.utc).replace(tzinfo=None), local_day, local_week
+
+
+def encode_checkin_cursor(timestamp, checkin_id):
+    """Build the opaque pagination cursor that points just past a check-in row."""
+    raw = f"{timestamp.isoformat()}|{checkin_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_checkin_cursor(cursor):
+    """Turn a cursor from encode_checkin_cursor back into (timestamp, checkin_id)."""
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    timestamp, checkin_id = raw.rsplit("|", 1)
+    return datetime.fromisoformat(timestamp), int(checkin_id)
+
 class Database:
     def __init__(self):
         self.pool = None  # Database connection pool
+        self.pr_rankings = PRRankingCache()  # Filled by setup_hook, kept current by update_pr
 
     async def connect(self):
         """Connect to PostgreSQL database and confirm connection."""
@@ -20,33 +95,26 @@ class Database:
     async def check_cooldown(self, user_id, category):
         async with self.pool.acquire() as conn:
             try:
-                current_time_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
-                current_time_est = current_time_utc.astimezone(EST)
-                today_est = current_time_est.date()
+                _, local_day, local_week = checkin_window()
 
                 if category == "weight":
-                    weekday = current_time_est.weekday()
-                    if weekday == 5:
-                        window_start = EST.localize(current_time_est.replace(hour=0, minute=0, second=0, microsecond=0).replace(tzinfo=None))
-                    else:
-                        days_since_saturday = (weekday - 5) % 7
-                        dt = current_time_est - timedelta(days=days_since_saturday)
-                        window_start = EST.localize(dt.replace(hour=0, minute=0, second=0, microsecond=0).replace(tzinfo=None))
-
                     existing = await conn.fetchval("""
-                        SELECT COUNT(*) FROM checkins
-                        WHERE user_id = $1 AND category = $2 AND timestamp >= $3
-                    """, user_id, category, window_start)
+                        SELECT EXISTS (
+                            SELECT 1 FROM checkins
+                            WHERE user_id = $1 AND category = $2 AND local_week = $3
+                        )
+                    """, user_id, category, local_week)
 
                     if existing:
                         return "⚖️ You've already checked in for **weight** this week. Try again next Saturday!"
 
                 else:
                     already_earned = await conn.fetchval("""
-                        SELECT COUNT(*) FROM checkins
-                        WHERE user_id = $1 AND category = $2
-                        AND DATE(timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'America/New_York') = $3
-                    """, user_id, category, today_est)
+                        SELECT EXISTS (
+                            SELECT 1 FROM checkins
+                            WHERE user_id = $1 AND category = $2 AND local_day = $3
+                        )
+                    """, user_id, category, local_day)
 
                     if already_earned:
                         return f"⚠️ You've already earned a point today for **{category}**. This check-in will be recorded, but no additional points will be awarded."
@@ -77,127 +145,139 @@ class Database:
                 print(f"❌ Error adding user {username}: {e}")
 
     async def log_checkin(self, user_id, username, category, image_hash, image_path, workout=None, weight=None, meal=None):
+        """Record a check-in and award its point in one atomic round trip (log_checkin() is defined in database/migrations: 0002, redefined by 0004 and 0015)."""
         async with self.pool.acquire() as conn:
             try:
-                current_time_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
-                current_time_est = current_time_utc.astimezone(EST)
-                today_est = current_time_est.date()
-
-                if category == "weight":
-                    weekday = current_time_est.weekday()
-                    if weekday == 5:
-                        window_start_naive = datetime(current_time_est.year, current_time_est.month, current_time_est.day)
-                    else:
-                        days_since_saturday = (weekday - 5) % 7
-                        saturday = current_time_est - timedelta(days=days_since_saturday)
-                        window_start_naive = datetime(saturday.year, saturday.month, saturday.day)
-
-                    window_start = window_start_naive  # it's already in EST
-
-                    already_earned_point = await conn.fetchval("""
-                        SELECT COUNT(*) FROM checkins
-                        WHERE user_id = $1 AND category = $2 AND timestamp >= $3
-                    """, user_id, category, window_start)
-
-                    earned_point = already_earned_point == 0
-                else:
-                    already_earned_point = await conn.fetchval("""
-                        SELECT COUNT(*) FROM checkins
-                        WHERE user_id = $1 AND category = $2
-                        AND DATE(timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'America/New_York') = $3
-                    """, user_id, category, today_est)
-
-                    earned_point = already_earned_point == 0
-
-                await conn.execute("""
-                    INSERT INTO users (user_id, username, points)
-                    VALUES ($1, $2, 0)
-                    ON CONFLICT (user_id) DO UPDATE SET username = EXCLUDED.username
-                """, user_id, username)
-
-                await conn.execute("""
-                    INSERT INTO progress (user_id, total_gym_checkins, total_food_logs, total_weight_change)
-                    VALUES ($1, 0, 0, 0)
-                    ON CONFLICT (user_id) DO NOTHING
-                """, user_id)
-
-                await conn.execute("""
-                    INSERT INTO checkins (user_id, category, image_hash, image_path, workout, weight, meal, timestamp)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, NOW())
-                """, user_id, category, image_hash, image_path,
+                timestamp, local_day, local_week = checkin_window()
+                result = await conn.fetchval("""
+                    SELECT log_checkin($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+                """, user_id, username, category, image_hash, image_path,
                       workout if category in ("gym", "food", "weight") else None,
                       weight if category == "weight" else None,
-                      meal if category == "food" else None)
+                      meal if category == "food" else None,
+                      timestamp, local_day, local_week)
 
-                if category == "gym":
-                    await conn.execute("UPDATE progress SET total_gym_checkins = total_gym_checkins + 1 WHERE user_id = $1", user_id)
-                elif category == "food":
-                    await conn.execute("UPDATE progress SET total_food_logs = total_food_logs + 1 WHERE user_id = $1", user_id)
-                elif category == "weight":
-                    await conn.execute("UPDATE progress SET total_weight_change = $1 WHERE user_id = $2", weight, user_id)
-
-                if earned_point:
-                    await conn.execute("UPDATE users SET points = points + 1 WHERE user_id = $1", user_id)
+                if result == "success_with_point":
                     print(f"🏆 Point awarded to user {user_id}")
-                    return "success_with_point"
                 else:
                     print(f"✅ Check-in recorded for user {user_id}, but no point awarded (already earned this period)")
-                    return "success_no_point"
+                return result
 
             except Exception as e:
                 print(f"❌ Error logging check-in for user {user_id}: {e}")
                 return "error"
 
-    async def get_user_points(self, user_id):
-        """Calculate total points based on check-ins (excluding duplicates)."""
+    async def get_user_stats(self, user_id):
+        """Fetch the user's user_stats rollup row (None if they never checked in)."""
         async with self.pool.acquire() as conn:
-            try:
-                total_points = await conn.fetchval("""
-                    SELECT COUNT(*) FROM checkins 
-                    WHERE user_id = $1
-                """, user_id)
+            return await conn.fetchrow("SELECT * FROM user_stats WHERE user_id = $1", user_id)
 
-                return total_points if total_points else 0
-            except Exception as e:
-                print(f"❌ Error fetching points for user {user_id}: {e}")
-                return 0
+    async def get_user_points(self, user_id):
+        """Return the user's total check-in count from the user_stats rollup."""
+        try:
+            stats = await self.get_user_stats(user_id)
+            return stats["total_checkins"] if stats else 0
+        except Exception as e:
+            print(f"❌ Error fetching points for user {user_id}: {e}")
+            return 0
 
     async def get_progress(self, user_id):
-        """Retrieve user progress directly from checkins table instead of relying on progress table."""
+        """Retrieve gym and food totals from the user_stats rollup."""
+        try:
+            stats = await self.get_user_stats(user_id)
+            return {
+                "total_gym_checkins": stats["gym_checkins"] if stats else 0,
+                "total_food_logs": stats["food_checkins"] if stats else 0
+            }
+        except Exception as e:
+            print(f"❌ Error fetching progress for user {user_id}: {e}")
+            return None
+
+    async def rebuild_user_stats(self):
+        """Recompute user_stats and the weight summaries for every user from checkins in bulk statements."""
+        columns = ", ".join(USER_STATS_COLUMNS)
+        updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in USER_STATS_COLUMNS)
         async with self.pool.acquire() as conn:
-            try:
-                # Count total gym check-ins from checkins table
-                total_gym_checkins = await conn.fetchval("""
-                    SELECT COUNT(*) FROM checkins WHERE user_id = $1 AND category = 'gym'
-                """, user_id) or 0
-
-                # Count total food logs from checkins table
-                total_food_logs = await conn.fetchval("""
-                    SELECT COUNT(*) FROM checkins WHERE user_id = $1 AND category = 'food'
-                """, user_id) or 0
-
-                return {
-                    "total_gym_checkins": total_gym_checkins,
-                    "total_food_logs": total_food_logs
-                }
-            except Exception as e:
-                print(f"❌ Error fetching progress for user {user_id}: {e}")
-                return None
+            async with conn.transaction():
+                await conn.execute(f"""
+                    INSERT INTO user_stats (user_id, {columns})
+                    SELECT user_id, {columns} FROM ({USER_STATS_ROLLUP_SQL}) rollup
+                    ON CONFLICT (user_id) DO UPDATE SET {updates}
+                """)
+                # Users whose check-ins were all deleted keep no stale counters
+                await conn.execute("""
+                    DELETE FROM user_stats s
+                    WHERE NOT EXISTS (SELECT 1 FROM checkins c WHERE c.user_id = s.user_id)
+                """)
+                await conn.execute("DELETE FROM weight_summary")
+                await conn.execute(f"""
+                    INSERT INTO weight_summary (user_id, first_weight, first_weight_at, latest_weight, latest_weight_at)
+                    {WEIGHT_SUMMARY_ROLLUP_SQL}
+                """)
+                await conn.execute("DELETE FROM weight_weeks")
+                await conn.execute(f"""
+                    INSERT INTO weight_weeks (user_id, local_week, last_weight, last_weight_at)
+                    {WEIGHT_WEEKS_ROLLUP_SQL}
+                """)
+                rows = await conn.fetchval("SELECT COUNT(*) FROM user_stats")
+        print(f"✅ Rebuilt user_stats for {rows} users")
+        return rows
+
+    async def verify_user_stats(self):
+        """Compare user_stats to a fresh rollup of checkins and return the user IDs that differ."""
+        expected = ", ".join(f"r.{col}" for col in USER_STATS_COLUMNS)
+        stored = ", ".join(f"s.{col}" for col in USER_STATS_COLUMNS)
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(f"""
+                WITH rollup AS ({USER_STATS_ROLLUP_SQL})
+                SELECT COALESCE(r.user_id, s.user_id) AS user_id
+                FROM rollup r
+                FULL JOIN user_stats s ON s.user_id = r.user_id
+                WHERE ROW({expected}) IS DISTINCT FROM ROW({stored})
+                ORDER BY 1
+            """)
+        mismatched = [row["user_id"] for row in rows]
+        print(f"🔍 user_stats verification found {len(mismatched)} mismatched users")
+        return mismatched
+
+    async def get_user_checkins_page(self, user_id, category, cursor=None, limit=4):
+        """Fetch one page of a user's check-ins (newest first), starting after `cursor`.
 
-    async def get_user_checkins(self, user_id, category):
-        """Retrieve check-in history for a user based on category, including image paths."""
+        Returns (rows, has_more, next_cursor); pass next_cursor back in to get the following page.
+        """
         async with self.pool.acquire() as conn:
             try:
-                checkins = await conn.fetch("""
-                    SELECT timestamp, workout, weight, meal, image_path FROM checkins 
-                    WHERE user_id = $1 AND category = $2 
-                    ORDER BY timestamp DESC
-                """, user_id, category)
-
-                return checkins
+                if cursor:
+                    before_timestamp, before_id = decode_checkin_cursor(cursor)
+                    rows = await conn.fetch("""
+                        SELECT checkin_id, timestamp, workout, weight, meal, image_path FROM checkins
+                        WHERE user_id = $1 AND category = $2
+                        AND (timestamp, checkin_id) < ($3, $4)
+                        ORDER BY timestamp DESC, checkin_id DESC
+                        LIMIT $5
+                    """, user_id, category, before_timestamp, before_id, limit + 1)
+                else:
+                    rows = await conn.fetch("""
+                        SELECT checkin_id, timestamp, workout, weight, meal, image_path FROM checkins
+                        WHERE user_id = $1 AND category = $2
+                        ORDER BY timestamp DESC, checkin_id DESC
+                        LIMIT $3
+                    """, user_id, category, limit + 1)
+
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+                next_cursor = encode_checkin_cursor(rows[-1]["timestamp"], rows[-1]["checkin_id"]) if has_more else None
+                return rows, has_more, next_cursor
             except Exception as e:
                 print(f"❌ Error fetching check-ins for user {user_id}: {e}")
-                return []
+                return [], False, None
+
+    async def has_checkin_image(self, user_id, image_hash):
+        """True if the user already used this exact image for a check-in."""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval("""
+                SELECT EXISTS (SELECT 1 FROM checkins WHERE user_id = $1 AND image_hash = $2)
+            """, user_id, image_hash)
 
     async def update_pr(self, user_id, lift, value):
         """Update the user's personal record (PR) for deadlift, bench, or squat."""
@@ -209,6 +289,7 @@ class Database:
                     ON CONFLICT (user_id) 
                     DO UPDATE SET {lift} = EXCLUDED.{lift};
                 """, user_id, value)
+                self.pr_rankings.update(user_id, lift, value)
 
     async def save_pr_video(self, user_id, lift, video_path):
         """Store PR video paths in the database."""
@@ -234,37 +315,20 @@ class Database:
 
     async def get_weight_change(self, user_id):
         """Fetch first & most recent weight entries for progress tracking."""
-        async with self.pool.acquire() as conn:
-            try:
-                print(f"🔍 Fetching weight change for user {user_id}...")
-
-                result = await conn.fetch("""
-                    (SELECT weight, timestamp FROM checkins WHERE user_id = $1 AND category = 'weight' ORDER BY timestamp ASC LIMIT 1)
-                    UNION ALL
-                    (SELECT weight, timestamp FROM checkins WHERE user_id = $1 AND category = 'weight' ORDER BY timestamp DESC LIMIT 1);
-                """, user_id)
-
-                print(f"📊 Database returned {len(result)} weight entries for user {user_id}")
-
-                if result:
-                    for i, row in enumerate(result):
-                        print(f"🔹 Entry {i + 1}: Weight = {row['weight']}, Timestamp = {row['timestamp']}")
-
-                if len(result) == 2:
-                    first_weight = float(result[0]["weight"])
-                    recent_weight = float(result[1]["weight"])
-                    weight_change = round(recent_weight - first_weight, 2)
+        try:
+            stats = await self.get_user_stats(user_id)
 
-                    print(
-                        f"⚖️ Weight Change Calculated: First Weight = {first_weight}, Recent Weight = {recent_weight}, Change = {weight_change}")
-                    return first_weight, recent_weight, weight_change
+            if stats and stats["first_weight"] is not None:
+                first_weight = float(stats["first_weight"])
+                recent_weight = float(stats["last_weight"])
+                weight_change = round(recent_weight - first_weight, 2)
+                return first_weight, recent_weight, weight_change
 
-                print(f"❌ Insufficient weight entries for user {user_id} (Needs at least 2)")
-                return None, None, None
+            return None, None, None
 
-            except Exception as e:
-                print(f"❌ Error fetching weight change for user {user_id}: {e}")
-                return None, None, None
+        except Exception as e:
+            print(f"❌ Error fetching weight change for user {user_id}: {e}")
+            return None, None, None
 
     async def get_pr_rankings(self):
         """Retrieve the top 8 users for each PR category."""
@@ -283,6 +347,37 @@ class Database:
 
             return rankings
 
+    async def get_profile_snapshot(self, user_id):
+        """Everything the profile embeds show, in one round trip.
+
+        Returns points (the same total get_user_points reports), gym/food totals, first/recent
+        weight and the three PRs. Per-lift ranks come from the in-process pr_rankings cache.
+        """
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT
+                    COALESCE(s.total_checkins, 0) AS points,
+                    COALESCE(s.gym_checkins, 0) AS total_gym_checkins,
+                    COALESCE(s.food_checkins, 0) AS total_food_logs,
+                    s.first_weight, s.last_weight,
+                    pr.deadlift, pr.bench, pr.squat
+                FROM (SELECT $1::BIGINT AS user_id) target
+                LEFT JOIN user_stats s ON s.user_id = target.user_id
+                LEFT JOIN personal_records pr ON pr.user_id = target.user_id
+            """, user_id)
+
+        first_weight = float(row["first_weight"]) if row["first_weight"] is not None else None
+        recent_weight = float(row["last_weight"]) if row["last_weight"] is not None else None
+        return {
+            "points": row["points"],
+            "total_gym_checkins": row["total_gym_checkins"],
+            "total_food_logs": row["total_food_logs"],
+            "first_weight": first_weight,
+            "recent_weight": recent_weight,
+            "weight_change": round(recent_weight - first_weight, 2) if first_weight is not None else None,
+            "prs": {lift: row[lift] for lift in ("deadlift", "bench", "squat")}
+        }
+
     async def get_leaderboard(self):
         """Retrieve the top 10 users by points."""
         async with self.pool.acquire() as conn:
@@ -290,28 +385,39 @@ class Database:
                 SELECT username, points FROM users ORDER BY points DESC LIMIT 10
             """)
 
-async def get_weekly_weight_changes(self):
-    """ Fetch top 3 users with the highest weight change in the last 7 days """
-    async with self.pool.acquire() as conn:
-        rows = await conn.fetch("""
-            WITH recent_weights AS (
-                SELECT 
-                    user_id, weight, timestamp,
-                    FIRST_VALUE(weight) OVER (PARTITION BY user_id ORDER BY timestamp ASC) AS first_weight,
-                    LAST_VALUE(weight) OVER (PARTITION BY user_id ORDER BY timestamp DESC) AS last_weight
-                FROM checkins
-                WHERE category = 'weight' 
-                AND timestamp >= NOW() - INTERVAL '7 days'
-            )
-            SELECT 
-                users.username, 
-                (MAX(last_weight) - MIN(first_weight)) AS weight_change
-            FROM recent_weights
-            JOIN users ON users.user_id = recent_weights.user_id
-            GROUP BY users.username
-            ORDER BY weight_change ASC  -- Sort by most weight lost
-            LIMIT 3;
-        """)
+    async def get_weight_change_leaders(self, limit=3):
+        """Users with the largest all-time weight change (either direction), from weight_summary."""
+        async with self.pool.acquire() as conn:
+            return await conn.fetch("""
+                SELECT user_id, first_weight, latest_weight AS recent_weight,
+                       latest_weight - first_weight AS weight_change
+                FROM weight_summary
+                ORDER BY ABS(latest_weight - first_weight) DESC
+                LIMIT $1
+            """, limit)
+
+    async def get_weekly_weight_changes(self, week=None, limit=3):
+        """Top weight losers for a weigh-in week (default: the current one) as (username, weight_change).
+
+        A week's change is its latest weight minus the latest weight of the user's previous weigh-in week.
+        """
+        if week is None:
+            _, _, week = checkin_window()
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT u.username, ww.last_weight - prev.last_weight AS weight_change
+                FROM weight_weeks ww
+                JOIN users u ON u.user_id = ww.user_id
+                JOIN LATERAL (
+                    SELECT last_weight FROM weight_weeks p
+                    WHERE p.user_id = ww.user_id AND p.local_week < ww.local_week
+                    ORDER BY p.local_week DESC
+                    LIMIT 1
+                ) prev ON TRUE
+                WHERE ww.local_week = $1
+                ORDER BY weight_change ASC  -- Most weight lost first
+                LIMIT $2
+            """, week, limit)
 
         return [(row["username"], row["weight_change"]) for row in rows]
 
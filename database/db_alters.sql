@@ -1,3 +1,6 @@
+-- Historical hand-run changes, kept for reference. New schema changes go in
+-- database/migrations/ and are applied automatically at startup (see migrations.py).
+
 --Question Expansion
 ALTER TABLE checkins ADD COLUMN workout TEXT DEFAULT NULL;
 
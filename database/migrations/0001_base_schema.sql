@@ -0,0 +1,109 @@
+-- Base schema: everything from db.sql and db_alters.sql up to the challenge system.
+-- Written to be safe on both empty databases and installs that applied the
+-- hand-run scripts, so every statement is idempotent.
+
+-- ===== CORE TABLES =====
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id BIGINT PRIMARY KEY,
+    username TEXT NOT NULL,
+    points INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS checkins (
+    checkin_id SERIAL PRIMARY KEY,
+    user_id BIGINT REFERENCES users(user_id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    image_hash TEXT DEFAULT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE checkins ADD COLUMN IF NOT EXISTS workout TEXT DEFAULT NULL;
+ALTER TABLE checkins ADD COLUMN IF NOT EXISTS weight DECIMAL(10,2) DEFAULT NULL;
+ALTER TABLE checkins ADD COLUMN IF NOT EXISTS meal TEXT DEFAULT NULL;
+ALTER TABLE checkins ADD COLUMN IF NOT EXISTS image_path TEXT;
+
+CREATE TABLE IF NOT EXISTS progress (
+    user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    total_gym_checkins INTEGER DEFAULT 0,
+    total_food_logs INTEGER DEFAULT 0,
+    total_weight_change DECIMAL(10,2) DEFAULT 0.0,
+    last_logged_weight DECIMAL(10,2) DEFAULT NULL
+);
+
+CREATE TABLE IF NOT EXISTS personal_records (
+    user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    deadlift INTEGER DEFAULT NULL,
+    bench INTEGER DEFAULT NULL,
+    squat INTEGER DEFAULT NULL
+);
+
+ALTER TABLE personal_records ADD COLUMN IF NOT EXISTS deadlift_video TEXT DEFAULT NULL;
+ALTER TABLE personal_records ADD COLUMN IF NOT EXISTS bench_video TEXT DEFAULT NULL;
+ALTER TABLE personal_records ADD COLUMN IF NOT EXISTS squat_video TEXT DEFAULT NULL;
+
+-- ===== CHALLENGE SYSTEM =====
+
+CREATE TABLE IF NOT EXISTS challenges (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    goal TEXT NOT NULL,
+    start_date TIMESTAMP DEFAULT NOW(),
+    end_date TIMESTAMP NOT NULL,
+    status TEXT DEFAULT 'active'
+);
+
+ALTER TABLE challenges ALTER COLUMN start_date TYPE TIMESTAMP USING start_date::TIMESTAMP;
+ALTER TABLE challenges ALTER COLUMN end_date TYPE TIMESTAMP USING end_date::TIMESTAMP;
+
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS photo_collection_started BOOLEAN DEFAULT FALSE;
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS photo_collection_deadline TIMESTAMP DEFAULT NULL;
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS voting_started BOOLEAN DEFAULT FALSE;
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS voting_end_time TIMESTAMP DEFAULT NULL;
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS voting_messages JSONB DEFAULT NULL;
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS results_posted BOOLEAN DEFAULT FALSE;
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS message_id BIGINT DEFAULT NULL;
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS channel_id BIGINT DEFAULT NULL;
+ALTER TABLE challenges ADD COLUMN IF NOT EXISTS end_notification_sent BOOLEAN DEFAULT FALSE;
+
+CREATE TABLE IF NOT EXISTS challenge_participants (
+    id SERIAL PRIMARY KEY,
+    challenge_id INT REFERENCES challenges(id) ON DELETE CASCADE,
+    user_id BIGINT NOT NULL,
+    username TEXT NOT NULL,
+    initial_photos TEXT[],
+    current_weight DECIMAL(5,2),
+    goal_weight DECIMAL(5,2),
+    personal_goal TEXT,
+    progress_photos TEXT[],
+    final_photos TEXT[],
+    votes INT DEFAULT 0
+);
+
+ALTER TABLE challenge_participants ADD COLUMN IF NOT EXISTS final_weight DECIMAL(5,2) DEFAULT NULL;
+ALTER TABLE challenge_participants ADD COLUMN IF NOT EXISTS submitted_final BOOLEAN DEFAULT FALSE;
+ALTER TABLE challenge_participants ADD COLUMN IF NOT EXISTS submission_date TIMESTAMP DEFAULT NULL;
+ALTER TABLE challenge_participants ADD COLUMN IF NOT EXISTS final_dm_sent BOOLEAN DEFAULT FALSE;
+ALTER TABLE challenge_participants ADD COLUMN IF NOT EXISTS dm_failed BOOLEAN DEFAULT FALSE;
+ALTER TABLE challenge_participants ADD COLUMN IF NOT EXISTS dm_completed BOOLEAN DEFAULT FALSE;
+ALTER TABLE challenge_participants ADD COLUMN IF NOT EXISTS disqualified BOOLEAN DEFAULT FALSE;
+ALTER TABLE challenge_participants ADD COLUMN IF NOT EXISTS disqualification_reason TEXT DEFAULT NULL;
+ALTER TABLE challenge_participants ADD COLUMN IF NOT EXISTS final_rank INTEGER DEFAULT NULL;
+ALTER TABLE challenge_participants ADD COLUMN IF NOT EXISTS votes_received INTEGER DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS challenge_votes (
+    id SERIAL PRIMARY KEY,
+    challenge_id INT REFERENCES challenges(id) ON DELETE CASCADE,
+    voter_id BIGINT NOT NULL,
+    participant_id BIGINT NOT NULL,
+    UNIQUE (challenge_id, voter_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_challenges_status ON challenges(status);
+CREATE INDEX IF NOT EXISTS idx_challenges_end_date ON challenges(end_date);
+CREATE INDEX IF NOT EXISTS idx_challenges_photo_collection ON challenges(photo_collection_started);
+CREATE INDEX IF NOT EXISTS idx_challenges_voting ON challenges(voting_started);
+CREATE INDEX IF NOT EXISTS idx_challenge_participants_challenge_id ON challenge_participants(challenge_id);
+CREATE INDEX IF NOT EXISTS idx_challenge_participants_user_id ON challenge_participants(user_id);
+CREATE INDEX IF NOT EXISTS idx_challenge_participants_submitted ON challenge_participants(submitted_final);
+CREATE INDEX IF NOT EXISTS idx_challenge_participants_dm_sent ON challenge_participants(final_dm_sent);
@@ -0,0 +1,131 @@
+-- Per-user stats rollup and the single-round-trip log_checkin() function.
+
+-- ===== PER-USER STATS ROLLUP =====
+
+-- Maintained by log_checkin(); rebuild/verify from checkins with /rebuild_stats.
+-- Seeded from existing history below, so upgrades do not start from zero.
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    points INTEGER NOT NULL DEFAULT 0,
+    total_checkins INTEGER NOT NULL DEFAULT 0,
+    gym_checkins INTEGER NOT NULL DEFAULT 0,
+    food_checkins INTEGER NOT NULL DEFAULT 0,
+    weight_checkins INTEGER NOT NULL DEFAULT 0,
+    first_weight DECIMAL(10,2) DEFAULT NULL,
+    first_weight_at TIMESTAMP DEFAULT NULL,
+    last_weight DECIMAL(10,2) DEFAULT NULL,
+    last_weight_at TIMESTAMP DEFAULT NULL,
+    last_gym_at TIMESTAMP DEFAULT NULL,
+    last_food_at TIMESTAMP DEFAULT NULL
+);
+
+-- ===== ATOMIC CHECK-IN WRITE PATH =====
+
+-- Cooldown decision, check-in insert, user_stats counters and point award in one
+-- server-side call. Upserting the users row first takes its row lock, so two
+-- check-ins from the same user arriving together serialize here and only the
+-- first one can see an empty cooldown window.
+CREATE OR REPLACE FUNCTION log_checkin(
+    p_user_id BIGINT,
+    p_username TEXT,
+    p_category TEXT,
+    p_image_hash TEXT,
+    p_image_path TEXT,
+    p_workout TEXT,
+    p_weight NUMERIC,
+    p_meal TEXT
+) RETURNS TEXT AS $$
+DECLARE
+    v_now TIMESTAMP := NOW();
+    v_today DATE := (NOW() AT TIME ZONE 'America/New_York')::DATE;
+    v_window_start DATE;
+    v_earned BOOLEAN;
+BEGIN
+    INSERT INTO users (user_id, username, points)
+    VALUES (p_user_id, p_username, 0)
+    ON CONFLICT (user_id) DO UPDATE SET username = EXCLUDED.username;
+
+    -- Weight resets every Saturday, everything else resets daily (Eastern time)
+    IF p_category = 'weight' THEN
+        v_window_start := v_today - ((EXTRACT(DOW FROM v_today)::INT + 1) % 7);
+    ELSE
+        v_window_start := v_today;
+    END IF;
+
+    SELECT NOT EXISTS (
+        SELECT 1 FROM checkins
+        WHERE user_id = p_user_id AND category = p_category
+        AND DATE(timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'America/New_York') >= v_window_start
+    ) INTO v_earned;
+
+    INSERT INTO checkins (user_id, category, image_hash, image_path, workout, weight, meal, timestamp)
+    VALUES (p_user_id, p_category, p_image_hash, p_image_path, p_workout, p_weight, p_meal, v_now);
+
+    INSERT INTO user_stats (
+        user_id, points, total_checkins, gym_checkins, food_checkins, weight_checkins,
+        first_weight, first_weight_at, last_weight, last_weight_at, last_gym_at, last_food_at
+    )
+    VALUES (
+        p_user_id,
+        CASE WHEN v_earned THEN 1 ELSE 0 END,
+        1,
+        CASE WHEN p_category = 'gym' THEN 1 ELSE 0 END,
+        CASE WHEN p_category = 'food' THEN 1 ELSE 0 END,
+        CASE WHEN p_category = 'weight' THEN 1 ELSE 0 END,
+        p_weight,
+        CASE WHEN p_weight IS NOT NULL THEN v_now END,
+        p_weight,
+        CASE WHEN p_weight IS NOT NULL THEN v_now END,
+        CASE WHEN p_category = 'gym' THEN v_now END,
+        CASE WHEN p_category = 'food' THEN v_now END
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        points = user_stats.points + EXCLUDED.points,
+        total_checkins = user_stats.total_checkins + 1,
+        gym_checkins = user_stats.gym_checkins + EXCLUDED.gym_checkins,
+        food_checkins = user_stats.food_checkins + EXCLUDED.food_checkins,
+        weight_checkins = user_stats.weight_checkins + EXCLUDED.weight_checkins,
+        first_weight = COALESCE(user_stats.first_weight, EXCLUDED.first_weight),
+        first_weight_at = COALESCE(user_stats.first_weight_at, EXCLUDED.first_weight_at),
+        last_weight = COALESCE(EXCLUDED.last_weight, user_stats.last_weight),
+        last_weight_at = COALESCE(EXCLUDED.last_weight_at, user_stats.last_weight_at),
+        last_gym_at = COALESCE(EXCLUDED.last_gym_at, user_stats.last_gym_at),
+        last_food_at = COALESCE(EXCLUDED.last_food_at, user_stats.last_food_at);
+
+    IF v_earned THEN
+        UPDATE users SET points = points + 1 WHERE user_id = p_user_id;
+        RETURN 'success_with_point';
+    END IF;
+
+    RETURN 'success_no_point';
+END;
+$$ LANGUAGE plpgsql;
+
+-- ===== SEED USER STATS =====
+
+INSERT INTO user_stats (
+    user_id, points, total_checkins, gym_checkins, food_checkins, weight_checkins,
+    first_weight, first_weight_at, last_weight, last_weight_at, last_gym_at, last_food_at
+)
+SELECT
+    user_id,
+    (COUNT(DISTINCT category || ':' || local_day::TEXT) FILTER (WHERE category <> 'weight')
+     + COUNT(DISTINCT local_day - ((EXTRACT(DOW FROM local_day)::INT + 1) % 7)) FILTER (WHERE category = 'weight'))::INT,
+    COUNT(*)::INT,
+    COUNT(*) FILTER (WHERE category = 'gym')::INT,
+    COUNT(*) FILTER (WHERE category = 'food')::INT,
+    COUNT(*) FILTER (WHERE category = 'weight')::INT,
+    (ARRAY_AGG(weight ORDER BY timestamp ASC) FILTER (WHERE weight IS NOT NULL))[1],
+    MIN(timestamp) FILTER (WHERE weight IS NOT NULL),
+    (ARRAY_AGG(weight ORDER BY timestamp DESC) FILTER (WHERE weight IS NOT NULL))[1],
+    MAX(timestamp) FILTER (WHERE weight IS NOT NULL),
+    MAX(timestamp) FILTER (WHERE category = 'gym'),
+    MAX(timestamp) FILTER (WHERE category = 'food')
+FROM (
+    SELECT user_id, category, weight, timestamp,
+           DATE(timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'America/New_York') AS local_day
+    FROM checkins
+    WHERE user_id IS NOT NULL
+) local_checkins
+GROUP BY user_id
+ON CONFLICT (user_id) DO NOTHING;
@@ -0,0 +1,26 @@
+-- Indexes for the check-in, profile and challenge hot paths.
+-- Every query registered in migrations.CHECKED_QUERIES must be served by one of these;
+-- run `python migrations.py --check` to confirm.
+
+-- check_cooldown, log_checkin's cooldown probe, get_user_checkins, weight lookups
+CREATE INDEX IF NOT EXISTS idx_checkins_user_category_ts ON checkins (user_id, category, timestamp DESC);
+
+-- Duplicate-image lookup in CheckIn.checkin
+CREATE INDEX IF NOT EXISTS idx_checkins_user_image_hash ON checkins (user_id, image_hash);
+
+-- Weigh-in leaderboard scans weight check-ins per user in time order
+CREATE INDEX IF NOT EXISTS idx_checkins_weight_user_ts ON checkins (user_id, timestamp) WHERE category = 'weight';
+
+-- Leaderboard
+CREATE INDEX IF NOT EXISTS idx_users_points ON users (points DESC);
+
+-- PR rankings
+CREATE INDEX IF NOT EXISTS idx_personal_records_deadlift ON personal_records (deadlift DESC) WHERE deadlift IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_personal_records_bench ON personal_records (bench DESC) WHERE bench IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_personal_records_squat ON personal_records (squat DESC) WHERE squat IS NOT NULL;
+
+-- Reaction handler looks challenges up by their join message
+CREATE INDEX IF NOT EXISTS idx_challenges_message_id ON challenges (message_id);
+
+-- Participant lookups are always by (challenge, user)
+CREATE INDEX IF NOT EXISTS idx_challenge_participants_challenge_user ON challenge_participants (challenge_id, user_id);
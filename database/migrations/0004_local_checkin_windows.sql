@@ -0,0 +1,99 @@
+-- Store each check-in's Eastern-time day and Saturday-starting week on the row so
+-- cooldown checks are plain index probes instead of per-row timezone conversions.
+-- Both values come from database.checkin_window(), the one place the windows are defined.
+
+ALTER TABLE checkins ADD COLUMN IF NOT EXISTS local_day DATE;
+ALTER TABLE checkins ADD COLUMN IF NOT EXISTS local_week DATE;
+
+UPDATE checkins
+SET local_day = DATE(timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'America/New_York')
+WHERE local_day IS NULL;
+
+UPDATE checkins
+SET local_week = local_day - ((EXTRACT(DOW FROM local_day)::INT + 1) % 7)
+WHERE local_week IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_checkins_user_category_day ON checkins (user_id, category, local_day);
+CREATE INDEX IF NOT EXISTS idx_checkins_user_category_week ON checkins (user_id, category, local_week);
+
+-- ===== LOG_CHECKIN WITH LOCAL WINDOWS =====
+
+DROP FUNCTION IF EXISTS log_checkin(BIGINT, TEXT, TEXT, TEXT, TEXT, TEXT, NUMERIC, TEXT);
+
+-- Same contract as before; the caller now supplies the check-in time and its windows.
+CREATE OR REPLACE FUNCTION log_checkin(
+    p_user_id BIGINT,
+    p_username TEXT,
+    p_category TEXT,
+    p_image_hash TEXT,
+    p_image_path TEXT,
+    p_workout TEXT,
+    p_weight NUMERIC,
+    p_meal TEXT,
+    p_timestamp TIMESTAMP,
+    p_local_day DATE,
+    p_local_week DATE
+) RETURNS TEXT AS $$
+DECLARE
+    v_now TIMESTAMP := p_timestamp;
+    v_earned BOOLEAN;
+BEGIN
+    INSERT INTO users (user_id, username, points)
+    VALUES (p_user_id, p_username, 0)
+    ON CONFLICT (user_id) DO UPDATE SET username = EXCLUDED.username;
+
+    -- Weight resets every Saturday, everything else resets daily (Eastern time)
+    IF p_category = 'weight' THEN
+        SELECT NOT EXISTS (
+            SELECT 1 FROM checkins
+            WHERE user_id = p_user_id AND category = p_category AND local_week = p_local_week
+        ) INTO v_earned;
+    ELSE
+        SELECT NOT EXISTS (
+            SELECT 1 FROM checkins
+            WHERE user_id = p_user_id AND category = p_category AND local_day = p_local_day
+        ) INTO v_earned;
+    END IF;
+
+    INSERT INTO checkins (user_id, category, image_hash, image_path, workout, weight, meal, timestamp, local_day, local_week)
+    VALUES (p_user_id, p_category, p_image_hash, p_image_path, p_workout, p_weight, p_meal, v_now, p_local_day, p_local_week);
+
+    INSERT INTO user_stats (
+        user_id, points, total_checkins, gym_checkins, food_checkins, weight_checkins,
+        first_weight, first_weight_at, last_weight, last_weight_at, last_gym_at, last_food_at
+    )
+    VALUES (
+        p_user_id,
+        CASE WHEN v_earned THEN 1 ELSE 0 END,
+        1,
+        CASE WHEN p_category = 'gym' THEN 1 ELSE 0 END,
+        CASE WHEN p_category = 'food' THEN 1 ELSE 0 END,
+        CASE WHEN p_category = 'weight' THEN 1 ELSE 0 END,
+        p_weight,
+        CASE WHEN p_weight IS NOT NULL THEN v_now END,
+        p_weight,
+        CASE WHEN p_weight IS NOT NULL THEN v_now END,
+        CASE WHEN p_category = 'gym' THEN v_now END,
+        CASE WHEN p_category = 'food' THEN v_now END
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        points = user_stats.points + EXCLUDED.points,
+        total_checkins = user_stats.total_checkins + 1,
+        gym_checkins = user_stats.gym_checkins + EXCLUDED.gym_checkins,
+        food_checkins = user_stats.food_checkins + EXCLUDED.food_checkins,
+        weight_checkins = user_stats.weight_checkins + EXCLUDED.weight_checkins,
+        first_weight = COALESCE(user_stats.first_weight, EXCLUDED.first_weight),
+        first_weight_at = COALESCE(user_stats.first_weight_at, EXCLUDED.first_weight_at),
+        last_weight = COALESCE(EXCLUDED.last_weight, user_stats.last_weight),
+        last_weight_at = COALESCE(EXCLUDED.last_weight_at, user_stats.last_weight_at),
+        last_gym_at = COALESCE(EXCLUDED.last_gym_at, user_stats.last_gym_at),
+        last_food_at = COALESCE(EXCLUDED.last_food_at, user_stats.last_food_at);
+
+    IF v_earned THEN
+        UPDATE users SET points = points + 1 WHERE user_id = p_user_id;
+        RETURN 'success_with_point';
+    END IF;
+
+    RETURN 'success_no_point';
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,6 @@
+-- Keyset pagination for check-in history: (timestamp, checkin_id) is the page cursor,
+-- so the index carries checkin_id as a tie-breaker and replaces the timestamp-only one.
+
+CREATE INDEX IF NOT EXISTS idx_checkins_user_category_ts_id ON checkins (user_id, category, timestamp DESC, checkin_id DESC);
+
+DROP INDEX IF EXISTS idx_checkins_user_category_ts;
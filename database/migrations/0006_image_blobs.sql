@@ -0,0 +1,17 @@
+-- Content-addressed image store: one file per distinct upload, shared by check-ins,
+-- challenge initial photos and final photos, with a reference count per file.
+
+CREATE TABLE IF NOT EXISTS image_blobs (
+    image_hash TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Register existing check-in images where they already live, so re-uploads reuse them
+INSERT INTO image_blobs (image_hash, path, ref_count)
+SELECT image_hash, MIN(image_path), COUNT(*)
+FROM checkins
+WHERE image_hash IS NOT NULL AND image_path IS NOT NULL
+GROUP BY image_hash
+ON CONFLICT (image_hash) DO NOTHING;
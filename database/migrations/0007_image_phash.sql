@@ -0,0 +1,5 @@
+-- Perceptual (dHash) hash per stored image. Check-ins reach it through image_hash, so
+-- every check-in photo has one without widening the checkins row or log_checkin().
+-- Existing images are filled in by /backfill_phash.
+
+ALTER TABLE image_blobs ADD COLUMN IF NOT EXISTS phash BIGINT DEFAULT NULL;
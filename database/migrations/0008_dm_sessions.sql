@@ -0,0 +1,17 @@
+-- Durable state for the DM flows (challenge onboarding and final photos). One row per user
+-- in a flow: the current step plus everything collected so far, so a restart resumes
+-- exactly where the user left off and each reply is a single conditional UPDATE.
+
+CREATE TABLE IF NOT EXISTS dm_sessions (
+    user_id BIGINT PRIMARY KEY,
+    channel_id BIGINT NOT NULL,
+    challenge_id INT NOT NULL REFERENCES challenges(id) ON DELETE CASCADE,
+    flow TEXT NOT NULL,
+    step TEXT NOT NULL,
+    photos TEXT[] NOT NULL DEFAULT '{}',
+    answers JSONB NOT NULL DEFAULT '{}',
+    started_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_dm_sessions_challenge ON dm_sessions(challenge_id);
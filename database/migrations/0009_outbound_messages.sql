@@ -0,0 +1,18 @@
+-- One row per message sent through utils/outbound.py: what it was, who it was for and how
+-- it ended, so a fan-out can be audited after the fact.
+
+CREATE TABLE IF NOT EXISTS outbound_messages (
+    id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    route TEXT NOT NULL,
+    target_id BIGINT,
+    challenge_id INT,
+    priority SMALLINT NOT NULL,
+    status TEXT NOT NULL,
+    attempts SMALLINT NOT NULL,
+    error TEXT,
+    queued_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_challenge ON outbound_messages(challenge_id, kind);
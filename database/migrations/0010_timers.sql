@@ -0,0 +1,14 @@
+-- Delayed actions for utils/timers.py. Rows survive restarts; the bot keeps a min-heap of
+-- due_at in memory and deletes each row as it fires. `key` lets a caller replace or
+-- cancel its own timer (e.g. one photo reminder per participant).
+
+CREATE TABLE IF NOT EXISTS timers (
+    id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT UNIQUE,
+    due_at TIMESTAMP NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_timers_due_at ON timers(due_at);
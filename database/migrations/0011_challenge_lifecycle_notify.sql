@@ -0,0 +1,16 @@
+-- Wake the bot's challenge lifecycle engine whenever a challenge is created or one of the
+-- columns that decide its next phase change, instead of polling the table.
+
+CREATE OR REPLACE FUNCTION notify_challenge_lifecycle() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('challenge_lifecycle', NEW.id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS challenges_lifecycle_notify ON challenges;
+CREATE TRIGGER challenges_lifecycle_notify
+    AFTER INSERT OR UPDATE OF status, end_date, photo_collection_started, photo_collection_deadline,
+                              voting_started, voting_end_time, results_posted
+    ON challenges
+    FOR EACH ROW EXECUTE FUNCTION notify_challenge_lifecycle();
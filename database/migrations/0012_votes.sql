@@ -0,0 +1,15 @@
+-- Live vote ledger: one row per (voter, participant) ✅ on a voting post, written as reactions
+-- are added and deleted as they are removed. Results are a single GROUP BY over this table.
+-- The older challenge_votes table allowed only one vote per voter and was never written.
+
+CREATE TABLE IF NOT EXISTS votes (
+    challenge_id INT NOT NULL REFERENCES challenges(id) ON DELETE CASCADE,
+    voter_id BIGINT NOT NULL,
+    participant_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (challenge_id, voter_id, participant_id),
+    CONSTRAINT votes_no_self_vote CHECK (voter_id <> participant_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_votes_challenge_participant ON votes(challenge_id, participant_id);
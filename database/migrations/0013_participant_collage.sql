@@ -0,0 +1,4 @@
+-- Pre-rendered before/after collage per participant, built while final photos are still
+-- being collected so start_voting only has to upload it.
+
+ALTER TABLE challenge_participants ADD COLUMN IF NOT EXISTS collage_path TEXT DEFAULT NULL;
@@ -0,0 +1,11 @@
+-- Finished results record per challenge: the ranked list and every statistic shown in the
+-- results embed, written in the same transaction that stores the ranks. Admins re-post from
+-- this row instead of recomputing.
+
+CREATE TABLE IF NOT EXISTS challenge_results (
+    challenge_id INT PRIMARY KEY REFERENCES challenges(id) ON DELETE CASCADE,
+    challenge_name TEXT NOT NULL,
+    results JSONB NOT NULL,
+    stats JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW()
+);
@@ -0,0 +1,142 @@
+-- Per-user weight summaries so weigh-in leaderboards read a few indexed rows instead of
+-- scanning every weight check-in. weight_summary holds each user's first and latest weight;
+-- weight_weeks holds the latest weight of every Saturday-starting week a user weighed in.
+-- Both are maintained by log_checkin() and rebuilt from checkins with /rebuild_stats.
+
+CREATE TABLE IF NOT EXISTS weight_summary (
+    user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    first_weight DECIMAL(10,2) NOT NULL,
+    first_weight_at TIMESTAMP NOT NULL,
+    latest_weight DECIMAL(10,2) NOT NULL,
+    latest_weight_at TIMESTAMP NOT NULL
+);
+
+-- All-time leaderboard: largest change in either direction
+CREATE INDEX IF NOT EXISTS idx_weight_summary_abs_change
+    ON weight_summary ((ABS(latest_weight - first_weight)) DESC);
+
+CREATE TABLE IF NOT EXISTS weight_weeks (
+    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    local_week DATE NOT NULL,
+    last_weight DECIMAL(10,2) NOT NULL,
+    last_weight_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, local_week)
+);
+
+CREATE INDEX IF NOT EXISTS idx_weight_weeks_week ON weight_weeks (local_week);
+
+INSERT INTO weight_summary (user_id, first_weight, first_weight_at, latest_weight, latest_weight_at)
+SELECT
+    user_id,
+    (ARRAY_AGG(weight ORDER BY timestamp ASC))[1],
+    MIN(timestamp),
+    (ARRAY_AGG(weight ORDER BY timestamp DESC))[1],
+    MAX(timestamp)
+FROM checkins
+WHERE category = 'weight' AND weight IS NOT NULL
+GROUP BY user_id
+ON CONFLICT (user_id) DO NOTHING;
+
+INSERT INTO weight_weeks (user_id, local_week, last_weight, last_weight_at)
+SELECT DISTINCT ON (user_id, local_week) user_id, local_week, weight, timestamp
+FROM checkins
+WHERE category = 'weight' AND weight IS NOT NULL AND local_week IS NOT NULL
+ORDER BY user_id, local_week, timestamp DESC
+ON CONFLICT (user_id, local_week) DO NOTHING;
+
+-- ===== LOG_CHECKIN WITH WEIGHT SUMMARIES =====
+
+-- Same signature as 0004; the weight branch now also keeps the two tables above current.
+CREATE OR REPLACE FUNCTION log_checkin(
+    p_user_id BIGINT,
+    p_username TEXT,
+    p_category TEXT,
+    p_image_hash TEXT,
+    p_image_path TEXT,
+    p_workout TEXT,
+    p_weight NUMERIC,
+    p_meal TEXT,
+    p_timestamp TIMESTAMP,
+    p_local_day DATE,
+    p_local_week DATE
+) RETURNS TEXT AS $$
+DECLARE
+    v_now TIMESTAMP := p_timestamp;
+    v_earned BOOLEAN;
+BEGIN
+    INSERT INTO users (user_id, username, points)
+    VALUES (p_user_id, p_username, 0)
+    ON CONFLICT (user_id) DO UPDATE SET username = EXCLUDED.username;
+
+    -- Weight resets every Saturday, everything else resets daily (Eastern time)
+    IF p_category = 'weight' THEN
+        SELECT NOT EXISTS (
+            SELECT 1 FROM checkins
+            WHERE user_id = p_user_id AND category = p_category AND local_week = p_local_week
+        ) INTO v_earned;
+    ELSE
+        SELECT NOT EXISTS (
+            SELECT 1 FROM checkins
+            WHERE user_id = p_user_id AND category = p_category AND local_day = p_local_day
+        ) INTO v_earned;
+    END IF;
+
+    INSERT INTO checkins (user_id, category, image_hash, image_path, workout, weight, meal, timestamp, local_day, local_week)
+    VALUES (p_user_id, p_category, p_image_hash, p_image_path, p_workout, p_weight, p_meal, v_now, p_local_day, p_local_week);
+
+    INSERT INTO user_stats (
+        user_id, points, total_checkins, gym_checkins, food_checkins, weight_checkins,
+        first_weight, first_weight_at, last_weight, last_weight_at, last_gym_at, last_food_at
+    )
+    VALUES (
+        p_user_id,
+        CASE WHEN v_earned THEN 1 ELSE 0 END,
+        1,
+        CASE WHEN p_category = 'gym' THEN 1 ELSE 0 END,
+        CASE WHEN p_category = 'food' THEN 1 ELSE 0 END,
+        CASE WHEN p_category = 'weight' THEN 1 ELSE 0 END,
+        p_weight,
+        CASE WHEN p_weight IS NOT NULL THEN v_now END,
+        p_weight,
+        CASE WHEN p_weight IS NOT NULL THEN v_now END,
+        CASE WHEN p_category = 'gym' THEN v_now END,
+        CASE WHEN p_category = 'food' THEN v_now END
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        points = user_stats.points + EXCLUDED.points,
+        total_checkins = user_stats.total_checkins + 1,
+        gym_checkins = user_stats.gym_checkins + EXCLUDED.gym_checkins,
+        food_checkins = user_stats.food_checkins + EXCLUDED.food_checkins,
+        weight_checkins = user_stats.weight_checkins + EXCLUDED.weight_checkins,
+        first_weight = COALESCE(user_stats.first_weight, EXCLUDED.first_weight),
+        first_weight_at = COALESCE(user_stats.first_weight_at, EXCLUDED.first_weight_at),
+        last_weight = COALESCE(EXCLUDED.last_weight, user_stats.last_weight),
+        last_weight_at = COALESCE(EXCLUDED.last_weight_at, user_stats.last_weight_at),
+        last_gym_at = COALESCE(EXCLUDED.last_gym_at, user_stats.last_gym_at),
+        last_food_at = COALESCE(EXCLUDED.last_food_at, user_stats.last_food_at);
+
+    -- Weight summaries: two single-row upserts, whatever the length of the history
+    IF p_category = 'weight' AND p_weight IS NOT NULL THEN
+        INSERT INTO weight_summary (user_id, first_weight, first_weight_at, latest_weight, latest_weight_at)
+        VALUES (p_user_id, p_weight, v_now, p_weight, v_now)
+        ON CONFLICT (user_id) DO UPDATE SET
+            latest_weight = EXCLUDED.latest_weight,
+            latest_weight_at = EXCLUDED.latest_weight_at
+        WHERE weight_summary.latest_weight_at <= EXCLUDED.latest_weight_at;
+
+        INSERT INTO weight_weeks (user_id, local_week, last_weight, last_weight_at)
+        VALUES (p_user_id, p_local_week, p_weight, v_now)
+        ON CONFLICT (user_id, local_week) DO UPDATE SET
+            last_weight = EXCLUDED.last_weight,
+            last_weight_at = EXCLUDED.last_weight_at
+        WHERE weight_weeks.last_weight_at <= EXCLUDED.last_weight_at;
+    END IF;
+
+    IF v_earned THEN
+        UPDATE users SET points = points + 1 WHERE user_id = p_user_id;
+        RETURN 'success_with_point';
+    END IF;
+
+    RETURN 'success_no_point';
+END;
+$$ LANGUAGE plpgsql;
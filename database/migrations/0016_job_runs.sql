@@ -0,0 +1,15 @@
+-- One row per APScheduler job execution: which instance ran it, how long it took and how it
+-- ended. The jobs themselves live in apscheduler_jobs, created by APScheduler's job store.
+
+CREATE TABLE IF NOT EXISTS job_runs (
+    id BIGSERIAL PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    instance TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP NOT NULL,
+    duration_ms INT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_job ON job_runs(job_id, started_at DESC);
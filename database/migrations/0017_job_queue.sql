@@ -0,0 +1,44 @@
+-- Work handed from the gateway process to worker processes. Workers claim due rows with
+-- FOR UPDATE SKIP LOCKED, so any number of them can share the queue; an insert NOTIFYs
+-- them so an idle worker doesn't poll.
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    run_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_run_at ON jobs(run_at, id);
+
+CREATE OR REPLACE FUNCTION notify_jobs() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('jobs', NEW.kind);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS jobs_notify ON jobs;
+CREATE TRIGGER jobs_notify
+    AFTER INSERT ON jobs
+    FOR EACH ROW EXECUTE FUNCTION notify_jobs();
+
+-- DM sessions are started by workers (final photos) but answered by the gateway, which keeps
+-- them in memory; tell it whenever one starts, restarts or ends.
+
+CREATE OR REPLACE FUNCTION notify_dm_sessions() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('dm_sessions', OLD.user_id::text);
+        RETURN OLD;
+    END IF;
+    PERFORM pg_notify('dm_sessions', NEW.user_id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS dm_sessions_notify ON dm_sessions;
+CREATE TRIGGER dm_sessions_notify
+    AFTER INSERT OR DELETE OR UPDATE OF started_at ON dm_sessions
+    FOR EACH ROW EXECUTE FUNCTION notify_dm_sessions();
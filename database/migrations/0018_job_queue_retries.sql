@@ -0,0 +1,22 @@
+-- Leases, retries and dead-lettering for the job queue. Claiming a job pushes its run_at out by
+-- its visibility timeout instead of deleting it, so a job whose worker dies becomes due again;
+-- success deletes it, failure reschedules it with backoff, and a job out of attempts moves to
+-- dead_jobs for an admin to inspect or requeue.
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS max_attempts INT NOT NULL DEFAULT 5;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS visibility_seconds INT NOT NULL DEFAULT 300;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS leased_by TEXT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS last_error TEXT;
+
+CREATE TABLE IF NOT EXISTS dead_jobs (
+    id BIGINT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    attempts INT NOT NULL,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL,
+    failed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_dead_jobs_kind ON dead_jobs(kind);
@@ -0,0 +1,15 @@
+-- Timers may be scheduled by any process (the gateway, after a check-in or join) but fire in
+-- the workers, which keep their own in-memory heap of due times. Tell them whenever a timer
+-- is added or moved so it lands in their heap without a restart.
+
+CREATE OR REPLACE FUNCTION notify_timers() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('timers', json_build_object('id', NEW.id, 'due_at', NEW.due_at, 'kind', NEW.kind)::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS timers_notify ON timers;
+CREATE TRIGGER timers_notify
+    AFTER INSERT OR UPDATE OF due_at ON timers
+    FOR EACH ROW EXECUTE FUNCTION notify_timers();
@@ -0,0 +1,11 @@
+-- Send a timer's due_at as epoch seconds rather than JSON timestamp text: Postgres trims
+-- trailing zeros from fractional seconds, which datetime.fromisoformat rejects before 3.11.
+
+CREATE OR REPLACE FUNCTION notify_timers() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('timers', json_build_object(
+        'id', NEW.id, 'due_at', EXTRACT(EPOCH FROM NEW.due_at), 'kind', NEW.kind
+    )::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
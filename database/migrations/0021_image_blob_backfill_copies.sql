@@ -0,0 +1,24 @@
+-- 0006 registered one path per hash (MIN(image_path)), but older check-ins kept their own
+-- per-user copy of the same upload. Those copies were counted in ref_count yet never tracked,
+-- so releasing the hash removed only the registered file. Point every check-in at its hash's
+-- registered file and queue the other copies for deletion; utils/image_store.py removes the
+-- files at startup (SQL can't) and clears each row as it goes.
+
+CREATE TABLE IF NOT EXISTS orphaned_image_files (
+    path TEXT PRIMARY KEY,
+    queued_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO orphaned_image_files (path)
+SELECT DISTINCT c.image_path
+FROM checkins c
+JOIN image_blobs b ON b.image_hash = c.image_hash
+WHERE c.image_path <> b.path
+AND NOT EXISTS (SELECT 1 FROM image_blobs other WHERE other.path = c.image_path)
+ON CONFLICT (path) DO NOTHING;
+
+UPDATE checkins c
+SET image_path = b.path
+FROM image_blobs b
+WHERE b.image_hash = c.image_hash
+AND c.image_path <> b.path;
@@ -0,0 +1,4 @@
+-- DM flows and challenge photos keep stored paths, not hashes, and backfilled blobs live at
+-- their legacy paths; releasing them looks the hash up by path.
+
+CREATE INDEX IF NOT EXISTS idx_image_blobs_path ON image_blobs(path);
@@ -8,7 +8,7 @@ SELECT * FROM users;
 
 ### **🔍 Check User Progress (Gym & Food Logs)**
 ```sql
-SELECT * FROM progress WHERE user_id = 123456789;
+SELECT * FROM user_stats WHERE user_id = 123456789;
 ```
 
 ### **🔍 Check All Check-Ins Logged**
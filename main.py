@@ -3,13 +3,36 @@ import os
 import asyncio
 from discord.ext import commands, tasks  # Add tasks for background looping
 from dotenv import load_dotenv
+
+load_dotenv()  # Before the project imports: several read their settings from the environment at import time
+
 from database import db
-from scheduler import start_scheduler  # Import the scheduler
+from migrations import run_migrations
+from scheduler import start_scheduler, shutdown_scheduler
+from utils.image_pipeline import image_pipeline
+from utils.image_store import delete_orphaned_files
+from utils.conversations import conversations
+from utils.dm_flows import dm_flows
+from utils.challenge_messages import challenge_messages
+from utils.outbound import outbound
+from utils.users import users
+from utils.timers import timers
+from utils.challenge_lifecycle import lifecycle
+from utils.job_queue import job_queue
+from utils.gateway_sync import gateway_sync
 
-load_dotenv()
+# all: one process does everything. gateway: interactions and events only, enqueueing work.
+# worker: lifecycle, scheduled and media jobs over REST, without a gateway connection.
+BOT_ROLES = ("all", "gateway", "worker")
+BOT_ROLE = os.getenv("BOT_ROLE", "all")
 
 class Client(commands.Bot):
-    def __init__(self):
+    def __init__(self, role="all"):
+        if role not in BOT_ROLES:
+            raise ValueError(f"BOT_ROLE must be one of {', '.join(BOT_ROLES)}, not {role!r}")
+        self.role = role
+        self.handles_events = role in ("all", "gateway")
+        self.runs_jobs = role in ("all", "worker")
         intents = discord.Intents.default()
         intents.message_content = True  # Allow bot to read messages
         intents.reactions = True  # ✅ REQUIRED for detecting reactions
@@ -19,20 +42,39 @@ class Client(commands.Bot):
         self.presence_task_running = False  # Prevent multiple loop starts
 
     async def setup_hook(self):
-        print("🚀 Starting bot...")
+        print(f"🚀 Starting bot ({self.role})...")
         await db.connect()  # Connect to the database and confirm it worked
+        await run_migrations(db.pool)  # Bring the schema up to date before any cog queries it
+        await delete_orphaned_files(db.pool)  # Duplicate copies the image store backfill left untracked
+        if self.handles_events:
+            await db.pr_rankings.load(db.pool)  # Warm the PR medal rankings
+            await challenge_messages.load(db.pool)  # Reactions on other messages are dropped without a query
+            await dm_flows.load(db.pool)  # Resume challenge DM flows that were in progress before a restart
+            self.add_listener(conversations.dispatch, "on_message")  # Route replies to waiting multi-step flows
+            self.add_listener(dm_flows.dispatch, "on_message")
+        users.start(self)  # Cache-first user lookups for DMs and fan-outs
+        outbound.start(self)  # Rate-limited sender for DMs and channel posts the bot initiates
+        # Workers load the cogs too: they register the lifecycle, timer and job handlers
         for filename in os.listdir("./commands"):
             if filename.endswith(".py"):
                 await self.load_extension(f"commands.{filename[:-3]}")
+        if self.role == "gateway":
+            await gateway_sync.start()  # Workers change challenges and DM sessions behind our caches
+        if self.runs_jobs:
+            await timers.start(db.pool)  # After the cogs, so every timer kind has its handler registered
+            await lifecycle.start(self, db.pool)  # Challenge phase changes, woken by NOTIFY instead of polling
+            start_scheduler(self)  # Once per process: on_ready fires again after every gateway reconnect
+            await job_queue.start()  # Work enqueued by gateway processes
+
+    async def wait_until_ready(self):
+        # A worker never connects to the gateway; REST calls work as soon as login() returns
+        if self.role != "worker":
+            await super().wait_until_ready()
 
     async def on_ready(self):
         print(f'✅ Logged on as {self.user}!')
         await self.tree.sync()
 
-        # **Start APScheduler**
-        start_scheduler(self)
-        print("⏰ APScheduler started: Weigh-In Reminder is active!")
-
         # ✅ Set initial presence
         await self.change_presence(activity=discord.Activity(
             type=discord.ActivityType.watching,
@@ -62,19 +104,40 @@ class Client(commands.Bot):
     async def close(self):
         print("🔴 Shutting down bot...")
         self.presence_task.cancel()  # ✅ Stop presence task before shutdown
+        # Stop every background service first: they still acquire pool connections
+        image_pipeline.shutdown()
+        outbound.shutdown()
+        await timers.shutdown()
+        await lifecycle.shutdown()
+        shutdown_scheduler()
+        await job_queue.shutdown()
+        await gateway_sync.shutdown()
         await db.close()
         await super().close()
 
-client = Client()
+client = Client(BOT_ROLE)
+
+async def run_worker():
+    """Log in over REST only (this runs setup_hook) and leave the background services running."""
+    try:
+        await client.login(os.getenv("TOKEN"))
+        print("🛠️ Worker running; no gateway connection")
+        await asyncio.Event().wait()
+    finally:
+        await client.close()
 
 async def main():
     try:
-        await client.start(os.getenv("TOKEN"))  # Run the bot with a token
+        if client.role == "worker":
+            await run_worker()
+        else:
+            await client.start(os.getenv("TOKEN"))  # Run the bot with a token
     except KeyboardInterrupt:
         print("\n🛑 KeyboardInterrupt detected! Shutting down gracefully...")
         await client.close()
     finally:
         print("✅ Bot shutdown complete.")
 
-# Run the bot
-asyncio.run(main())
+# Run the bot (guarded so image worker processes can import this module safely)
+if __name__ == "__main__":
+    asyncio.run(main())
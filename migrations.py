@@ -0,0 +1,184 @@
+# migrations.py
+import argparse
+import asyncio
+import asyncpg
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from dotenv import load_dotenv
+
+MIGRATIONS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database", "migrations")
+MIGRATION_LOCK_KEY = 4_712_001  # pg_advisory_lock key so only one process migrates at a time
+
+# Hot-path queries that must never fall back to a sequential scan: (name, sql, sample args).
+# Keep these in sync with the queries in database.py and the cogs.
+CHECKED_QUERIES = [
+    ("check_cooldown (daily)", """
+        SELECT EXISTS (
+            SELECT 1 FROM checkins
+            WHERE user_id = $1 AND category = $2 AND local_day = $3
+        )
+    """, (0, "gym", datetime.now().date())),
+    ("check_cooldown (weekly)", """
+        SELECT EXISTS (
+            SELECT 1 FROM checkins
+            WHERE user_id = $1 AND category = $2 AND local_week = $3
+        )
+    """, (0, "weight", datetime.now().date())),
+    ("get_user_checkins_page", """
+        SELECT checkin_id, timestamp, workout, weight, meal, image_path FROM checkins
+        WHERE user_id = $1 AND category = $2
+        AND (timestamp, checkin_id) < ($3, $4)
+        ORDER BY timestamp DESC, checkin_id DESC
+        LIMIT $5
+    """, (0, "gym", datetime.now(), 0, 5)),
+    ("has_checkin_image", """
+        SELECT EXISTS (SELECT 1 FROM checkins WHERE user_id = $1 AND image_hash = $2)
+    """, (0, "")),
+    ("image store lookup", """
+        SELECT path, ref_count FROM image_blobs WHERE image_hash = $1
+    """, ("",)),
+    ("perceptual hash index load", """
+        SELECT DISTINCT b.phash FROM checkins c
+        JOIN image_blobs b ON b.image_hash = c.image_hash
+        WHERE c.user_id = $1 AND b.phash IS NOT NULL
+    """, (0,)),
+    ("get_user_stats", """
+        SELECT * FROM user_stats WHERE user_id = $1
+    """, (0,)),
+    ("get_leaderboard", """
+        SELECT username, points FROM users ORDER BY points DESC LIMIT 10
+    """, ()),
+    ("get_pr_rankings (deadlift)", """
+        SELECT user_id, deadlift FROM personal_records
+        WHERE deadlift IS NOT NULL ORDER BY deadlift DESC LIMIT 8
+    """, ()),
+    ("get_pr_rankings (bench)", """
+        SELECT user_id, bench FROM personal_records
+        WHERE bench IS NOT NULL ORDER BY bench DESC LIMIT 8
+    """, ()),
+    ("get_pr_rankings (squat)", """
+        SELECT user_id, squat FROM personal_records
+        WHERE squat IS NOT NULL ORDER BY squat DESC LIMIT 8
+    """, ()),
+    ("weight change leaders", """
+        SELECT user_id FROM weight_summary
+        ORDER BY ABS(latest_weight - first_weight) DESC LIMIT 3
+    """, ()),
+    ("weekly weight changes", """
+        SELECT ww.user_id, ww.last_weight - prev.last_weight FROM weight_weeks ww
+        JOIN LATERAL (
+            SELECT last_weight FROM weight_weeks p
+            WHERE p.user_id = ww.user_id AND p.local_week < ww.local_week
+            ORDER BY p.local_week DESC LIMIT 1
+        ) prev ON TRUE
+        WHERE ww.local_week = $1
+    """, (datetime.now().date(),)),
+    ("challenge join reaction", """
+        SELECT id, name FROM challenges WHERE message_id = $1 AND status = 'active'
+    """, (0,)),
+    ("vote tally", """
+        SELECT participant_id, COUNT(*) AS votes FROM votes
+        WHERE challenge_id = $1 GROUP BY participant_id
+    """, (0,)),
+    ("challenge participant lookup", """
+        SELECT * FROM challenge_participants WHERE challenge_id = $1 AND user_id = $2
+    """, (0, 0)),
+]
+
+
+def load_migrations():
+    """Return (version, name, sql) for every NNNN_name.sql file in database/migrations, in order."""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_FOLDER)):
+        match = re.match(r"^(\d+)_(\w+)\.sql$", filename)
+        if not match:
+            continue
+        with open(os.path.join(MIGRATIONS_FOLDER, filename), encoding="utf-8") as f:
+            migrations.append((int(match.group(1)), match.group(2), f.read()))
+    return migrations
+
+
+async def run_migrations(pool):
+    """Apply every migration that isn't recorded in schema_migrations yet, each in its own transaction."""
+    async with pool.acquire() as conn:
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_KEY)
+        try:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT NOW()
+                )
+            """)
+            applied = {row["version"] for row in await conn.fetch("SELECT version FROM schema_migrations")}
+
+            pending = [m for m in load_migrations() if m[0] not in applied]
+            if not pending:
+                print("✅ [Migrations] Schema is up to date.")
+                return 0
+
+            for version, name, sql in pending:
+                print(f"🛠️ [Migrations] Applying {version:04d}_{name}...")
+                async with conn.transaction():
+                    await conn.execute(sql)
+                    await conn.execute("""
+                        INSERT INTO schema_migrations (version, name) VALUES ($1, $2)
+                    """, version, name)
+
+            print(f"✅ [Migrations] Applied {len(pending)} migration(s).")
+            return len(pending)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_KEY)
+
+
+def _plan_nodes(plan):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+async def check_query_plans(pool):
+    """EXPLAIN each registered query with seq scans disabled and return the ones that still need one."""
+    failures = []
+    async with pool.acquire() as conn:
+        for name, sql, args in CHECKED_QUERIES:
+            # With enable_seqscan off the planner only picks a Seq Scan when no index can serve the query
+            async with conn.transaction():
+                await conn.execute("SET LOCAL enable_seqscan = off")
+                plan = json.loads(await conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *args))
+
+            seq_scans = [node.get("Relation Name") for node in _plan_nodes(plan[0]["Plan"])
+                         if node["Node Type"] == "Seq Scan"]
+            if seq_scans:
+                print(f"❌ [Migrations] {name}: sequential scan on {', '.join(seq_scans)}")
+                failures.append(name)
+            else:
+                print(f"✅ [Migrations] {name}: served by an index")
+
+    return failures
+
+
+async def main(argv):
+    parser = argparse.ArgumentParser(description="Apply GymBro schema migrations.")
+    parser.add_argument("--check", action="store_true",
+                        help="EXPLAIN the registered hot-path queries and fail if any uses a sequential scan")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    pool = await asyncpg.create_pool(dsn=os.getenv("DATABASE_URL"), min_size=1, max_size=1)
+    try:
+        if args.check:
+            failures = await check_query_plans(pool)
+            return 1 if failures else 0
+        await run_migrations(pool)
+        return 0
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -1,154 +1,279 @@
 import discord
 import asyncio
+import os
+import socket
+import time
+import asyncpg
 import pytz
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.schedulers.base import STATE_STOPPED
 from database import db
+from utils.outbound import outbound, PRIORITY_BULK
+from utils.users import users
+from utils.job_queue import job_queue
+from utils.job_types import ScheduledTaskJob
 from datetime import datetime
 
-scheduler = AsyncIOScheduler()
 EST = pytz.timezone("America/New_York")
+SCHEDULER_LOCK_KEY = 0x6779_6D62  # pg advisory lock held by the one instance that runs scheduled jobs
+LEADER_RETRY_SECONDS = 30  # How often a standby instance tries to take over
+MISFIRE_GRACE_SECONDS = 60 * 60  # A job missed by a restart or failover still runs if this late
+INSTANCE = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _job_store_url():
+    # SQLAlchemy only accepts the postgresql:// spelling
+    url = os.getenv("DATABASE_URL", "")
+    return "postgresql://" + url[len("postgres://"):] if url.startswith("postgres://") else url
+
+
+def _build_scheduler():
+    # Built in start_scheduler, not at import: main.py loads .env after importing this module
+    return AsyncIOScheduler(
+        jobstores={"default": SQLAlchemyJobStore(url=_job_store_url(), tablename="apscheduler_jobs")},
+        job_defaults={"coalesce": True, "misfire_grace_time": MISFIRE_GRACE_SECONDS, "max_instances": 1},
+        timezone=EST
+    )
+
+
+scheduler = None
+_bot = None
+_leader_task = None
+DISCORD_MESSAGE_LIMIT = 2000
+MENTION_PREFETCH = 500  # Rows the join-reminder cursor pulls per round trip
 
 
 async def check_users_in_challenge(bot):
-    """Checks if users are in the active challenge and notifies those who haven't joined yet."""
+    """Checks if users are in each active challenge and notifies those who haven't joined yet."""
     print("🔍 [Scheduler] Checking challenge participation...")
 
-    guild_id = 1119801250230321273  # Discord server ID
     channel_id = 1235378047390187601  # Channel for challenge notifications
 
-    guild = bot.get_guild(guild_id)
-    if not guild:
-        print("❌ [Scheduler] Guild not found!")
-        return
-
-    channel = guild.get_channel(channel_id)
+    # Works from the gateway cache or, in a REST-only worker, a cached fetch
+    channel = await users.channel(channel_id)
     if not channel:
         print("❌ [Scheduler] Channel not found!")
         return
 
-    async with db.pool.acquire() as conn:
-        print("📡 [Scheduler] Fetching active challenge...")
+    print("📡 [Scheduler] Fetching active challenges...")
+    try:
+        async with db.pool.acquire() as conn:
+            challenges = await conn.fetch("SELECT id, name FROM challenges WHERE status = 'active' ORDER BY id")
+        if not challenges:
+            print("⚠️ [Scheduler] No active challenge found. Skipping check.")
+            return
 
-        try:
-            active_challenge = await conn.fetchrow("SELECT id FROM challenges WHERE status = 'active'")
-            if not active_challenge:
-                print("⚠️ [Scheduler] No active challenge found. Skipping check.")
-                return
-
-            challenge_id = active_challenge["id"]
-            print(f"✅ [Scheduler] Active challenge ID: {challenge_id}")
-
-            print("📡 [Scheduler] Fetching registered users...")
-            registered_users = await conn.fetch("SELECT user_id, username FROM users")
-            print(f"✅ [Scheduler] Retrieved {len(registered_users)} registered users.")
-
-            print("📡 [Scheduler] Fetching challenge participants...")
-            challenge_users = await conn.fetch("SELECT user_id FROM challenge_participants WHERE challenge_id = $1", challenge_id)
-            print(f"✅ [Scheduler] Retrieved {len(challenge_users)} users in the challenge.")
-
-            challenge_user_ids = {row["user_id"] for row in challenge_users}
-            missing_users = [
-                f"<@{user['user_id']}>" for user in registered_users if user["user_id"] not in challenge_user_ids
-            ]
-
-            if missing_users:
-                missing_users_list = ", ".join(missing_users)
-                message = (
-                    f"⚠️ **The following users haven't joined the challenge yet!**\n"
-                    f"{missing_users_list}\n\n"
-                    f"📌 Use **`/join_challenge`** to participate and track your progress!"
-                )
-                print(f"📢 [Scheduler] Sending challenge reminder: {missing_users_list}")
-                await channel.send(message)
-            else:
-                print("✅ [Scheduler] All users are in the challenge. No reminder needed.")
+        for challenge in challenges:
+            await remind_missing_users(channel, challenge)
 
-        except Exception as e:
-            print(f"❌ [Scheduler] Error during challenge check: {e}")
+    except Exception as e:
+        print(f"❌ [Scheduler] Error during challenge check: {e}")
+        raise  # Recorded as a failed run, and retried by the job queue
 
     print("✅ [Scheduler] Challenge participation check completed.")
 
 
+async def remind_missing_users(channel, challenge):
+    """Mention every registered user who hasn't joined `challenge`, in as few messages as fit the limit."""
+    header = f"⚠️ **The following users haven't joined {challenge['name']} yet!**\n"
+    footer = "\n\n📌 Use **`/join_challenge`** to participate and track your progress!"
+    budget = DISCORD_MESSAGE_LIMIT - len(header) - len(footer)
+
+    sends, batch, batch_len, missing = [], [], 0, 0
+
+    def flush():
+        sends.append(outbound.submit_channel(
+            channel, header + ", ".join(batch) + footer, kind="challenge_join_reminder",
+            challenge_id=challenge["id"], priority=PRIORITY_BULK
+        ))
+
+    # Anti-join streamed through a server-side cursor: only the users to mention leave the database
+    async with db.pool.acquire() as conn, conn.transaction():
+        async for row in conn.cursor("""
+            SELECT u.user_id FROM users u
+            WHERE NOT EXISTS (
+                SELECT 1 FROM challenge_participants cp
+                WHERE cp.challenge_id = $1 AND cp.user_id = u.user_id
+            )
+            ORDER BY u.user_id
+        """, challenge["id"], prefetch=MENTION_PREFETCH):
+            mention = f"<@{row['user_id']}>"
+            added = len(mention) + (2 if batch else 0)
+            if batch and batch_len + added > budget:
+                flush()
+                batch, batch_len = [], 0
+                added = len(mention)
+            batch.append(mention)
+            batch_len += added
+            missing += 1
+
+    if batch:
+        flush()
+
+    if not missing:
+        print(f"✅ [Scheduler] Everyone is in challenge {challenge['id']}. No reminder needed.")
+        return
+
+    results = await asyncio.gather(*sends, return_exceptions=True)
+    failed = sum(isinstance(result, Exception) for result in results)
+    print(f"📢 [Scheduler] Reminded {missing} user(s) about challenge {challenge['id']} "
+          f"in {len(sends)} message(s), {failed} failed")
+
+
 async def send_weigh_in_reminder(bot):
     """ Sends a weigh-in reminder every Saturday at 12 PM EST as an embed. """
     print("🔍 [Scheduler] Sending weigh-in reminder...")
-    guild_id = 1119801250230321273  # Discord server ID
     channel_id = 1235378047390187601  # Channel for weigh-in notifications
 
-    guild = bot.get_guild(guild_id)
-    if not guild:
-        print("❌ [Scheduler] Guild not found!")
-        return
-
-    channel = guild.get_channel(channel_id)
+    channel = await users.channel(channel_id)
     if not channel:
         print("❌ [Scheduler] Channel not found!")
         return
 
-    async with db.pool.acquire() as conn:
+    try:
+        # One indexed read of weight_summary instead of two passes over every weight check-in
+        rows = await db.get_weight_change_leaders(3)
+
+        leaderboard_text = ""
+        medals = ["🥇", "🥈", "🥉"]
+        leaders = await users.resolve_many([row["user_id"] for row in rows])
+        for idx, row in enumerate(rows):
+            user = leaders.get(row["user_id"])
+            username = user.display_name if user else "Unknown"
+            first_weight = row["first_weight"]
+            recent_weight = row["recent_weight"]
+            weight_change = row["weight_change"]
+            trend_emoji = "🔼" if weight_change > 0 else "🔽"
+
+            leaderboard_text += f"{medals[idx]} **{username}** [{first_weight} → {recent_weight}] **{weight_change} lbs** {trend_emoji}\n"
+
+        if not leaderboard_text:
+            leaderboard_text = "No weigh-in data available for this week."
+
+        embed = discord.Embed(
+            title="📢 It's Weigh-In Saturday! ⚖️",
+            description="Don't forget to log your weight check-in today!",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="📝 Log Your Weight", value="Use **`/checkin weight`** to log your weight now!", inline=False)
+        embed.add_field(name="🏆 Top 3 Weight Changes This Week", value=leaderboard_text, inline=False)
+        embed.set_footer(text="✅ Stay accountable! See you next week!")
+
+        await channel.send(content="@everyone", embed=embed)
+        print("✅ [Scheduler] Sent weigh-in reminder.")
+
+    except Exception as e:
+        print(f"❌ [Scheduler] Error sending weigh-in reminder: {e}")
+        raise  # Recorded as a failed run, and retried by the job queue
+
+
+# Stable job IDs -> (coroutine taking the bot, trigger, trigger arguments). Jobs are stored by ID
+# and reference run_job by name, so they survive restarts and nothing unpicklable is persisted.
+JOBS = {
+    # ✅ Check every 12 hours if users are in the challenge
+    "check_users_in_challenge": (check_users_in_challenge, "interval", {"hours": 12}),
+    # ✅ Weigh-in reminder every Saturday at 12:00 PM EST
+    "weigh_in_reminder": (send_weigh_in_reminder, "cron", {"day_of_week": "sat", "hour": 12, "minute": 0}),
+}
+
+
+async def run_job(job_id):
+    """APScheduler entry point: hand the job to the queue, where a worker runs it with retries."""
+    await job_queue.enqueue(ScheduledTaskJob(job_id))
+
+
+async def execute_job(job):
+    """Job handler: run a registered job against the live bot and record the run in job_runs."""
+    job_id = job.job_id
+    func = JOBS[job_id][0]
+    started_at = datetime.utcnow()
+    started = time.monotonic()
+    status, error = "succeeded", None
+    try:
+        await func(_bot)
+    except Exception as e:
+        status, error = "failed", str(e)
+        print(f"❌ [Scheduler] Job {job_id} failed: {e}")
+
+    await _record_run(job_id, status, error, started_at, started)
+    if error is not None:
+        raise RuntimeError(error)  # Let the job queue retry it
+
+
+async def _record_run(job_id, status, error, started_at, started):
+    try:
+        async with db.pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO job_runs (job_id, instance, status, error, started_at, finished_at, duration_ms)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+            """, job_id, INSTANCE, status, error, started_at, datetime.utcnow(),
+                int((time.monotonic() - started) * 1000))
+    except Exception as e:
+        print(f"❌ [Scheduler] Could not record run of {job_id}: {e}")
+
+
+def _register_jobs():
+    """Add any job missing from the store; existing ones keep their next run time across restarts."""
+    for job_id, (_, trigger, trigger_args) in JOBS.items():
+        if scheduler.get_job(job_id) is None:
+            scheduler.add_job("scheduler:run_job", trigger, args=[job_id], id=job_id, **trigger_args)
+            print(f"➕ [Scheduler] Registered job {job_id}")
+
+
+async def _hold_leadership():
+    """Leader election: only the instance holding the advisory lock runs jobs; the rest stand by."""
+    await _bot.wait_until_ready()
+    while True:
+        conn = None
         try:
-            rows = await conn.fetch("""
-                WITH first_weight_cte AS (
-                    SELECT DISTINCT ON (user_id) user_id, weight AS first_weight
-                    FROM checkins
-                    WHERE category = 'weight'
-                    ORDER BY user_id, timestamp ASC
-                ),
-                recent_weight_cte AS (
-                    SELECT DISTINCT ON (user_id) user_id, weight AS recent_weight
-                    FROM checkins
-                    WHERE category = 'weight'
-                    ORDER BY user_id, timestamp DESC
-                )
-                SELECT fw.user_id, fw.first_weight, rw.recent_weight, (rw.recent_weight - fw.first_weight) AS weight_change
-                FROM first_weight_cte fw
-                JOIN recent_weight_cte rw ON fw.user_id = rw.user_id
-                ORDER BY ABS(rw.recent_weight - fw.first_weight) DESC
-                LIMIT 3;
-            """)
-
-            leaderboard_text = ""
-            medals = ["🥇", "🥈", "🥉"]
-            for idx, row in enumerate(rows):
-                user = await bot.fetch_user(row["user_id"])
-                username = user.display_name if user else "Unknown"
-                first_weight = row["first_weight"]
-                recent_weight = row["recent_weight"]
-                weight_change = row["weight_change"]
-                trend_emoji = "🔼" if weight_change > 0 else "🔽"
-
-                leaderboard_text += f"{medals[idx]} **{username}** [{first_weight} → {recent_weight}] **{weight_change} lbs** {trend_emoji}\n"
-
-            if not leaderboard_text:
-                leaderboard_text = "No weigh-in data available for this week."
-
-            embed = discord.Embed(
-                title="📢 It's Weigh-In Saturday! ⚖️",
-                description="Don't forget to log your weight check-in today!",
-                color=discord.Color.blue()
-            )
-            embed.add_field(name="📝 Log Your Weight", value="Use **`/checkin weight`** to log your weight now!", inline=False)
-            embed.add_field(name="🏆 Top 3 Weight Changes This Week", value=leaderboard_text, inline=False)
-            embed.set_footer(text="✅ Stay accountable! See you next week!")
+            conn = await asyncpg.connect(dsn=os.getenv("DATABASE_URL"))
+            while not await conn.fetchval("SELECT pg_try_advisory_lock($1)", SCHEDULER_LOCK_KEY):
+                await asyncio.sleep(LEADER_RETRY_SECONDS)
+
+            # The lock lives as long as this session; keep it and run jobs until the connection drops
+            lost = asyncio.Event()
+            conn.add_termination_listener(lambda _: lost.set())
+            if scheduler.state == STATE_STOPPED:
+                scheduler.start(paused=True)
+            _register_jobs()
+            scheduler.resume()
+            print(f"👑 [Scheduler] {INSTANCE} is the scheduler leader")
 
-            await channel.send(content="@everyone", embed=embed)
-            print("✅ [Scheduler] Sent weigh-in reminder.")
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), LEADER_RETRY_SECONDS)
+                except asyncio.TimeoutError:
+                    await conn.fetchval("SELECT 1")  # Notice a dead connection even if nothing is sent
+            raise ConnectionError("leader connection closed")
 
         except Exception as e:
-            print(f"❌ [Scheduler] Error sending weigh-in reminder: {e}")
+            if scheduler.running:
+                scheduler.pause()
+            print(f"⚠️ [Scheduler] Not leading scheduled jobs ({e}); retrying in {LEADER_RETRY_SECONDS}s")
+            await asyncio.sleep(LEADER_RETRY_SECONDS)
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
 
 
 def start_scheduler(bot):
-    """ Starts the APScheduler to send reminders and check challenge participation. """
+    """Start leader election for the persistent APScheduler jobs; safe to call more than once."""
+    global scheduler, _bot, _leader_task
+    if _leader_task is not None:
+        return
     print("⏳ [Scheduler] Initializing APScheduler...")
+    if scheduler is None:
+        scheduler = _build_scheduler()
+    _bot = bot
+    job_queue.register(ScheduledTaskJob, execute_job)
+    _leader_task = asyncio.create_task(_hold_leadership())
 
-    # ✅ Check every 12 hours if users are in the challenge
-    scheduler.add_job(check_users_in_challenge, "interval", hours=12, timezone="America/New_York", args=[bot])
-
-    # ✅ Weigh-in reminder every Saturday at 10:10 AM EST
-    scheduler.add_job(send_weigh_in_reminder, "cron", day_of_week="sat", hour=12, minute=00, timezone="America/New_York", args=[bot])
 
-    # ✅ Ensure the scheduler is running
-    if scheduler.state != 1:
-        scheduler.start()
-        print("✅ [Scheduler] APScheduler has started!")
\ No newline at end of file
+def shutdown_scheduler():
+    global _leader_task
+    if _leader_task is not None:
+        _leader_task.cancel()
+        _leader_task = None
+    if scheduler is not None and scheduler.running:
+        scheduler.shutdown(wait=False)
@@ -0,0 +1,172 @@
+# utils/challenge_lifecycle.py
+import asyncio
+import os
+import socket
+import time
+import asyncpg
+from database import db
+from utils.pg_listener import PgListener
+
+LIFECYCLE_CHANNEL = "challenge_lifecycle"  # NOTIFY channel fed by the trigger on challenges
+LIFECYCLE_RETRY_SECONDS = 60  # A phase handler that fails or leaves the phase unchanged runs again after this
+LIFECYCLE_LOCK_KEY = 0x6779_6D63  # pg advisory lock held by the one worker that runs phase transitions
+LEADER_CHECK_SECONDS = 30  # How often a standby retries the lock, and the leader checks it still holds it
+INSTANCE = f"{socket.gethostname()}:{os.getpid()}"
+
+# Each active challenge's next phase and when it is due, compared against LOCALTIMESTAMP like
+# the polling queries this replaces. Phases: the end date starts photo collection, the photo
+# deadline starts voting, and the voting end posts results.
+NEXT_TRANSITIONS_SQL = """
+    SELECT id, name, channel_id, voting_messages, phase,
+           GREATEST(0, EXTRACT(EPOCH FROM due_at - LOCALTIMESTAMP)) AS wait_seconds
+    FROM (
+        SELECT c.*,
+            CASE
+                WHEN NOT COALESCE(c.photo_collection_started, FALSE) THEN 'photo_collection'
+                WHEN NOT COALESCE(c.voting_started, FALSE) THEN 'photo_deadline'
+                WHEN NOT COALESCE(c.results_posted, FALSE) THEN 'voting_end'
+            END AS phase,
+            CASE
+                WHEN NOT COALESCE(c.photo_collection_started, FALSE) THEN c.end_date
+                WHEN NOT COALESCE(c.voting_started, FALSE) THEN c.photo_collection_deadline
+                WHEN NOT COALESCE(c.results_posted, FALSE) THEN c.voting_end_time
+            END AS due_at
+        FROM challenges c
+        WHERE c.status = 'active'
+    ) next_phase
+    WHERE phase IS NOT NULL AND due_at IS NOT NULL
+    ORDER BY due_at
+"""
+
+
+class ChallengeLifecycle:
+    """Runs challenge phase transitions exactly when they come due.
+
+    Sleeps until the earliest pending transition; a NOTIFY from the challenges trigger wakes it
+    early to recompute, so a new or edited challenge re-arms it and an idle bot issues no queries.
+    Every worker starts it, but only the one holding the advisory lock runs transitions, so a
+    phase's DMs and posts go out once. Cogs register one async handler(challenge_row) per phase.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+        self._pool = None
+        self._retry_at = {}  # (challenge_id, phase) -> monotonic time before which it isn't retried
+        self._wake = None
+        self._task = None
+        self._listener = None
+        self.transitions = 0
+
+    def register(self, phase, handler):
+        self._handlers[phase] = handler
+
+    def wake(self):
+        """Recompute the schedule now (e.g. after a manual change)."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def notify(self):
+        """Wake the engine in whichever process runs it (e.g. from a gateway-only process)."""
+        async with db.pool.acquire() as conn:
+            await conn.execute("SELECT pg_notify($1, '')", LIFECYCLE_CHANNEL)
+
+    async def start(self, bot, pool):
+        self._pool = pool
+        if self._task is None:
+            self._wake = asyncio.Event()
+            # Changes may have been missed while the LISTEN connection was down, so recompute then too
+            self._listener = PgListener("Lifecycle", {LIFECYCLE_CHANNEL: lambda _: self.wake()},
+                                        on_reconnect=self.wake)
+            await self._listener.start()
+            self._task = asyncio.create_task(self._run(bot))
+
+    async def _run(self, bot):
+        """Leader election like the scheduler's: wait for the lock, then run transitions while it's held."""
+        await bot.wait_until_ready()
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn=os.getenv("DATABASE_URL"))
+                while not await conn.fetchval("SELECT pg_try_advisory_lock($1)", LIFECYCLE_LOCK_KEY):
+                    await asyncio.sleep(LEADER_CHECK_SECONDS)
+
+                print(f"👑 [Lifecycle] {INSTANCE} is running challenge transitions")
+                await self._lead(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ [Lifecycle] Not running transitions ({e}); retrying in {LEADER_CHECK_SECONDS}s")
+                await asyncio.sleep(LEADER_CHECK_SECONDS)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+
+    async def _lead(self, conn):
+        """Run transitions until the lock connection fails; the lock lives as long as its session."""
+        while True:
+            self._wake.clear()
+            try:
+                sleep_for = await self._run_due()
+            except Exception as e:
+                print(f"❌ [Lifecycle] Error computing transitions: {e}")
+                sleep_for = LIFECYCLE_RETRY_SECONDS
+
+            if sleep_for is not None:
+                print(f"⏳ [Lifecycle] Next transition check in {sleep_for:.0f}s")
+            deadline = None if sleep_for is None else time.monotonic() + sleep_for
+            while True:
+                remaining = LEADER_CHECK_SECONDS if deadline is None else deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wake.wait(), min(remaining, LEADER_CHECK_SECONDS))
+                    break
+                except asyncio.TimeoutError:
+                    await conn.fetchval("SELECT 1")  # Raises if the lock's session is gone
+
+    async def _run_due(self):
+        """Fire every due transition; return seconds until the next one (None if nothing is pending)."""
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(NEXT_TRANSITIONS_SQL)
+
+        now = time.monotonic()
+        waits = []
+        for row in rows:
+            key = (row["id"], row["phase"])
+            wait = float(row["wait_seconds"])
+            retry_at = self._retry_at.get(key)
+            if retry_at is not None and retry_at > now:
+                waits.append(max(wait, retry_at - now))
+                continue
+            if wait > 0:
+                waits.append(wait)
+                continue
+
+            handler = self._handlers.get(row["phase"])
+            if handler is None:
+                continue
+
+            print(f"🎯 [Lifecycle] {row['phase']} for challenge '{row['name']}' (ID: {row['id']})")
+            self.transitions += 1
+            # If the handler doesn't move the challenge on, this keeps it from spinning
+            self._retry_at[key] = now + LIFECYCLE_RETRY_SECONDS
+            try:
+                await handler(row)
+            except Exception as e:
+                print(f"❌ [Lifecycle] {row['phase']} failed for challenge {row['id']}: {e}")
+            waits.append(0)  # Recompute right away: the handler usually advanced the phase
+
+        live_keys = {(row["id"], row["phase"]) for row in rows}
+        self._retry_at = {k: t for k, t in self._retry_at.items() if k in live_keys}
+        return min(waits) if waits else None
+
+    async def shutdown(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+
+lifecycle = ChallengeLifecycle()
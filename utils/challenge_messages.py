@@ -0,0 +1,68 @@
+# utils/challenge_messages.py
+import json
+
+
+class ChallengeMessageIndex:
+    """In-process set of the messages whose reactions matter: live challenge join posts and voting posts.
+
+    Lets on_raw_reaction_add drop every other reaction without touching the database. Loaded at
+    startup and kept current by the code that creates challenges, starts voting and completes them.
+    """
+
+    def __init__(self):
+        self._join = {}  # message_id -> challenge_id
+        self._voting = {}  # message_id -> (challenge_id, participant user_id)
+        self.reactions_seen = 0
+        self.fast_path_hits = 0  # Reactions answered from memory alone
+
+    async def load(self, pool):
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT id, message_id, voting_messages
+                FROM challenges
+                WHERE status = 'active'
+            """)
+
+        self._join, self._voting = {}, {}
+        for row in rows:
+            if row["message_id"]:
+                self._join[row["message_id"]] = row["id"]
+            # Saved post by post while the gallery uploads, before voting_started is set
+            if row["voting_messages"]:
+                self.set_voting(row["id"], row["voting_messages"])
+
+        print(f"✅ [ChallengeMessages] Indexed {len(self._join)} join and {len(self._voting)} voting message(s)")
+
+    def add_join(self, message_id, challenge_id):
+        self._join[message_id] = challenge_id
+
+    def set_voting(self, challenge_id, voting_messages):
+        """Index a challenge's voting posts ([{message_id, user_id, ...}], or its JSON text)."""
+        if isinstance(voting_messages, str):
+            voting_messages = json.loads(voting_messages)
+        for msg_info in voting_messages:
+            self._voting[msg_info["message_id"]] = (challenge_id, msg_info["user_id"])
+
+    def remove_challenge(self, challenge_id):
+        """Forget every message of a challenge that is no longer active."""
+        self._join = {m: c for m, c in self._join.items() if c != challenge_id}
+        self._voting = {m: v for m, v in self._voting.items() if v[0] != challenge_id}
+
+    def join_challenge(self, message_id):
+        """challenge_id whose join post this is, or None. Counts toward the fast-path hit rate."""
+        self.reactions_seen += 1
+        challenge_id = self._join.get(message_id)
+        if challenge_id is None:
+            self.fast_path_hits += 1
+        return challenge_id
+
+    def voting_entry(self, message_id):
+        """(challenge_id, participant user_id) for a voting post, or None."""
+        return self._voting.get(message_id)
+
+    @property
+    def hit_rate(self):
+        return self.fast_path_hits / self.reactions_seen if self.reactions_seen else 0.0
+
+
+challenge_messages = ChallengeMessageIndex()
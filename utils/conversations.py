@@ -0,0 +1,108 @@
+# utils/conversations.py
+import asyncio
+
+
+class ConversationCancelled(Exception):
+    """Raised inside a waiting flow when its conversation was cancelled or superseded."""
+
+
+class Conversation:
+    """One user's pending multi-step flow in one channel.
+
+    Messages routed to it are buffered, so nothing sent between two waits is lost.
+    """
+
+    def __init__(self, router, user_id, channel_id, timeout):
+        self.router = router
+        self.key = (user_id, channel_id)
+        self.timeout = timeout
+        self.cancelled = False
+        self._queue = asyncio.Queue()
+
+    def feed(self, message):
+        self._queue.put_nowait(message)
+
+    async def next_message(self, check=None, timeout=None):
+        """Return the next routed message passing check, skipping the ones that don't.
+
+        Raises asyncio.TimeoutError like bot.wait_for, and ConversationCancelled if the
+        conversation is cancelled while waiting.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout if timeout is not None else self.timeout)
+
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            message = await asyncio.wait_for(self._queue.get(), remaining)
+            if message is None:
+                raise ConversationCancelled()
+            if check is None or check(message):
+                return message
+
+    def cancel(self):
+        """Wake any waiter with ConversationCancelled and stop routing to this conversation."""
+        if not self.cancelled:
+            self.cancelled = True
+            self._queue.put_nowait(None)
+        self.close()
+
+    def close(self):
+        """Stop routing messages here; the flow is finished."""
+        self.router.close(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConversationRouter:
+    """Routes each incoming message to at most one waiting flow with a single dict lookup.
+
+    Replaces bot.wait_for("message", check=...), where discord.py runs every pending check
+    on every message the bot sees.
+    """
+
+    def __init__(self, default_timeout=300):
+        self.default_timeout = default_timeout
+        self._conversations = {}
+
+    def open(self, user_id, channel_id, timeout=None):
+        """Start a conversation for (user_id, channel_id), cancelling any older one for the same key."""
+        existing = self._conversations.get((user_id, channel_id))
+        if existing is not None:
+            existing.cancel()
+
+        conversation = Conversation(self, user_id, channel_id, timeout or self.default_timeout)
+        self._conversations[conversation.key] = conversation
+        return conversation
+
+    def close(self, conversation):
+        if self._conversations.get(conversation.key) is conversation:
+            del self._conversations[conversation.key]
+
+    def cancel(self, user_id, channel_id):
+        """Cancel the conversation for (user_id, channel_id), if there is one."""
+        conversation = self._conversations.get((user_id, channel_id))
+        if conversation is not None:
+            conversation.cancel()
+            return True
+        return False
+
+    @property
+    def active(self):
+        return len(self._conversations)
+
+    async def dispatch(self, message):
+        """on_message listener: hand the message to its conversation, if one is waiting."""
+        if message.author.bot:
+            return
+        conversation = self._conversations.get((message.author.id, message.channel.id))
+        if conversation is not None:
+            conversation.feed(message)
+
+
+conversations = ConversationRouter()
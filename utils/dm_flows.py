@@ -0,0 +1,414 @@
+# utils/dm_flows.py
+import asyncio
+import json
+import discord
+from database import db
+from utils.image_pipeline import ImagePipelineBusy, BUSY_MESSAGE
+from utils.image_store import store_image, release_image, release_images_at
+from utils.gallery import schedule_collage
+
+PHOTOS_REQUIRED = 4
+
+# Pose instructions for final photos
+FINAL_POSES = [
+    {
+        "pose": "Relaxed Front Pose",
+        "instruction": "📸 Upload your **Relaxed Front Pose** photo:",
+        "description": "Stand naturally facing the camera, arms at your sides"
+    },
+    {
+        "pose": "Front Double Biceps",
+        "instruction": "📸 Upload your **Front Double Biceps** photo:",
+        "description": "Face the camera, flex both biceps with arms up"
+    },
+    {
+        "pose": "Rear Double Biceps",
+        "instruction": "📸 Upload your **Rear Double Biceps** photo:",
+        "description": "Turn around, flex both biceps with back to camera"
+    },
+    {
+        "pose": "Relaxed Back Pose",
+        "instruction": "📸 Upload your **Relaxed Back Pose** photo:",
+        "description": "Turn around, stand naturally with back to camera"
+    }
+]
+
+# Steps of each flow in order: (step, kind of reply, prompt). Every flow starts with its photos.
+FLOW_STEPS = {
+    "onboarding": [
+        ("photos", "photos", None),
+        ("current_weight", "number", "⚖️ What is your **current weight** in pounds? (e.g., 175.5)"),
+        ("goal_weight", "number", "🎯 What is your **goal weight** in pounds?"),
+        ("personal_goal", "text", "💬 What is your **personal goal** for this challenge? (e.g., 'Lose 10 lbs and build muscle')"),
+    ],
+    "final_photos": [
+        ("photos", "photos", None),
+        ("final_weight", "number", "⚖️ What is your **final weight** in pounds? (e.g., 175.5)"),
+    ],
+}
+
+DONE = "done"
+
+FLOW_NAMES = {"onboarding": "registration", "final_photos": "final photo submission"}
+RESTART_HINTS = {
+    "onboarding": "react to the challenge message again to register",
+    "final_photos": "ask an admin to resend your final photo request",
+}
+
+
+class DMSessionBusy(Exception):
+    """The user is partway through a different flow, which starting another would overwrite."""
+
+
+def _step_index(flow, step):
+    if step == DONE:
+        return len(FLOW_STEPS[flow])
+    return next(i for i, (name, _, _) in enumerate(FLOW_STEPS[flow]) if name == step)
+
+
+def _next_step(flow, step):
+    steps = FLOW_STEPS[flow]
+    index = _step_index(flow, step) + 1
+    return steps[index][0] if index < len(steps) else DONE
+
+
+def _pose_embed(index):
+    pose_data = FINAL_POSES[index]
+    return discord.Embed(
+        title=f"📸 Photo {index + 1}/4: {pose_data['pose']}",
+        description=(
+            f"{pose_data['instruction']}\n\n"
+            f"💡 **Tip:** {pose_data['description']}\n\n"
+            "Upload your photo when ready!"
+        ),
+        color=discord.Color.blue()
+    )
+
+
+class DMFlowEngine:
+    """Persisted state machine behind the challenge DM flows.
+
+    Progress lives in dm_sessions rather than in a waiting coroutine, so a restart loses
+    nothing and an idle user costs one small dict entry. Each reply is routed with a dict
+    lookup and advanced with one conditional UPDATE, which also makes concurrent replies
+    from the same user safe.
+    """
+
+    def __init__(self):
+        self._sessions = {}  # user_id -> {channel_id, challenge_id, challenge_name, flow, step}
+
+    async def load(self, pool):
+        """Resume every open session for an active challenge."""
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT s.user_id, s.channel_id, s.challenge_id, s.flow, s.step, c.name AS challenge_name
+                FROM dm_sessions s
+                JOIN challenges c ON c.id = s.challenge_id
+                WHERE c.status = 'active'
+            """)
+
+        self._sessions = {
+            row["user_id"]: {
+                "channel_id": row["channel_id"],
+                "challenge_id": row["challenge_id"],
+                "challenge_name": row["challenge_name"],
+                "flow": row["flow"],
+                "step": row["step"],
+            }
+            for row in rows
+        }
+        print(f"✅ [DMFlows] Resumed {len(self._sessions)} DM session(s).")
+
+    async def reload_user(self, user_id):
+        """Re-read one user's session after another process started or ended it."""
+        async with db.pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT s.channel_id, s.challenge_id, s.flow, s.step, c.name AS challenge_name
+                FROM dm_sessions s
+                JOIN challenges c ON c.id = s.challenge_id
+                WHERE s.user_id = $1 AND c.status = 'active'
+            """, user_id)
+
+        if row is None:
+            self._sessions.pop(user_id, None)
+        else:
+            self._sessions[user_id] = dict(row)
+
+    @property
+    def active(self):
+        return len(self._sessions)
+
+    async def start(self, channel, user_id, flow, challenge_id, challenge_name):
+        """Start (or restart) a flow for user_id in their DM channel.
+
+        A user has one session at a time, since replies are routed by user. Restarting the same
+        flow for the same challenge resets it; a different flow for an active challenge is left
+        alone, the user is told to finish it, and DMSessionBusy is raised.
+        """
+        first_step = FLOW_STEPS[flow][0][0]
+        async with db.pool.acquire() as conn:
+            async with conn.transaction():
+                current = await conn.fetchrow("""
+                    SELECT s.flow, s.challenge_id, s.photos, c.name AS challenge_name,
+                           COALESCE(c.status = 'active', FALSE) AS live
+                    FROM dm_sessions s
+                    LEFT JOIN challenges c ON c.id = s.challenge_id
+                    WHERE s.user_id = $1
+                    FOR UPDATE OF s
+                """, user_id)
+                same = current is not None and (current["flow"], current["challenge_id"]) == (flow, challenge_id)
+                replace_stale = current is not None and not current["live"]
+
+                # The WHERE also refuses a session a concurrent start() inserted after the SELECT
+                status = await conn.execute("""
+                    INSERT INTO dm_sessions (user_id, channel_id, challenge_id, flow, step)
+                    VALUES ($1, $2, $3, $4, $5)
+                    ON CONFLICT (user_id) DO UPDATE
+                    SET channel_id = EXCLUDED.channel_id,
+                        challenge_id = EXCLUDED.challenge_id,
+                        flow = EXCLUDED.flow,
+                        step = EXCLUDED.step,
+                        photos = '{}',
+                        answers = '{}',
+                        started_at = NOW(),
+                        updated_at = NOW()
+                    WHERE (dm_sessions.flow = EXCLUDED.flow AND dm_sessions.challenge_id = EXCLUDED.challenge_id)
+                       OR $6
+                """, user_id, channel.id, challenge_id, flow, first_step, replace_stale)
+
+        if status.endswith(" 0"):
+            busy = current if current is not None and current["live"] else None
+            what = f"your {FLOW_NAMES[busy['flow']]} for **{busy['challenge_name']}**" if busy else "another flow"
+            await channel.send(f"⚠️ You're still partway through {what}. Finish it first, then {RESTART_HINTS[flow]}.")
+            raise DMSessionBusy(f"user {user_id} is in another DM flow")
+
+        if current is not None and (same or replace_stale):
+            # The replaced session's photos lose their reference
+            await release_images_at(current["photos"])
+
+        self._sessions[user_id] = {
+            "channel_id": channel.id,
+            "challenge_id": challenge_id,
+            "challenge_name": challenge_name,
+            "flow": flow,
+            "step": first_step,
+        }
+
+        if flow == "final_photos":
+            await channel.send(embed=_pose_embed(0))
+
+    async def cancel_challenge(self, challenge_id):
+        """Close every open session for a challenge, e.g. once its photo deadline has passed."""
+        async with db.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                DELETE FROM dm_sessions WHERE challenge_id = $1 RETURNING user_id, photos
+            """, challenge_id)
+
+        for row in rows:
+            self._sessions.pop(row["user_id"], None)
+            await release_images_at(row["photos"])
+        return len(rows)
+
+    def _advance(self, user_id, session, step):
+        """Move the cached step forward only; replies handled out of order must not rewind it."""
+        if _step_index(session["flow"], step) > _step_index(session["flow"], session["step"]):
+            session["step"] = step
+        if step == DONE and self._sessions.get(user_id) is session:
+            del self._sessions[user_id]
+
+    async def dispatch(self, message):
+        """on_message listener: advance the sender's DM session, if they have one."""
+        if message.guild is not None or message.author.bot:
+            return
+
+        session = self._sessions.get(message.author.id)
+        if session is None or session["channel_id"] != message.channel.id:
+            return
+
+        try:
+            if session["step"] == "photos":
+                await self._handle_photos(message, session)
+            else:
+                await self._handle_answer(message, session)
+        except Exception as e:
+            print(f"❌ [DMFlows] Error handling {session['flow']} reply from {message.author.id}: {e}")
+            await message.channel.send("❌ Something went wrong saving that. Please try sending it again.")
+
+    async def _handle_photos(self, message, session):
+        user_id, channel, flow = message.author.id, message.channel, session["flow"]
+        images = [a for a in message.attachments if a.content_type and a.content_type.startswith("image/")]
+        if not images:
+            await channel.send("📸 Please upload a photo to continue.")
+            return
+
+        for attachment in images:
+            try:
+                image_hash, file_path, _ = await store_image(await attachment.read())
+            except ImagePipelineBusy:
+                await channel.send(BUSY_MESSAGE)
+                return
+
+            async with db.pool.acquire() as conn:
+                row = await conn.fetchrow("""
+                    UPDATE dm_sessions
+                    SET photos = array_append(photos, $2),
+                        step = CASE WHEN cardinality(photos) + 1 >= $3 THEN $4 ELSE step END,
+                        updated_at = NOW()
+                    WHERE user_id = $1 AND step = 'photos' AND cardinality(photos) < $3
+                    RETURNING step, cardinality(photos) AS photo_count
+                """, user_id, file_path, PHOTOS_REQUIRED, _next_step(flow, "photos"))
+
+            if row is None:
+                # Already have every photo (another message got there first)
+                await release_image(image_hash)
+                return
+
+            self._advance(user_id, session, row["step"])
+            photo_count = row["photo_count"]
+
+            if row["step"] != "photos":
+                await channel.send(f"🎉 All {PHOTOS_REQUIRED} photos received! Now let's get your details...")
+                await self._prompt(channel, flow, row["step"])
+                return
+
+            if flow == "final_photos":
+                await channel.send(f"✅ Photo {photo_count}/4 received! Great work!")
+                await asyncio.sleep(1)
+                await channel.send("━" * 30)
+                await channel.send(embed=_pose_embed(photo_count))
+            else:
+                await channel.send(f"✅ Photo {photo_count}/4 received!")
+
+    async def _handle_answer(self, message, session):
+        user_id, channel, flow, step = message.author.id, message.channel, session["flow"], session["step"]
+        kind = FLOW_STEPS[flow][_step_index(flow, step)][1]
+
+        answer = message.content.strip()
+        if not answer:
+            return
+        if kind == "number":
+            try:
+                float(answer)
+            except ValueError:
+                await channel.send("❌ Invalid weight format. Please enter a number in pounds (e.g., 175.5).")
+                return
+
+        next_step = _next_step(flow, step)
+        async with db.pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                UPDATE dm_sessions
+                SET answers = answers || jsonb_build_object($2::text, $3::text),
+                    step = $4,
+                    updated_at = NOW()
+                WHERE user_id = $1 AND step = $2
+                RETURNING challenge_id, photos, answers
+            """, user_id, step, answer, next_step)
+
+        if row is None:
+            return  # A concurrent reply already answered this step
+
+        if next_step != DONE:
+            self._advance(user_id, session, next_step)
+            await self._prompt(channel, flow, next_step)
+            return
+
+        answers = json.loads(row["answers"])
+        if flow == "onboarding":
+            await self._finish_onboarding(channel, user_id, session, row["photos"], answers)
+        else:
+            await self._finish_final_photos(channel, user_id, session, row["photos"], answers)
+        self._advance(user_id, session, DONE)
+
+    async def _prompt(self, channel, flow, step):
+        prompt = FLOW_STEPS[flow][_step_index(flow, step)][2]
+        if prompt:
+            await channel.send(prompt)
+
+    async def _finish_onboarding(self, channel, user_id, session, photos, answers):
+        current_weight = float(answers["current_weight"])
+        goal_weight = float(answers["goal_weight"])
+        personal_goal = answers["personal_goal"]
+
+        # Update DB with all collected data
+        async with db.pool.acquire() as conn:
+            async with conn.transaction():
+                previous = await conn.fetchrow("""
+                    SELECT initial_photos FROM challenge_participants
+                    WHERE challenge_id = $1 AND user_id = $2
+                    FOR UPDATE
+                """, session["challenge_id"], user_id)
+                await conn.execute("""
+                    UPDATE challenge_participants
+                    SET current_weight = $1,
+                        goal_weight = $2,
+                        personal_goal = $3,
+                        initial_photos = $4
+                    WHERE challenge_id = $5 AND user_id = $6
+                """, current_weight, goal_weight, personal_goal, photos, session["challenge_id"], user_id)
+                await conn.execute("DELETE FROM dm_sessions WHERE user_id = $1", user_id)
+
+        # Replaced photos lose their reference; with no participant row, the new ones have no owner
+        await release_images_at((previous["initial_photos"] or []) if previous else photos)
+
+        # Final confirmation
+        embed = discord.Embed(
+            title="✅ Registration Complete!",
+            description=(
+                f"You're now fully registered for **{session['challenge_name']}**!\n\n"
+                f"📊 **Your Details:**\n"
+                f"• Starting Weight: {current_weight} lbs\n"
+                f"• Goal Weight: {goal_weight} lbs\n"
+                f"• Personal Goal: {personal_goal}\n"
+                f"• Photos: {len(photos)} submitted\n\n"
+                f"💪 Good luck with your fitness journey!"
+            ),
+            color=discord.Color.green()
+        )
+        await channel.send(embed=embed)
+
+    async def _finish_final_photos(self, channel, user_id, session, photos, answers):
+        final_weight = float(answers["final_weight"])
+
+        async with db.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("DELETE FROM dm_sessions WHERE user_id = $1", user_id)
+
+                # Only the first completed submission counts
+                updated = await conn.fetchval("""
+                    UPDATE challenge_participants
+                    SET final_photos = $1,
+                        final_weight = $2,
+                        submitted_final = TRUE,
+                        submission_date = NOW()
+                    WHERE challenge_id = $3 AND user_id = $4
+                    AND COALESCE(submitted_final, FALSE) = FALSE
+                    RETURNING TRUE
+                """, photos, final_weight, session["challenge_id"], user_id)
+
+        if not updated:
+            await release_images_at(photos)  # Nothing references this duplicate submission
+            await channel.send("✅ You have already submitted your final photos for this challenge!")
+            return
+
+        # Render the voting collage now, while collection is still open
+        await schedule_collage(session["challenge_id"], user_id)
+
+        # Send completion confirmation
+        completion_embed = discord.Embed(
+            title="🎉 Final Submission Complete!",
+            description=(
+                f"**Challenge:** {session['challenge_name']}\n\n"
+                f"✅ **Photos Submitted:** {len(photos)}/4\n"
+                f"⚖️ **Final Weight:** {final_weight} lbs\n\n"
+                "Thank you for participating! 🏆\n"
+                "Voting will begin once all participants have submitted their photos."
+            ),
+            color=discord.Color.green()
+        )
+        completion_embed.set_footer(text="Good luck in the voting phase!")
+
+        await channel.send(embed=completion_embed)
+        print(f"🎉 [DMFlows] Final photo collection completed for user {user_id}")
+
+
+dm_flows = DMFlowEngine()
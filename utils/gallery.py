@@ -0,0 +1,62 @@
+# utils/gallery.py
+import asyncio
+import os
+from database import db
+from utils.image_pipeline import image_pipeline, render_collage
+from utils.image_store import IMAGE_STORE_FOLDER
+from utils.job_queue import job_queue
+from utils.job_types import RenderCollageJob
+
+COLLAGE_FOLDER = os.path.join(IMAGE_STORE_FOLDER, "collages")
+
+
+def collage_path_for(challenge_id, user_id):
+    return os.path.join(COLLAGE_FOLDER, str(challenge_id), f"{user_id}.webp")
+
+
+async def build_collage(challenge_id, user_id, initial_photos, final_photos):
+    """Render a participant's before/after collage in the image pool and remember its path."""
+    path = await image_pipeline.run(
+        render_collage, list(initial_photos or [])[:4], list(final_photos or [])[:4],
+        collage_path_for(challenge_id, user_id)
+    )
+    async with db.pool.acquire() as conn:
+        await conn.execute("""
+            UPDATE challenge_participants SET collage_path = $1
+            WHERE challenge_id = $2 AND user_id = $3
+        """, path, challenge_id, user_id)
+    return path
+
+
+async def schedule_collage(challenge_id, user_id):
+    """Queue a collage render for a worker, so it happens during photo collection and survives restarts."""
+    await job_queue.enqueue(RenderCollageJob(challenge_id, user_id))
+
+
+async def render_collage_job(job):
+    """Job handler: render one participant's collage."""
+    await render_collages([{'challenge_id': job.challenge_id, 'user_id': job.user_id}])
+
+
+async def render_collages(payloads):
+    """Render every given collage, as many at once as the pool has workers.
+
+    Also the handler for render_collage timers queued before collages moved to the job queue.
+    Raises (so the batch is retried) if the pool is saturated.
+    """
+    async with db.pool.acquire() as conn:
+        participants = await conn.fetch("""
+            SELECT cp.challenge_id, cp.user_id, cp.initial_photos, cp.final_photos
+            FROM challenge_participants cp
+            JOIN unnest($1::int[], $2::bigint[]) AS due(challenge_id, user_id)
+              ON due.challenge_id = cp.challenge_id AND due.user_id = cp.user_id
+            WHERE cp.submitted_final = TRUE
+        """, [p['challenge_id'] for p in payloads], [p['user_id'] for p in payloads])
+
+    for start in range(0, len(participants), image_pipeline.workers):
+        chunk = participants[start:start + image_pipeline.workers]
+        await asyncio.gather(*(
+            build_collage(p['challenge_id'], p['user_id'], p['initial_photos'], p['final_photos'])
+            for p in chunk
+        ))
+    print(f"🖼️ [Gallery] Rendered {len(participants)} collage(s)")
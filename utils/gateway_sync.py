@@ -0,0 +1,65 @@
+# utils/gateway_sync.py
+import asyncio
+from database import db
+from utils.challenge_messages import challenge_messages
+from utils.dm_flows import dm_flows
+from utils.pg_listener import PgListener
+from utils.challenge_lifecycle import LIFECYCLE_CHANNEL
+
+DM_SESSIONS_CHANNEL = "dm_sessions"  # NOTIFY channel fed by the trigger on dm_sessions
+
+
+class GatewaySync:
+    """Keeps a gateway-only process's in-memory indexes current while workers change challenges.
+
+    Workers start voting, complete challenges and open or close DM sessions; the triggers on
+    challenges and dm_sessions NOTIFY, and this reloads the reaction index or the one session.
+    """
+
+    def __init__(self):
+        self._listener = None
+        self._reload = None
+        self._stale = False
+
+    async def start(self):
+        if self._listener is None:
+            self._listener = PgListener("GatewaySync", {
+                LIFECYCLE_CHANNEL: lambda _: self._reload_messages(),
+                DM_SESSIONS_CHANNEL: self._reload_session,
+            }, on_reconnect=self._resync)
+            await self._listener.start()
+
+    def _reload_messages(self):
+        # A burst of challenge updates costs one reload, plus one more if any arrive mid-reload
+        self._stale = True
+        if self._reload is None or self._reload.done():
+            self._reload = asyncio.get_running_loop().create_task(self._reload_until_current())
+
+    async def _reload_until_current(self):
+        while self._stale:
+            self._stale = False
+            await self._guard("reaction index reload", challenge_messages.load(db.pool))
+
+    def _reload_session(self, payload):
+        asyncio.get_running_loop().create_task(
+            self._guard(f"DM session reload for {payload}", dm_flows.reload_user(int(payload)))
+        )
+
+    def _resync(self):
+        self._reload_messages()
+        asyncio.get_running_loop().create_task(self._guard("DM session resync", dm_flows.load(db.pool)))
+
+    @staticmethod
+    async def _guard(what, coro):
+        try:
+            await coro
+        except Exception as e:
+            print(f"❌ [GatewaySync] {what} failed: {e}")
+
+    async def shutdown(self):
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+
+gateway_sync = GatewaySync()
@@ -0,0 +1,164 @@
+# utils/image_pipeline.py
+import asyncio
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw
+
+MAX_IMAGE_SIZE = (600, 600)
+COLLAGE_TILE_SIZE = (360, 480)  # One pose photo in a before/after collage
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))  # Worker processes doing decode/resize/encode
+MAX_QUEUED_IMAGES = int(os.getenv("MAX_QUEUED_IMAGES", "16"))  # In flight + waiting before we push back
+
+BUSY_MESSAGE = "📸 I'm processing a lot of photos right now. Please try again in a minute!"
+
+
+class ImagePipelineBusy(Exception):
+    """Raised when the image queue is full; callers should ask the user to retry."""
+
+
+def _write_atomically(dest_path, write):
+    """Write to a temp file in the destination folder, then rename over dest_path."""
+    folder = os.path.dirname(dest_path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def dhash(img, hash_size=8):
+    """64-bit difference hash: compares neighbouring pixels of a tiny grayscale copy.
+
+    Survives re-encodes, resizes and light crops, unlike the MD5 content hash. Returned
+    as a signed value so it fits a Postgres BIGINT.
+    """
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits - (1 << 64) if bits >= (1 << 63) else bits
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two 64-bit hashes."""
+    return ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+
+def encode_webp(image_bytes, dest_path, max_size=MAX_IMAGE_SIZE):
+    """Runs in a worker process: decode once from memory, hash, thumbnail and save as WEBP.
+
+    Returns the image's dHash, or None if Pillow couldn't read it.
+    """
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        img.load()
+        phash = dhash(img)
+        img.thumbnail(max_size, Image.LANCZOS)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB")
+        _write_atomically(dest_path, lambda f: img.save(f, "WEBP", quality=85, optimize=True))
+        return phash
+    except Exception as e:
+        # Keep the upload rather than lose it if Pillow can't read the format
+        print(f"Error compressing image {dest_path}: {e}")
+        _write_atomically(dest_path, lambda f: f.write(image_bytes))
+        return None
+
+
+def dhash_bytes(image_bytes):
+    """Runs in a worker process: dHash of in-memory image bytes (None if unreadable)."""
+    try:
+        return dhash(Image.open(io.BytesIO(image_bytes)))
+    except Exception as e:
+        print(f"Error hashing image bytes: {e}")
+        return None
+
+
+def dhash_file(path):
+    """Runs in a worker process: dHash of an image already on disk (None if unreadable)."""
+    try:
+        with Image.open(path) as img:
+            return dhash(img)
+    except Exception as e:
+        print(f"Error hashing image {path}: {e}")
+        return None
+
+
+def render_collage(before_paths, after_paths, dest_path, tile_size=COLLAGE_TILE_SIZE):
+    """Runs in a worker process: one image with each pose's before photo beside its after photo.
+
+    Unreadable or missing photos leave their cell blank. Returns dest_path.
+    """
+    header = 40
+    tile_w, tile_h = tile_size
+    rows = max(len(before_paths), len(after_paths), 1)
+    canvas = Image.new("RGB", (tile_w * 2, header + tile_h * rows), (24, 24, 24))
+    draw = ImageDraw.Draw(canvas)
+
+    for col, (label, paths) in enumerate((("BEFORE", before_paths), ("AFTER", after_paths))):
+        left, top, right, bottom = draw.textbbox((0, 0), label)
+        draw.text((col * tile_w + (tile_w - (right - left)) // 2, (header - (bottom - top)) // 2), label, fill="white")
+
+        for row, path in enumerate(paths):
+            try:
+                with Image.open(path) as img:
+                    img = img.convert("RGB")
+                    img.thumbnail(tile_size, Image.LANCZOS)
+                    x = col * tile_w + (tile_w - img.width) // 2
+                    y = header + row * tile_h + (tile_h - img.height) // 2
+                    canvas.paste(img, (x, y))
+            except Exception as e:
+                print(f"Error adding {path} to collage: {e}")
+
+    _write_atomically(dest_path, lambda f: canvas.save(f, "WEBP", quality=85, optimize=True))
+    return dest_path
+
+
+class ImagePipeline:
+    """Bounded process pool for image work, so encoding never blocks the event loop."""
+
+    def __init__(self, workers=IMAGE_WORKERS, max_queued=MAX_QUEUED_IMAGES):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.pending = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool, raising ImagePipelineBusy instead of queueing without bound."""
+        if self.pending >= self.max_queued:
+            raise ImagePipelineBusy(f"{self.pending} images already queued")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    async def save_webp(self, image_bytes, dest_path, max_size=MAX_IMAGE_SIZE):
+        """Compress uploaded bytes to WEBP at dest_path; returns the image's dHash."""
+        return await self.run(encode_webp, image_bytes, dest_path, max_size)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_pipeline = ImagePipeline()
@@ -0,0 +1,102 @@
+# utils/image_store.py
+import hashlib
+import os
+from database import db
+from utils.image_pipeline import image_pipeline, dhash_bytes
+
+IMAGE_STORE_FOLDER = os.getenv("IMAGE_STORE_FOLDER", "image_store")
+
+
+def hash_image(image_bytes):
+    """Content hash used as the store key (MD5, matching checkins.image_hash)."""
+    return hashlib.md5(image_bytes).hexdigest()
+
+
+def image_path_for(image_hash):
+    """Sharded location for a hash: image_store/ab/cd/abcd....webp"""
+    return os.path.join(IMAGE_STORE_FOLDER, image_hash[:2], image_hash[2:4], f"{image_hash}.webp")
+
+
+async def store_image(image_bytes, image_hash=None):
+    """Store uploaded bytes once per content hash and take a reference to them.
+
+    Returns (image_hash, path, phash). Only the first reference to a hash pays for the WEBP
+    encode; later ones (from any feature) reuse the stored file and its perceptual hash.
+    Raises ImagePipelineBusy, without keeping the reference, when the encoder queue is full.
+    """
+    image_hash = image_hash or hash_image(image_bytes)
+
+    async with db.pool.acquire() as conn:
+        blob = await conn.fetchrow("""
+            INSERT INTO image_blobs (image_hash, path, ref_count)
+            VALUES ($1, $2, 1)
+            ON CONFLICT (image_hash) DO UPDATE SET ref_count = image_blobs.ref_count + 1
+            RETURNING path, ref_count, phash
+        """, image_hash, image_path_for(image_hash))
+
+    path, phash = blob["path"], blob["phash"]
+    try:
+        if blob["ref_count"] == 1 or not os.path.exists(path):
+            phash = await image_pipeline.save_webp(image_bytes, path)
+        elif phash is None:
+            phash = await image_pipeline.run(dhash_bytes, image_bytes)
+    except Exception:
+        await release_image(image_hash)
+        raise
+
+    if phash is not None and phash != blob["phash"]:
+        async with db.pool.acquire() as conn:
+            await conn.execute("UPDATE image_blobs SET phash = $2 WHERE image_hash = $1", image_hash, phash)
+
+    return image_hash, path, phash
+
+
+async def release_image(image_hash):
+    """Drop one reference; the file and its row go away with the last one."""
+    async with db.pool.acquire() as conn:
+        async with conn.transaction():
+            blob = await conn.fetchrow("""
+                UPDATE image_blobs SET ref_count = ref_count - 1
+                WHERE image_hash = $1
+                RETURNING path, ref_count
+            """, image_hash)
+            if blob and blob["ref_count"] <= 0:
+                await conn.execute("DELETE FROM image_blobs WHERE image_hash = $1", image_hash)
+                # Unlink while the row lock is held: a concurrent store_image of this hash waits
+                # for the commit, then inserts a fresh row and writes the file after us
+                if os.path.exists(blob["path"]):
+                    os.remove(blob["path"])
+
+
+async def release_images_at(paths):
+    """Drop one reference per stored path (what DM flows and challenge photos keep instead of hashes)."""
+    if not paths:
+        return
+    async with db.pool.acquire() as conn:
+        rows = await conn.fetch("SELECT image_hash, path FROM image_blobs WHERE path = ANY($1::text[])", list(paths))
+    # Backfilled blobs keep their legacy paths, so the hash can't be derived from the file name
+    hashes = {row["path"]: row["image_hash"] for row in rows}
+    for path in paths:
+        if path in hashes:
+            await release_image(hashes[path])
+
+
+async def delete_orphaned_files(pool):
+    """Remove files queued in orphaned_image_files (by migration 0021) that nothing references."""
+    async with pool.acquire() as conn:
+        paths = await conn.fetch("""
+            SELECT o.path FROM orphaned_image_files o
+            WHERE NOT EXISTS (SELECT 1 FROM image_blobs b WHERE b.path = o.path)
+            AND NOT EXISTS (SELECT 1 FROM checkins c WHERE c.image_path = o.path)
+        """)
+        removed = 0
+        for row in paths:
+            try:
+                os.remove(row["path"])
+                removed += 1
+            except FileNotFoundError:
+                pass  # Already gone, or another process starting up removed it first
+            await conn.execute("DELETE FROM orphaned_image_files WHERE path = $1", row["path"])
+
+    if paths:
+        print(f"🧹 [ImageStore] Removed {removed} untracked duplicate image file(s)")
@@ -0,0 +1,213 @@
+# utils/job_queue.py
+import asyncio
+import dataclasses
+import json
+import os
+import random
+import socket
+from database import db
+from utils.pg_listener import PgListener
+
+JOBS_CHANNEL = "jobs"  # NOTIFY channel fed by the trigger on jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))  # Jobs a worker process runs at once
+JOB_POLL_SECONDS = 30  # Longest an idle worker sleeps without a NOTIFY (delayed jobs, expired leases)
+JOB_MAX_ATTEMPTS = 5
+JOB_VISIBILITY_SECONDS = 300  # A claimed job becomes due again if its worker stops renewing the lease this long
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 60 * 60
+INSTANCE = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _retry_delay(attempt):
+    """Full-jitter exponential backoff before a failed job's next attempt."""
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+
+
+class JobQueue:
+    """Postgres job queue between the gateway process, which enqueues, and workers, which run.
+
+    Claiming leases a job (FOR UPDATE SKIP LOCKED, then run_at pushed out by its visibility
+    timeout) rather than deleting it: success deletes the row, failure reschedules it with
+    backoff, a worker that dies lets the lease lapse, and a job out of attempts moves to
+    dead_jobs. Cogs register one async handler(job) per job type from utils/job_types.py.
+    """
+
+    def __init__(self, workers=JOB_WORKERS):
+        self.workers = workers
+        self._kinds = {}  # kind -> (job type, handler, max_attempts, visibility_seconds)
+        self._wake = None
+        self._tasks = []
+        self._listener = None
+        self.processed = 0
+        self.failed = 0
+        self.dead = 0
+
+    def register(self, job_type, handler, max_attempts=JOB_MAX_ATTEMPTS, visibility_seconds=JOB_VISIBILITY_SECONDS):
+        """Set the async handler(job) for a job type, and how its jobs are retried and leased."""
+        self._kinds[job_type.kind] = (job_type, handler, max_attempts, visibility_seconds)
+
+    async def enqueue(self, job, delay_seconds=0):
+        """Queue a job (a job type instance) for whichever worker is free; returns its id."""
+        registration = self._kinds.get(job.kind)
+        max_attempts, visibility = registration[2:] if registration else (JOB_MAX_ATTEMPTS, JOB_VISIBILITY_SECONDS)
+        async with db.pool.acquire() as conn:
+            return await conn.fetchval("""
+                INSERT INTO jobs (kind, payload, run_at, max_attempts, visibility_seconds)
+                VALUES ($1, $2::jsonb, NOW() + make_interval(secs => $3), $4, $5)
+                RETURNING id
+            """, job.kind, json.dumps(dataclasses.asdict(job)), delay_seconds, max_attempts, visibility)
+
+    async def start(self):
+        """Start the worker pool; only worker processes call this, after handlers are registered."""
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        self._listener = PgListener("Jobs", {JOBS_CHANNEL: lambda _: self._wake.set()},
+                                    on_reconnect=self._wake.set)
+        await self._listener.start()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"✅ [Jobs] {self.workers} worker(s) consuming {', '.join(sorted(self._kinds))}")
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                print(f"❌ [Jobs] Error claiming a job: {e}")
+                job = None
+
+            if job is not None:
+                try:
+                    await self._execute(job)
+                except Exception as e:
+                    # Its lease lapses and another attempt runs it
+                    print(f"❌ [Jobs] Error finishing {job['kind']} job {job['id']}: {e}")
+                continue  # There may be more waiting
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _claim(self):
+        async with db.pool.acquire() as conn:
+            return await conn.fetchrow("""
+                UPDATE jobs
+                SET run_at = NOW() + make_interval(secs => visibility_seconds),
+                    attempts = attempts + 1,
+                    leased_by = $2
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE run_at <= NOW() AND kind = ANY($1::text[])
+                    ORDER BY run_at, id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, kind, payload, attempts, max_attempts, visibility_seconds, last_error
+            """, list(self._kinds), INSTANCE)
+
+    async def _execute(self, job):
+        job_type, handler = self._kinds[job["kind"]][:2]
+        if job["attempts"] > job["max_attempts"]:
+            # Every earlier lease lapsed without an outcome: the job keeps killing its worker
+            await self._dead_letter(job, job["last_error"] or "lease expired on every attempt")
+            return
+
+        renew = asyncio.create_task(self._renew_lease(job))
+        try:
+            await handler(job_type(**json.loads(job["payload"])))
+        except Exception as e:
+            await self._failed(job, f"{type(e).__name__}: {e}")
+            return
+        finally:
+            renew.cancel()
+
+        self.processed += 1
+        async with db.pool.acquire() as conn:
+            await conn.execute("DELETE FROM jobs WHERE id = $1", job["id"])
+
+    async def _renew_lease(self, job):
+        """Keep a long-running job leased to this worker."""
+        while True:
+            await asyncio.sleep(job["visibility_seconds"] / 2)
+            try:
+                async with db.pool.acquire() as conn:
+                    await conn.execute("""
+                        UPDATE jobs SET run_at = NOW() + make_interval(secs => visibility_seconds)
+                        WHERE id = $1 AND leased_by = $2
+                    """, job["id"], INSTANCE)
+            except Exception as e:
+                print(f"⚠️ [Jobs] Could not renew lease on job {job['id']}: {e}")
+
+    async def _failed(self, job, error):
+        self.failed += 1
+        if job["attempts"] >= job["max_attempts"]:
+            await self._dead_letter(job, error)
+            return
+
+        delay = _retry_delay(job["attempts"])
+        print(f"🔁 [Jobs] {job['kind']} job {job['id']} failed ({error}); attempt {job['attempts']}, retry in {delay:.0f}s")
+        async with db.pool.acquire() as conn:
+            await conn.execute("""
+                UPDATE jobs
+                SET run_at = NOW() + make_interval(secs => $2), leased_by = NULL, last_error = $3
+                WHERE id = $1
+            """, job["id"], delay, error)
+
+    async def _dead_letter(self, job, error):
+        self.dead += 1
+        print(f"☠️ [Jobs] {job['kind']} job {job['id']} dead-lettered after {job['attempts']} attempt(s): {error}")
+        async with db.pool.acquire() as conn:
+            await conn.execute("""
+                WITH dead AS (DELETE FROM jobs WHERE id = $1 RETURNING *)
+                INSERT INTO dead_jobs (id, kind, payload, attempts, last_error, created_at)
+                SELECT id, kind, payload, attempts, $2, created_at FROM dead
+            """, job["id"], error)
+
+    async def depth(self):
+        """Per kind: jobs ready to run, waiting (delayed or retrying), leased, dead, and the oldest ready job's age."""
+        async with db.pool.acquire() as conn:
+            return await conn.fetch("""
+                WITH queued AS (
+                    SELECT kind,
+                           COUNT(*) FILTER (WHERE run_at <= NOW()) AS ready,
+                           COUNT(*) FILTER (WHERE run_at > NOW() AND leased_by IS NULL) AS waiting,
+                           COUNT(*) FILTER (WHERE run_at > NOW() AND leased_by IS NOT NULL) AS leased,
+                           EXTRACT(EPOCH FROM NOW() - MIN(created_at) FILTER (WHERE run_at <= NOW())) AS oldest_ready_seconds
+                    FROM jobs GROUP BY kind
+                ), dead AS (
+                    SELECT kind, COUNT(*) AS dead FROM dead_jobs GROUP BY kind
+                )
+                SELECT COALESCE(q.kind, d.kind) AS kind,
+                       COALESCE(q.ready, 0) AS ready, COALESCE(q.waiting, 0) AS waiting,
+                       COALESCE(q.leased, 0) AS leased, COALESCE(d.dead, 0) AS dead,
+                       q.oldest_ready_seconds
+                FROM queued q FULL JOIN dead d ON d.kind = q.kind
+                ORDER BY 1
+            """)
+
+    async def requeue_dead(self, kind=None):
+        """Move dead-lettered jobs (of one kind, or all) back onto the queue with fresh attempts."""
+        async with db.pool.acquire() as conn:
+            return await conn.fetchval("""
+                WITH revived AS (
+                    DELETE FROM dead_jobs WHERE $1::text IS NULL OR kind = $1 RETURNING *
+                ), inserted AS (
+                    INSERT INTO jobs (kind, payload, created_at)
+                    SELECT kind, payload, created_at FROM revived
+                    RETURNING 1
+                )
+                SELECT COUNT(*) FROM inserted
+            """, kind)
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+
+job_queue = JobQueue()
@@ -0,0 +1,50 @@
+# utils/job_types.py
+from dataclasses import dataclass, field
+from typing import ClassVar, List
+from utils.outbound import PRIORITY_BULK
+
+# One dataclass per kind of queued job. The fields are the JSON payload; handlers registered
+# with job_queue.register receive an instance, so a renamed or missing field fails loudly.
+
+
+@dataclass
+class PhotoCollectionJob:
+    """DM every participant who still owes final photos (challenge_end)."""
+    kind: ClassVar[str] = "photo_collection"
+    challenge_id: int
+    challenge_name: str
+    priority: int = PRIORITY_BULK
+
+
+@dataclass
+class RenderCollageJob:
+    """Render one participant's before/after collage (challenge_voting)."""
+    kind: ClassVar[str] = "render_collage"
+    challenge_id: int
+    user_id: int
+
+
+@dataclass
+class WinnerDMJob:
+    """Congratulate a placing participant once results are posted (challenge_voting)."""
+    kind: ClassVar[str] = "winner_dm"
+    challenge_id: int
+    challenge_name: str
+    user_id: int
+    position: str
+    votes: int
+
+
+@dataclass
+class CheckinCleanupJob:
+    """Delete a finished check-in's prompt and upload messages (checkin)."""
+    kind: ClassVar[str] = "checkin_cleanup"
+    channel_id: int
+    message_ids: List[int] = field(default_factory=list)
+
+
+@dataclass
+class ScheduledTaskJob:
+    """Run one of the APScheduler jobs by its stable ID (scheduler)."""
+    kind: ClassVar[str] = "scheduled_task"
+    job_id: str
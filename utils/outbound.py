@@ -0,0 +1,244 @@
+# utils/outbound.py
+import asyncio
+import itertools
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+import aiohttp
+import discord
+from database import db
+from utils.users import users
+
+OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", "4"))  # Messages being sent at once
+MAX_ATTEMPTS = 4
+RETRY_BASE_SECONDS = 2
+RETRY_MAX_SECONDS = 60
+
+# Lanes: lower goes first, so an admin resend never waits behind a bulk fan-out
+PRIORITY_ADMIN = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+
+# Token buckets: (requests per second, burst). Routes are "dm:<user id>" or "channel:<id>",
+# like Discord's own per-channel limits; the global bucket sits in front of all of them, a little
+# under Discord's 50 requests/second, and is what caps a fan-out across many users.
+GLOBAL_RATE = (40.0, 40)
+ROUTE_RATES = {
+    "dm": (2.0, 5),
+    "channel": (1.0, 5),
+}
+MAX_IDLE_BUCKETS = 1000  # Past this many routes, buckets that have refilled are dropped
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self, tokens=1):
+        """Wait until `tokens` requests may go out, then spend them."""
+        tokens = min(tokens, self.capacity)
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+    def is_full(self):
+        """True once the bucket has refilled, i.e. it is indistinguishable from a new one."""
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.capacity
+
+
+@dataclass(order=True)
+class OutboundMessage:
+    priority: int
+    seq: int
+    steps: list = field(compare=False)  # Async callables run in order; each after the first gets the previous result
+    route: str = field(compare=False)
+    kind: str = field(compare=False)
+    target_id: int = field(compare=False, default=None)
+    challenge_id: int = field(compare=False, default=None)
+    cost: int = field(compare=False, default=1)  # API calls the send makes
+    future: asyncio.Future = field(compare=False, default=None)
+    attempts: int = field(compare=False, default=0)
+    done: int = field(compare=False, default=0)  # Steps that succeeded; a retry resumes after them
+    result: object = field(compare=False, default=None)
+    queued_at: datetime = field(compare=False, default_factory=datetime.utcnow)
+
+
+def _retry_delay(error, attempt):
+    """Full-jitter exponential backoff, never shorter than a 429's retry_after."""
+    delay = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+    return max(delay, getattr(error, "retry_after", 0) or 0)
+
+
+def _is_retryable(error):
+    if isinstance(error, discord.HTTPException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class OutboundScheduler:
+    """Single way out for bot-initiated messages: priority lanes, rate limits, bounded concurrency.
+
+    submit() returns a future for the send's result, so callers may await it or fire and forget.
+    A send made of several messages is passed as steps, so a retry never repeats one that went
+    out. Every message ends with a row in outbound_messages.
+    """
+
+    def __init__(self, workers=OUTBOUND_WORKERS):
+        self.workers = workers
+        self.bot = None
+        self._queue = None
+        self._tasks = []
+        self._seq = itertools.count()
+        self._global = TokenBucket(*GLOBAL_RATE)
+        self._buckets = {}
+        self._retrying = {}  # seq -> (message, timer handle) for messages waiting out a backoff
+        self.sent = 0
+        self.failed = 0
+
+    def start(self, bot):
+        """Start the send workers; called once from setup_hook."""
+        self.bot = bot
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _bucket(self, route):
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            if len(self._buckets) >= MAX_IDLE_BUCKETS:
+                # One bucket per DM recipient adds up; a refilled one carries no state worth keeping
+                self._buckets = {r: b for r, b in self._buckets.items() if not b.is_full()}
+            bucket = self._buckets[route] = TokenBucket(*ROUTE_RATES[route.split(":", 1)[0]])
+        return bucket
+
+    def submit(self, route, send, *, kind, target_id=None, challenge_id=None,
+               priority=PRIORITY_NORMAL, cost=1):
+        """Queue `send` and return a future for its result.
+
+        `send` is an async callable, or a list of steps for a send that makes several messages:
+        the first step takes no arguments, each later one receives the previous step's result,
+        and the last one's is the send's result.
+        """
+        if self._queue is None:
+            raise RuntimeError("Outbound scheduler has not been started")
+        steps = list(send) if isinstance(send, (list, tuple)) else [send]
+        message = OutboundMessage(
+            priority, next(self._seq), steps, route, kind,
+            target_id=target_id, challenge_id=challenge_id, cost=cost,
+            future=asyncio.get_running_loop().create_future()
+        )
+        # Callers that fire and forget never read the result; don't warn about unretrieved errors
+        message.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._queue.put_nowait(message)
+        return message.future
+
+    def submit_dm(self, user_id, content=None, *, kind, embed=None, challenge_id=None, priority=PRIORITY_NORMAL):
+        """Queue a plain DM to user_id."""
+        async def send():
+            user = await users.resolve(user_id)
+            channel = await users.dm_channel(user)
+            return await channel.send(content=content, embed=embed)
+
+        return self.submit(f"dm:{user_id}", send, kind=kind, target_id=user_id, challenge_id=challenge_id,
+                           priority=priority, cost=2)
+
+    def submit_channel(self, channel, content=None, *, kind, embed=None, challenge_id=None, priority=PRIORITY_NORMAL):
+        """Queue a message to a guild channel."""
+        async def send():
+            return await channel.send(content=content, embed=embed)
+
+        return self.submit(f"channel:{channel.id}", send, kind=kind, challenge_id=challenge_id, priority=priority)
+
+    @property
+    def queued(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self):
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._deliver(message)
+            except Exception as e:
+                print(f"❌ [Outbound] Worker error on {message.kind}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, message):
+        await self._global.acquire(message.cost)
+        await self._bucket(message.route).acquire(message.cost)
+
+        message.attempts += 1
+        try:
+            while message.done < len(message.steps):
+                step = message.steps[message.done]
+                message.result = await (step(message.result) if message.done else step())
+                message.done += 1
+        except Exception as e:
+            if _is_retryable(e) and message.attempts < MAX_ATTEMPTS:
+                delay = _retry_delay(e, message.attempts)
+                print(f"🔁 [Outbound] {message.kind} to {message.target_id} failed ({e}); retry {message.attempts} in {delay:.1f}s")
+                handle = asyncio.get_running_loop().call_later(delay, self._requeue, message)
+                self._retrying[message.seq] = (message, handle)
+                return
+
+            self.failed += 1
+            if not message.future.done():
+                message.future.set_exception(e)
+            await self._record(message, "failed", str(e))
+            return
+
+        self.sent += 1
+        if not message.future.done():
+            message.future.set_result(message.result)
+        await self._record(message, "sent")
+
+    async def _record(self, message, status, error=None):
+        try:
+            async with db.pool.acquire() as conn:
+                await conn.execute("""
+                    INSERT INTO outbound_messages
+                        (kind, route, target_id, challenge_id, priority, status, attempts, error, queued_at)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                """, message.kind, message.route, message.target_id, message.challenge_id,
+                    message.priority, status, message.attempts, error, message.queued_at)
+        except Exception as e:
+            print(f"❌ [Outbound] Could not record outcome of {message.kind}: {e}")
+
+    def _requeue(self, message):
+        self._retrying.pop(message.seq, None)
+        if self._queue is None:
+            self._abandon(message)
+            return
+        self._queue.put_nowait(message)
+
+    @staticmethod
+    def _abandon(message):
+        if not message.future.done():
+            message.future.set_exception(RuntimeError("Outbound scheduler shut down before the message was sent"))
+
+    def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        # Nothing will send what is still queued or backing off; tell whoever awaits it
+        for message, handle in self._retrying.values():
+            handle.cancel()
+            self._abandon(message)
+        self._retrying = {}
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._abandon(self._queue.get_nowait())
+        self._queue = None
+
+
+outbound = OutboundScheduler()
@@ -0,0 +1,55 @@
+# utils/pg_listener.py
+import asyncio
+import os
+import asyncpg
+
+LISTEN_RETRY_SECONDS = 60  # Wait between reconnect attempts after the LISTEN connection drops
+
+
+class PgListener:
+    """A dedicated connection LISTENing on some NOTIFY channels; reconnects if it drops.
+
+    callbacks maps channel -> callback(payload). on_reconnect runs after the connection is
+    restored, since notifications sent while it was down are lost.
+    """
+
+    def __init__(self, name, callbacks, on_reconnect=None):
+        self.name = name
+        self.callbacks = callbacks
+        self.on_reconnect = on_reconnect
+        self._conn = None
+        self._running = False
+
+    async def start(self):
+        self._running = True
+        await self._connect()
+
+    async def _connect(self):
+        self._conn = await asyncpg.connect(dsn=os.getenv("DATABASE_URL"))
+        for channel, callback in self.callbacks.items():
+            await self._conn.add_listener(channel, lambda _c, _pid, _ch, payload, cb=callback: cb(payload))
+        self._conn.add_termination_listener(self._on_lost)
+
+    def _on_lost(self, conn):
+        if not self._running:
+            return
+        print(f"⚠️ [{self.name}] LISTEN connection lost; reconnecting...")
+        asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while self._running:
+            try:
+                await self._connect()
+                if self.on_reconnect is not None:
+                    self.on_reconnect()
+                print(f"✅ [{self.name}] LISTEN connection restored")
+                return
+            except Exception as e:
+                print(f"❌ [{self.name}] Reconnect failed: {e}")
+                await asyncio.sleep(LISTEN_RETRY_SECONDS)
+
+    async def close(self):
+        self._running = False
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
@@ -0,0 +1,99 @@
+# utils/phash_index.py
+import os
+from database import db
+from utils.image_pipeline import hamming_distance
+from utils.users import TTLCache
+
+PHASH_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", "6"))  # Bits that may differ and still count as the same photo
+PHASH_TREE_CACHE_SIZE = int(os.getenv("PHASH_TREE_CACHE_SIZE", "500"))  # Users whose trees stay in memory
+PHASH_TREE_TTL_SECONDS = 24 * 60 * 60  # An idle user's tree is reloaded from the DB after this
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes with Hamming distance.
+
+    A lookup only descends into children whose edge distance is within the search radius of
+    the query's distance to the node, so it touches a small fraction of the stored hashes.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, {distance: child_node}]
+        self.size = 0
+
+    def add(self, value):
+        if self.root is None:
+            self.root = [value, {}]
+            self.size = 1
+            return
+
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                return  # Already indexed
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [value, {}]
+                self.size += 1
+                return
+            node = child
+
+    def nearest_within(self, value, max_distance):
+        """Smallest distance to any stored hash if it is <= max_distance, else None."""
+        if self.root is None:
+            return None
+
+        best = None
+        stack = [self.root]
+        while stack:
+            node_value, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance and (best is None or distance < best):
+                best = distance
+                if best == 0:
+                    return 0
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for edge, child in children.items() if low <= edge <= high)
+        return best
+
+
+class PerceptualHashIndex:
+    """Per-user BK-trees of check-in photo hashes, loaded from the DB on first use.
+
+    Only recently active users' trees are kept (an LRU); an evicted tree reloads on next use.
+    """
+
+    def __init__(self, max_size=PHASH_TREE_CACHE_SIZE, ttl=PHASH_TREE_TTL_SECONDS):
+        self._trees = TTLCache(max_size, ttl)
+
+    async def _tree_for(self, user_id):
+        tree = self._trees.get(user_id)
+        if tree is None:
+            async with db.pool.acquire() as conn:
+                rows = await conn.fetch("""
+                    SELECT DISTINCT b.phash
+                    FROM checkins c
+                    JOIN image_blobs b ON b.image_hash = c.image_hash
+                    WHERE c.user_id = $1 AND b.phash IS NOT NULL
+                """, user_id)
+            tree = BKTree()
+            for row in rows:
+                tree.add(row["phash"])
+            self._trees.put(user_id, tree)
+        return tree
+
+    async def find_near_duplicate(self, user_id, phash, max_distance=PHASH_MAX_DISTANCE):
+        """Distance to the closest earlier check-in photo within max_distance, or None."""
+        tree = await self._tree_for(user_id)
+        return tree.nearest_within(phash, max_distance)
+
+    async def add(self, user_id, phash):
+        tree = await self._tree_for(user_id)
+        tree.add(phash)
+
+    def clear(self):
+        """Forget every loaded tree (they reload lazily), e.g. after a backfill."""
+        self._trees = TTLCache(self._trees.max_size, self._trees.ttl)
+
+
+phash_index = PerceptualHashIndex()
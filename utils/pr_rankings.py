@@ -0,0 +1,66 @@
+# utils/pr_rankings.py
+import bisect
+import time
+
+LIFTS = ("deadlift", "bench", "squat")
+RANKING_TTL_SECONDS = 15 * 60  # Safety net: reload from the DB even if no update_pr reached us
+
+
+class PRRankingCache:
+    """In-process PR leaderboard: one sorted list per lift, O(log n) rank lookup per user.
+
+    Filled at startup, patched in place by Database.update_pr, and reloaded after RANKING_TTL_SECONDS
+    in case another process changed personal_records.
+    """
+
+    def __init__(self, ttl=RANKING_TTL_SECONDS):
+        self.ttl = ttl
+        self.loaded_at = None
+        self._sorted = {lift: [] for lift in LIFTS}  # Negated values, ascending == heaviest first
+        self._values = {lift: {} for lift in LIFTS}  # user_id -> current PR
+
+    async def load(self, pool):
+        """Rebuild every lift's ranking from personal_records."""
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("SELECT user_id, deadlift, bench, squat FROM personal_records")
+
+        sorted_values = {lift: [] for lift in LIFTS}
+        values = {lift: {} for lift in LIFTS}
+        for row in rows:
+            for lift in LIFTS:
+                if row[lift] is not None:
+                    values[lift][row["user_id"]] = row[lift]
+                    sorted_values[lift].append(-row[lift])
+
+        for lift in LIFTS:
+            sorted_values[lift].sort()
+
+        self._sorted, self._values = sorted_values, values
+        self.loaded_at = time.monotonic()
+        print(f"🏋️ [PRRankings] Loaded {len(rows)} personal records into the ranking cache")
+
+    async def refresh_if_stale(self, pool):
+        """Reload when the cache was never loaded or is older than the TTL."""
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            await self.load(pool)
+
+    def update(self, user_id, lift, value):
+        """Apply a committed PR change without going back to the database."""
+        old_value = self._values[lift].get(user_id)
+        if old_value is not None:
+            ranking = self._sorted[lift]
+            del ranking[bisect.bisect_left(ranking, -old_value)]
+
+        if value is None:
+            self._values[lift].pop(user_id, None)
+            return
+
+        self._values[lift][user_id] = value
+        bisect.insort(self._sorted[lift], -value)
+
+    def rank(self, user_id, lift):
+        """1-based rank of the user's PR for a lift (ties share a rank), or None if they have none."""
+        value = self._values[lift].get(user_id)
+        if value is None:
+            return None
+        return bisect.bisect_left(self._sorted[lift], -value) + 1
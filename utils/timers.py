@@ -0,0 +1,183 @@
+# utils/timers.py
+import asyncio
+import heapq
+import json
+from datetime import datetime, timedelta
+from database import db
+from utils.pg_listener import PgListener
+
+TIMERS_CHANNEL = "timers"  # NOTIFY channel fed by the trigger on timers
+TIMER_RETRY_DELAY = timedelta(minutes=5)  # When a handler raises, its batch fires again after this
+
+
+class TimerService:
+    """Persisted delayed actions with one in-process min-heap and one sleeping task.
+
+    Timers live in the timers table, so they survive restarts. The service sleeps until the
+    earliest due_at and then hands every timer that is due to its kind's handler in one batch:
+    handler(list_of_payloads). Times are naive UTC. Timers scheduled by another process (the
+    gateway) reach the heap through a NOTIFY from the timers trigger.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+        self._heap = []  # (due_at, timer id, kind); entries for replaced or cancelled timers are dropped on claim
+        self._unhandled = {}  # kind -> heap entries that came due before the kind had a handler
+        self._wake = None
+        self._task = None
+        self._listener = None
+        self.fired = 0
+
+    def register(self, kind, handler):
+        """Set the async handler(payloads) that runs when timers of this kind come due."""
+        self._handlers[kind] = handler
+        for entry in self._unhandled.pop(kind, []):
+            self._push(*entry)
+
+    async def start(self, pool):
+        """Load pending timers and start the wake-up loop; call after the cogs registered their handlers."""
+        count = await self._load(pool)
+        if self._task is None:
+            self._wake = asyncio.Event()
+            # Timers scheduled while the LISTEN connection was down are picked up by reloading
+            self._listener = PgListener("Timers", {TIMERS_CHANNEL: self._on_notify},
+                                        on_reconnect=lambda: asyncio.get_running_loop().create_task(self._reload()))
+            await self._listener.start()
+            self._task = asyncio.create_task(self._run())
+        print(f"⏲️ [Timers] Loaded {count} pending timer(s)")
+
+    async def _load(self, pool):
+        """Rebuild the heap from the table, which is the source of truth."""
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("SELECT id, due_at, kind FROM timers")
+
+        self._heap = [(row["due_at"], row["id"], row["kind"]) for row in rows]
+        self._unhandled = {}
+        heapq.heapify(self._heap)
+        if self._wake is not None:
+            self._wake.set()
+        return len(rows)
+
+    async def _reload(self):
+        try:
+            count = await self._load(db.pool)
+            print(f"⏲️ [Timers] Reloaded {count} pending timer(s)")
+        except Exception as e:
+            print(f"❌ [Timers] Error reloading timers: {e}")
+
+    def _on_notify(self, payload):
+        # Our own schedule_many pushed these already; the duplicate entry is dropped on claim
+        try:
+            timer = json.loads(payload)
+            # due_at is naive UTC, sent as epoch seconds
+            due_at = datetime.utcfromtimestamp(float(timer["due_at"]))
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ [Timers] Unreadable timer notification {payload!r} ({e}); reloading")
+            asyncio.get_running_loop().create_task(self._reload())
+            return
+        self._push(due_at, timer["id"], timer["kind"])
+
+    def _push(self, due_at, timer_id, kind):
+        is_earliest = not self._heap or due_at < self._heap[0][0]
+        heapq.heappush(self._heap, (due_at, timer_id, kind))
+        if is_earliest and self._wake is not None:
+            self._wake.set()
+
+    async def schedule(self, kind, due_at, payload, key=None):
+        """Schedule (or, for an existing key, move) a timer."""
+        await self.schedule_many(kind, [(due_at, payload, key)])
+
+    async def schedule_many(self, kind, timers):
+        """Schedule several (due_at, payload, key) timers of one kind with a single statement."""
+        if not timers:
+            return
+        due_times, payloads, keys = zip(*timers)
+        async with db.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                INSERT INTO timers (kind, due_at, payload, key)
+                SELECT $1, t.due_at, t.payload::jsonb, t.key
+                FROM unnest($2::timestamp[], $3::text[], $4::text[]) AS t(due_at, payload, key)
+                ON CONFLICT (key) DO UPDATE
+                SET kind = EXCLUDED.kind, due_at = EXCLUDED.due_at, payload = EXCLUDED.payload
+                RETURNING id, due_at
+            """, kind, list(due_times), [json.dumps(p) for p in payloads], list(keys))
+
+        for row in rows:
+            self._push(row["due_at"], row["id"], kind)
+
+    async def cancel(self, key):
+        """Drop a pending timer by key."""
+        async with db.pool.acquire() as conn:
+            await conn.execute("DELETE FROM timers WHERE key = $1", key)
+
+    @property
+    def pending(self):
+        return len(self._heap) + sum(len(entries) for entries in self._unhandled.values())
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, (self._heap[0][0] - datetime.utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await self._fire_due()
+            except Exception as e:
+                print(f"❌ [Timers] Error firing timers: {e}")
+                await asyncio.sleep(TIMER_RETRY_DELAY.total_seconds())
+
+    async def _fire_due(self):
+        now = datetime.utcnow()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if entry[2] in self._handlers:
+                due.append(entry)
+            else:
+                # Kept aside rather than dropped; register() puts them back on the heap
+                self._unhandled.setdefault(entry[2], []).append(entry)
+        if not due:
+            return
+
+        # Deleting is the claim: a cancelled or moved timer no longer matches and is skipped
+        try:
+            async with db.pool.acquire() as conn:
+                rows = await conn.fetch("""
+                    DELETE FROM timers
+                    WHERE id = ANY($1::bigint[]) AND due_at <= $2 AND kind = ANY($3::text[])
+                    RETURNING kind, key, payload
+                """, [timer_id for _, timer_id, _ in due], now, list(self._handlers))
+        except Exception:
+            # Nothing was claimed; keep them on the heap for the retry
+            for entry in due:
+                heapq.heappush(self._heap, entry)
+            raise
+
+        batches = {}
+        for row in rows:
+            batches.setdefault(row["kind"], []).append((row["key"], json.loads(row["payload"])))
+
+        for kind, batch in batches.items():
+            self.fired += len(batch)
+            try:
+                await self._handlers[kind]([payload for _, payload in batch])
+            except Exception as e:
+                print(f"❌ [Timers] {kind} handler failed for {len(batch)} timer(s): {e}; retrying later")
+                retry_at = datetime.utcnow() + TIMER_RETRY_DELAY
+                await self.schedule_many(kind, [(retry_at, payload, key) for key, payload in batch])
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+
+timers = TimerService()
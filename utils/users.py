@@ -0,0 +1,170 @@
+# utils/users.py
+import asyncio
+import os
+import time
+from collections import OrderedDict
+import discord
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "2000"))
+USER_CACHE_TTL_SECONDS = 6 * 60 * 60  # Resolved users are trusted this long before being looked up again
+BATCH_WINDOW_SECONDS = 0.05  # Misses arriving within this window share one member chunk request
+MEMBER_CHUNK_SIZE = 100  # Most user IDs Discord accepts in one member chunk request
+
+
+class TTLCache:
+    """Least-recently-used mapping whose entries also expire after a fixed time."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class UserResolver:
+    """Cache-first user lookups for the paths that DM or name many users at once.
+
+    Checks its own TTL LRU, then the gateway's user and member caches. Misses are coalesced for a
+    moment and resolved with one member chunk request per 100 IDs; only users who are in no guild
+    cost a fetch_user. DM channels are cached too, so a reminder doesn't repeat create_dm, and so
+    are guild channels, which a REST-only worker has no gateway cache for.
+    """
+
+    def __init__(self, max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS):
+        self.bot = None
+        self._users = TTLCache(max_size, ttl)
+        self._dm_channels = TTLCache(max_size, ttl)
+        self._channels = TTLCache(max_size, ttl)
+        self._pending = {}  # user_id -> future shared by everyone waiting on that user
+        self._flush_task = None
+        self.cache_hits = 0
+        self.chunk_requests = 0
+        self.rest_calls = 0
+
+    def start(self, bot):
+        """Remember the bot; called once from setup_hook."""
+        self.bot = bot
+
+    def cached(self, user_id):
+        """A user or member already in memory, or None; never makes a request."""
+        user = self._users.get(user_id) or self.bot.get_user(user_id)
+        if user is None:
+            for guild in self.bot.guilds:
+                user = guild.get_member(user_id)
+                if user is not None:
+                    break
+        if user is not None:
+            self._users.put(user_id, user)
+        return user
+
+    async def resolve(self, user_id):
+        """The user for user_id; raises discord.NotFound like fetch_user if there is none."""
+        user = self.cached(user_id)
+        if user is not None:
+            self.cache_hits += 1
+            return user
+
+        future = self._pending.get(user_id)
+        if future is None:
+            future = self._pending[user_id] = asyncio.get_running_loop().create_future()
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush())
+        return await asyncio.shield(future)
+
+    async def resolve_many(self, user_ids):
+        """{user_id: user} for every ID that resolves; unknown users are left out."""
+        results = await asyncio.gather(*(self.resolve(user_id) for user_id in user_ids), return_exceptions=True)
+        return {user_id: user for user_id, user in zip(user_ids, results) if not isinstance(user, Exception)}
+
+    async def dm_channel(self, user):
+        """The user's DM channel, created at most once while cached."""
+        channel = self._dm_channels.get(user.id) or user.dm_channel
+        if channel is None:
+            self.rest_calls += 1
+            channel = await user.create_dm()
+        self._dm_channels.put(user.id, channel)
+        return channel
+
+    async def channel(self, channel_id):
+        """A guild channel by ID, fetched over REST if it isn't cached; None if it's gone or hidden."""
+        channel = self.bot.get_channel(channel_id) or self._channels.get(channel_id)
+        if channel is None:
+            try:
+                self.rest_calls += 1
+                channel = await self.bot.fetch_channel(channel_id)
+            except (discord.NotFound, discord.Forbidden) as e:
+                print(f"⚠️ [Users] Channel {channel_id} unavailable: {e}")
+                return None
+            self._channels.put(channel_id, channel)
+        return channel
+
+    async def _flush(self):
+        await asyncio.sleep(BATCH_WINDOW_SECONDS)
+        batch, self._pending = self._pending, {}
+        self._flush_task = None
+
+        try:
+            found = await self._query_members(list(batch))
+            for user_id, future in batch.items():
+                user = found.get(user_id)
+                if user is None:
+                    try:
+                        self.rest_calls += 1
+                        user = await self.bot.fetch_user(user_id)
+                    except Exception as e:
+                        future.set_exception(e)
+                        continue
+                self._users.put(user_id, user)
+                future.set_result(user)
+        except Exception as e:
+            print(f"❌ [Users] Batch lookup failed: {e}")
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for future in batch.values():
+                # Waiters that gave up never read the result; don't warn about unretrieved errors
+                if future.done() and not future.cancelled():
+                    future.exception()
+
+    async def _query_members(self, user_ids):
+        """Resolve as many IDs as possible through member chunk requests, guild by guild."""
+        found = {}
+        for guild in self.bot.guilds:
+            missing = [user_id for user_id in user_ids if user_id not in found]
+            if not missing:
+                break
+            for start in range(0, len(missing), MEMBER_CHUNK_SIZE):
+                self.chunk_requests += 1
+                try:
+                    members = await guild.query_members(user_ids=missing[start:start + MEMBER_CHUNK_SIZE], cache=True)
+                except Exception as e:
+                    print(f"⚠️ [Users] Member chunk request failed in {guild.name}: {e}")
+                    continue
+                found.update((member.id, member) for member in members)
+        return found
+
+    @property
+    def cached_users(self):
+        return len(self._users)
+
+
+users = UserResolver()